@@ -0,0 +1,78 @@
+"""End-to-end latency benchmark for /api/bulk-upload.
+
+Start the app (and optionally the microservices) first, then run:
+
+    python benchmarks/bench_bulk_upload.py --files 20 --runs 3
+
+To compare against the old one-file-at-a-time loop, restart the app with
+IDCR_UPLOAD_CONCURRENCY=1 and run the benchmark again. Latency is measured
+from the upload request until /api/batches/{batch_id} reports completion.
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+SAMPLE_TEXT = (
+    "Subject: Quarterly budget review\n\n"
+    "Please review the attached invoice and payment schedule before the deadline. "
+    "The finance team must approve the expense report for employee reimbursement. "
+    "Contract terms and compliance requirements are listed in the agreement.\n"
+)
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    response = requests.post(f"{base_url}/api/login", json={"email": email, "password": password}, timeout=30)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def upload_batch(base_url: str, token: str, file_count: int, repeat: int) -> float:
+    files = [
+        ("files", (f"bench_document_{i}.txt", (SAMPLE_TEXT * repeat).encode("utf-8"), "text/plain"))
+        for i in range(file_count)
+    ]
+    headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/api/bulk-upload",
+        headers=headers,
+        data={"batch_name": "benchmark"},
+        files=files,
+        timeout=600
+    )
+    response.raise_for_status()
+    batch_id = response.json()["batch_id"]
+
+    # Processing happens in the background; the batch is done when its status leaves "processing"
+    while True:
+        batch = requests.get(f"{base_url}/api/batches/{batch_id}", headers=headers, timeout=30)
+        batch.raise_for_status()
+        if batch.json()["status"] != "processing":
+            break
+        time.sleep(0.05)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bulk upload batch latency")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--email", default="admin@company.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--files", type=int, default=20, help="files per batch")
+    parser.add_argument("--repeat", type=int, default=50, help="sample paragraphs per file")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.email, args.password)
+    timings = [upload_batch(args.base_url, token, args.files, args.repeat) for _ in range(args.runs)]
+
+    print(f"Batches: {args.runs} x {args.files} files")
+    print(f"Mean batch latency:   {statistics.mean(timings):.2f}s")
+    print(f"Median batch latency: {statistics.median(timings):.2f}s")
+    print(f"Per file (mean):      {statistics.mean(timings) / args.files * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
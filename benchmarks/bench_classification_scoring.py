@@ -0,0 +1,93 @@
+"""Throughput benchmark for keyword scoring in the classification service.
+
+Compares the per-document loops (classify_content, one hits.count() per department)
+with the vectorized path (classify_contents, one sparse matrix product per batch):
+
+    python benchmarks/bench_classification_scoring.py --documents 5000 --batch-size 64
+
+Two numbers are reported for each path: the scoring step alone (keyword hits already
+found) and the full classification including the keyword scan. Results of both paths
+are checked to be identical before timing.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+from libs.utils.keyword_scoring import vectorized_scoring_available
+
+
+def load_service():
+    path = os.path.join(ROOT, 'microservices', 'classification', 'app', 'main.py')
+    spec = importlib.util.spec_from_file_location('classification_service', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_documents(service, count: int, words: int, seed: int):
+    rng = random.Random(seed)
+    vocabulary = service.TEXT_KEYWORDS.patterns + ["the", "report", "meeting", "quarter", "team", "review"] * 20
+    return [
+        (" ".join(rng.choice(vocabulary) for _ in range(words)), f"document_{i}.txt")
+        for i in range(count)
+    ]
+
+
+def docs_per_second(function, documents, batch_size: int, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        for start in range(0, len(documents), batch_size):
+            function(documents[start:start + batch_size])
+        best = min(best, time.perf_counter() - started)
+    return len(documents) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-document and vectorized keyword scoring")
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=300, help="words per document")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not vectorized_scoring_available():
+        sys.exit("numpy and scipy are required for the vectorized path")
+
+    service = load_service()
+    documents = make_documents(service, args.documents, args.words, args.seed)
+    categories = list(service.TEXT_DEPARTMENTS)
+
+    loop_results = [service.classify_content(content, filename) for content, filename in documents]
+    if service.classify_contents(documents) != loop_results:
+        sys.exit("vectorized results differ from the per-document loop")
+
+    hits = [service.TEXT_KEYWORDS.scan(content.lower(), filename.lower()) for content, filename in documents]
+
+    def score_loop(batch):
+        return [max(range(len(categories)), key=lambda i: document.count(categories[i])) for document in batch]
+
+    def classify_loop(batch):
+        return [service.classify_content(content, filename) for content, filename in batch]
+
+    rows = [
+        ("scoring only, loops", docs_per_second(score_loop, hits, args.batch_size, args.runs)),
+        ("scoring only, matrix", docs_per_second(service.TEXT_SCORING.best, hits, args.batch_size, args.runs)),
+        ("full classify, loops", docs_per_second(classify_loop, documents, args.batch_size, args.runs)),
+        ("full classify, matrix", docs_per_second(service.classify_contents, documents, args.batch_size, args.runs)),
+    ]
+
+    print(f"Documents: {args.documents} x {args.words} words, batches of {args.batch_size}")
+    for label, rate in rows:
+        print(f"{label:<24}{rate:>12,.0f} docs/sec")
+
+
+if __name__ == "__main__":
+    main()
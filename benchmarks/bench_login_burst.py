@@ -0,0 +1,93 @@
+"""Latency of unrelated requests during a burst of logins.
+
+Start the app first, then run:
+
+    python benchmarks/bench_login_burst.py --logins 40 --concurrency 20
+
+A probe thread keeps requesting --probe-path (an authenticated endpoint that does no
+password work) while the logins run, and the probe latencies are reported for an
+idle server and during the burst. To see the effect of hashing on the event loop,
+run the same benchmark against a build that hashes inline in the request handlers.
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    response = httpx.post(f"{base_url}/api/login", json={"email": email, "password": password}, timeout=120)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def probe(base_url: str, path: str, token: str, stop: threading.Event, latencies: list) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    with httpx.Client(timeout=120) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get(f"{base_url}{path}", headers=headers).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+
+def measure_probe(base_url: str, path: str, token: str, burst=None, idle_seconds: float = 2.0) -> list:
+    """Probe latencies while burst() runs (or for idle_seconds without a burst)"""
+    stop = threading.Event()
+    latencies = []
+    thread = threading.Thread(target=probe, args=(base_url, path, token, stop, latencies))
+    thread.start()
+    if burst is None:
+        time.sleep(idle_seconds)
+    else:
+        burst()
+    stop.set()
+    thread.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure request latency during a login burst")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--email", default="admin@company.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--probe-path", default="/api/me")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.email, args.password)
+    login_times = []
+
+    def burst():
+        def one_login(_):
+            started = time.perf_counter()
+            login(args.base_url, args.email, args.password)
+            login_times.append(time.perf_counter() - started)
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(one_login, range(args.logins)))
+
+    started = time.perf_counter()
+    idle = measure_probe(args.base_url, args.probe_path, token)
+    busy = measure_probe(args.base_url, args.probe_path, token, burst=burst)
+    elapsed = time.perf_counter() - started
+
+    print(f"Burst: {args.logins} logins, {args.concurrency} at a time ({elapsed:.1f}s including the idle phase)")
+    print(f"Login latency p50/p99:      {statistics.median(login_times) * 1000:8.0f} / "
+          f"{percentile(login_times, 0.99) * 1000:8.0f} ms")
+    for label, latencies in [("idle", idle), ("during burst", busy)]:
+        print(f"{args.probe_path} {label + ' p50/p99:':<22}{statistics.median(latencies) * 1000:8.1f} / "
+              f"{percentile(latencies, 0.99) * 1000:8.1f} ms  ({len(latencies)} requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Latency benchmark for the /api/stats queries.
+
+Compares the old approach (fetch every visible document, count in Python) with the
+rollup counters maintained by triggers, on a scratch database:
+
+    python benchmarks/bench_stats.py --documents 100000 --text-bytes 2000
+
+Both approaches are checked to give the same numbers for every role filter before
+timing. The load phase is timed with and without the counter triggers, which shows
+their cost per insert.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+from libs.database.document_stats import DOCUMENT_STATS_SCHEMA, read_document_stats
+from libs.database.migrations import Migration, run_migrations
+
+DOCUMENTS_SCHEMA = '''
+    CREATE TABLE documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        doc_id TEXT UNIQUE NOT NULL,
+        uploaded_by TEXT NOT NULL,
+        uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        extracted_text TEXT,
+        document_type TEXT,
+        department TEXT,
+        priority TEXT DEFAULT 'medium',
+        processing_status TEXT DEFAULT 'uploaded',
+        review_status TEXT DEFAULT 'pending'
+    )
+'''
+DEPARTMENTS = ['hr', 'finance', 'legal', 'it', 'administration']
+DOCUMENT_TYPES = ['hr_document', 'invoice', 'contract', 'it_document', 'general']
+ROLE_FILTERS = {
+    'admin': ("", []),
+    'manager': (" AND (uploaded_by = ? OR department = ?)", ['user0@company.com', 'finance']),
+    'employee': (" AND uploaded_by = ?", ['user0@company.com']),
+}
+
+
+def make_rows(count: int, text_bytes: int, uploaders: int, seed: int):
+    rng = random.Random(seed)
+    text = 'x' * text_bytes
+    now = datetime.now()
+    for i in range(count):
+        yield (
+            f'doc-{i}', f'user{rng.randrange(uploaders)}@company.com',
+            (now - timedelta(days=rng.randrange(60), seconds=rng.randrange(86400))).strftime('%Y-%m-%d %H:%M:%S'),
+            text, rng.choice(DOCUMENT_TYPES), rng.choice(DEPARTMENTS), rng.choice(['high', 'medium', 'low']),
+            rng.choice(['classified', 'completed', 'uploaded']), rng.choice(['pending', 'approved', 'rejected']),
+        )
+
+
+def load(path: str, rows, with_counters: bool) -> float:
+    conn = sqlite3.connect(path)
+    conn.execute(DOCUMENTS_SCHEMA)
+    if with_counters:
+        run_migrations(conn, [Migration(1, "document counters", DOCUMENT_STATS_SCHEMA)])
+    started = time.perf_counter()
+    conn.executemany(
+        'INSERT INTO documents (doc_id, uploaded_by, uploaded_at, extracted_text, document_type, department,'
+        ' priority, processing_status, review_status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+    )
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+def full_scan_stats(conn: sqlite3.Connection, condition: str, params: list, since_day: str) -> dict:
+    """What /api/stats used to do: fetch every visible document and count in Python"""
+    base_query = f"SELECT * FROM documents WHERE 1=1{condition}"
+    all_docs = conn.execute(base_query, params).fetchall()
+    processed = len(conn.execute(base_query + " AND processing_status IN ('classified', 'completed')", params).fetchall())
+    pending = len(conn.execute(base_query + " AND review_status = 'pending'", params).fetchall())
+    doc_types, departments, priorities = {}, {}, {}
+    for doc in all_docs:
+        doc_types[doc[5] or 'unknown'] = doc_types.get(doc[5] or 'unknown', 0) + 1
+        departments[doc[6] or 'unknown'] = departments.get(doc[6] or 'unknown', 0) + 1
+        priorities[doc[7] or 'medium'] = priorities.get(doc[7] or 'medium', 0) + 1
+    daily = {}
+    for doc in conn.execute(f"{base_query} AND date(uploaded_at) >= date(?)", params + [since_day]):
+        daily[doc[3][:10]] = daily.get(doc[3][:10], 0) + 1
+    return {
+        'total_documents': len(all_docs), 'processed_documents': processed, 'pending_documents': pending,
+        'document_types': doc_types, 'departments': departments, 'priorities': priorities, 'daily_uploads': daily,
+    }
+
+
+def best_time(function, runs: int) -> float:
+    best = float('inf')
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-scan and rollup dashboard stats")
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--text-bytes", type=int, default=2000, help="extracted text per document")
+    parser.add_argument("--uploaders", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    since_day = (datetime.now() - timedelta(days=6)).strftime('%Y-%m-%d')
+    with tempfile.TemporaryDirectory() as directory:
+        plain_path = os.path.join(directory, 'plain.db')
+        counted_path = os.path.join(directory, 'counted.db')
+        plain_load = load(plain_path, make_rows(args.documents, args.text_bytes, args.uploaders, args.seed), False)
+        counted_load = load(counted_path, make_rows(args.documents, args.text_bytes, args.uploaders, args.seed), True)
+
+        conn = sqlite3.connect(counted_path)
+        buckets = conn.execute('SELECT COUNT(*) FROM document_rollup').fetchone()[0]
+        print(f"Documents: {args.documents} x {args.text_bytes} bytes of text, {buckets} rollup buckets")
+        print(f"{'load without counters':<28}{plain_load * 1000:>10.0f} ms")
+        print(f"{'load with counters':<28}{counted_load * 1000:>10.0f} ms")
+
+        for role, (condition, params) in ROLE_FILTERS.items():
+            expected = full_scan_stats(conn, condition, params, since_day)
+            actual = read_document_stats(conn, condition, params, since_day)
+            if actual != expected:
+                sys.exit(f"rollup stats differ from the full scan for {role}")
+            scan = best_time(lambda: full_scan_stats(conn, condition, params, since_day), args.runs)
+            rollup = best_time(lambda: read_document_stats(conn, condition, params, since_day), args.runs)
+            print(f"{role + ', full scan':<28}{scan * 1000:>10.1f} ms")
+            print(f"{role + ', rollups':<28}{rollup * 1000:>10.1f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
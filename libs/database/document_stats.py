@@ -0,0 +1,141 @@
+"""Document counters for the dashboard, maintained incrementally by triggers.
+
+`document_rollup` counts documents per (department, uploader, document type, priority,
+processed, pending review) and `daily_uploads` per (upload day, department, uploader).
+Every insert, delete and update of a counted column moves a document from one bucket
+to another, so the counters are always in step with `documents`: uploads, reviews and
+reclassification included.
+
+Because every bucket belongs to exactly one department and one uploader, the
+dashboard's role filters (`department = ?`, `uploaded_by = ?` or either) apply to the
+buckets as they would to the documents, and the stats cost O(buckets) instead of
+O(documents).
+"""
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Bucket columns of a document row (NULLs become '' so that they fall into one bucket)
+ROLLUP_KEYS = {
+    'department': "COALESCE({row}.department, '')",
+    'uploaded_by': "COALESCE({row}.uploaded_by, '')",
+    'document_type': "COALESCE({row}.document_type, '')",
+    'priority': "COALESCE({row}.priority, '')",
+    'processed': "COALESCE({row}.processing_status IN ('classified', 'completed'), 0)",
+    'pending': "COALESCE({row}.review_status = 'pending', 0)",
+}
+DAILY_KEYS = {
+    'day': "COALESCE(substr({row}.uploaded_at, 1, 10), '')",
+    'department': ROLLUP_KEYS['department'],
+    'uploaded_by': ROLLUP_KEYS['uploaded_by'],
+}
+COUNTED_COLUMNS = ['department', 'uploaded_by', 'document_type', 'priority', 'processing_status',
+                   'review_status', 'uploaded_at']
+
+
+def _count(table: str, keys: Dict[str, str], row: str, delta: int) -> str:
+    columns = ', '.join(keys)
+    values = ', '.join(expression.format(row=row) for expression in keys.values())
+    return (
+        f"INSERT INTO {table} ({columns}, documents) VALUES ({values}, {delta}) "
+        f"ON CONFLICT ({columns}) DO UPDATE SET documents = documents + ({delta});"
+    )
+
+
+def _backfill(table: str, keys: Dict[str, str]) -> str:
+    expressions = [expression.format(row='documents') for expression in keys.values()]
+    return (
+        f"INSERT INTO {table} ({', '.join(keys)}, documents) "
+        f"SELECT {', '.join(expressions)}, COUNT(*) FROM documents GROUP BY {', '.join(expressions)}"
+    )
+
+
+DOCUMENT_STATS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS document_rollup (
+        department TEXT NOT NULL,
+        uploaded_by TEXT NOT NULL,
+        document_type TEXT NOT NULL,
+        priority TEXT NOT NULL,
+        processed INTEGER NOT NULL,
+        pending INTEGER NOT NULL,
+        documents INTEGER NOT NULL,
+        PRIMARY KEY (department, uploaded_by, document_type, priority, processed, pending)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_document_rollup_uploaded_by ON document_rollup (uploaded_by)',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_uploads (
+        day TEXT NOT NULL,
+        department TEXT NOT NULL,
+        uploaded_by TEXT NOT NULL,
+        documents INTEGER NOT NULL,
+        PRIMARY KEY (day, department, uploaded_by)
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS document_stats_insert AFTER INSERT ON documents BEGIN
+        {_count('document_rollup', ROLLUP_KEYS, 'new', 1)}
+        {_count('daily_uploads', DAILY_KEYS, 'new', 1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS document_stats_delete AFTER DELETE ON documents BEGIN
+        {_count('document_rollup', ROLLUP_KEYS, 'old', -1)}
+        {_count('daily_uploads', DAILY_KEYS, 'old', -1)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS document_stats_update AFTER UPDATE OF {', '.join(COUNTED_COLUMNS)} ON documents BEGIN
+        {_count('document_rollup', ROLLUP_KEYS, 'old', -1)}
+        {_count('daily_uploads', DAILY_KEYS, 'old', -1)}
+        {_count('document_rollup', ROLLUP_KEYS, 'new', 1)}
+        {_count('daily_uploads', DAILY_KEYS, 'new', 1)}
+    END
+    ''',
+    # Count the documents stored before the triggers existed
+    _backfill('document_rollup', ROLLUP_KEYS),
+    _backfill('daily_uploads', DAILY_KEYS),
+]
+
+
+def tally_document_stats(buckets: Iterable[Sequence], daily: Iterable[Sequence]) -> dict:
+    """The /api/stats counters from (document_type, department, priority, processed, pending,
+    documents) buckets and (day, documents) pairs"""
+    stats = {
+        'total_documents': 0,
+        'processed_documents': 0,
+        'pending_documents': 0,
+        'document_types': {},
+        'departments': {},
+        'priorities': {},
+        'daily_uploads': {},
+    }
+    for doc_type, department, priority, processed, pending, documents in buckets:
+        doc_type, department, priority = doc_type or 'unknown', department or 'unknown', priority or 'medium'
+        stats['total_documents'] += documents
+        stats['processed_documents'] += documents if processed else 0
+        stats['pending_documents'] += documents if pending else 0
+        stats['document_types'][doc_type] = stats['document_types'].get(doc_type, 0) + documents
+        stats['departments'][department] = stats['departments'].get(department, 0) + documents
+        stats['priorities'][priority] = stats['priorities'].get(priority, 0) + documents
+    stats['daily_uploads'] = {day: documents for day, documents in daily}
+    return stats
+
+
+def read_document_stats(conn: sqlite3.Connection, condition: str = "", params: Optional[List] = None,
+                        since_day: str = "") -> dict:
+    """Counters of the documents matching `condition` (a " AND ..." filter on the
+    department and uploaded_by columns), and their uploads per day from `since_day` on"""
+    params = list(params or [])
+    buckets = conn.execute(
+        "SELECT document_type, department, priority, processed, pending, SUM(documents) FROM document_rollup"
+        f" WHERE 1=1{condition} GROUP BY document_type, department, priority, processed, pending"
+        " HAVING SUM(documents) > 0",
+        params
+    )
+    daily = conn.execute(
+        f"SELECT day, SUM(documents) FROM daily_uploads WHERE day >= ?{condition} GROUP BY day"
+        " HAVING SUM(documents) > 0",
+        [since_day] + params
+    )
+    return tally_document_stats(buckets.fetchall(), daily.fetchall())
@@ -0,0 +1,276 @@
+"""Async data access for the API's route handlers.
+
+Every method takes a connection from the SQLitePool and runs its queries on the store's
+own thread pool, so neither a slow query nor a wait for the write lock blocks the event
+loop. A method's statements run in one transaction: committed when it returns, rolled
+back (by the pool) when it raises. Single records come back as dicts and lists as
+sqlite3.Row, so callers read columns by name rather than by their position in SELECT *.
+
+Query fragments built by the handlers (role filters, full-text search, keyset cursors)
+are passed in as (SQL, params) pairs and only ever contain ? placeholders. The parts
+that differ between databases (full-text search, schema setup) are methods of the
+store, so that PostgresDocumentStore can be used in its place.
+"""
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from libs.database.document_stats import read_document_stats
+from libs.database.full_text_search import SEARCH_RANK, SEARCH_SNIPPET, match_query
+from libs.database.sqlite_pool import SQLitePool
+
+
+def _insert(conn: sqlite3.Connection, table: str, values: Dict[str, Any]) -> None:
+    # Column names come from the callers' code, never from request data
+    columns = ', '.join(values)
+    placeholders = ', '.join('?' for _ in values)
+    conn.execute(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', list(values.values()))
+
+
+def _one(conn: sqlite3.Connection, query: str, params: Sequence[Any]) -> Optional[dict]:
+    row = conn.execute(query, params).fetchone()
+    return dict(row) if row is not None else None
+
+
+def _get_user(conn: sqlite3.Connection, email: str) -> Optional[dict]:
+    return _one(conn, 'SELECT * FROM users WHERE email = ?', (email,))
+
+
+def _user_names(conn: sqlite3.Connection) -> Dict[str, str]:
+    return {row['email']: row['full_name'] for row in conn.execute('SELECT email, full_name FROM users')}
+
+
+def _create_user(conn: sqlite3.Connection, user: Dict[str, Any]) -> bool:
+    try:
+        _insert(conn, 'users', user)
+    except sqlite3.IntegrityError:
+        return False  # the email is already registered
+    return True
+
+
+def _count_documents(conn: sqlite3.Connection, join: str, conditions: str, params: Sequence[Any]) -> int:
+    return conn.execute(f'SELECT COUNT(*) FROM documents d{join} WHERE 1=1{conditions}', params).fetchone()[0]
+
+
+def _list_documents(conn: sqlite3.Connection, columns: str, join: str, conditions: str, params: Sequence[Any],
+                    order_by: str, limit: int) -> List[sqlite3.Row]:
+    query = f'SELECT {columns} FROM documents d{join} WHERE 1=1{conditions} ORDER BY {order_by} LIMIT ?'
+    return conn.execute(query, list(params) + [limit]).fetchall()
+
+
+def _get_document(conn: sqlite3.Connection, doc_id: str) -> Optional[dict]:
+    return _one(conn, 'SELECT * FROM documents WHERE doc_id = ?', (doc_id,))
+
+
+def _record_review(conn: sqlite3.Connection, doc_id: str, review: Dict[str, Any],
+                   notification: Dict[str, Any]) -> bool:
+    assignments = ', '.join(f'{column} = ?' for column in review)
+    updated = conn.execute(
+        f'UPDATE documents SET {assignments} WHERE doc_id = ?', list(review.values()) + [doc_id]
+    ).rowcount
+    if updated:
+        _insert(conn, 'email_notifications', notification)
+    return bool(updated)
+
+
+def _list_notifications(conn: sqlite3.Connection, condition: str, params: Sequence[Any],
+                        limit: int) -> List[dict]:
+    rows = conn.execute(f'''
+        SELECT e.*, u.full_name AS sent_by_name
+        FROM email_notifications e
+        LEFT JOIN users u ON e.sent_by = u.email
+        WHERE 1=1{condition}
+        ORDER BY e.sent_at DESC LIMIT ?
+    ''', list(params) + [limit])
+    return [dict(row) for row in rows]
+
+
+def _record_batch_progress(conn: sqlite3.Connection, batch_id: str, succeeded: bool, reused: bool) -> None:
+    conn.execute('''
+        UPDATE upload_batches
+        SET processed_files = processed_files + ?, failed_files = failed_files + ?,
+            reused_files = reused_files + ?
+        WHERE batch_id = ?
+    ''', (1 if succeeded else 0, 0 if succeeded else 1, 1 if reused else 0, batch_id))
+    conn.execute('''
+        UPDATE upload_batches
+        SET status = CASE WHEN failed_files >= total_files THEN 'failed' ELSE 'completed' END,
+            completed_at = ?
+        WHERE batch_id = ? AND status = 'processing' AND processed_files + failed_files >= total_files
+    ''', (datetime.now().isoformat(), batch_id))
+
+
+def _touch_batches(conn: sqlite3.Connection, owner: str, now: str) -> None:
+    conn.execute("UPDATE upload_batches SET heartbeat_at = ? WHERE owner = ? AND status = 'processing'", (now, owner))
+
+
+def _close_abandoned_batches(conn: sqlite3.Connection, stale_before: str) -> int:
+    return conn.execute('''
+        UPDATE upload_batches
+        SET failed_files = total_files - processed_files,
+            status = CASE WHEN processed_files = 0 THEN 'failed' ELSE 'completed' END,
+            completed_at = ?
+        WHERE status = 'processing' AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+    ''', (datetime.now().isoformat(), stale_before)).rowcount
+
+
+def _get_batch(conn: sqlite3.Connection, batch_id: str) -> Optional[dict]:
+    return _one(conn, 'SELECT * FROM upload_batches WHERE batch_id = ?', (batch_id,))
+
+
+def _batch_documents(conn: sqlite3.Connection, batch_id: str) -> List[dict]:
+    rows = conn.execute('''
+        SELECT original_name, doc_id, document_type, department, priority, summary, routing_reason
+        FROM documents WHERE batch_id = ? ORDER BY id
+    ''', (batch_id,))
+    return [dict(row) for row in rows]
+
+
+def _find_classified_by_hash(conn: sqlite3.Connection, content_hash: str) -> Optional[dict]:
+    return _one(conn, '''
+        SELECT extracted_text, document_type, department, priority, classification_source, risk_score,
+               confidentiality_percent, sentiment, summary, key_phrases, entities
+        FROM documents
+        WHERE content_hash = ? AND processing_status = 'classified'
+        ORDER BY id LIMIT 1
+    ''', (content_hash,))
+
+
+class DocumentStore:
+    """The queries of the API on SQLite, awaitable from async handlers.
+
+    At most `max_workers` calls run at a time (by default as many as the pool keeps
+    idle connections); further calls wait in the executor's queue.
+    """
+
+    backend = 'sqlite'
+    # Sort key of search results, best match first (bm25: lower is better)
+    search_rank = SEARCH_RANK
+
+    def __init__(self, pool: SQLitePool, max_workers: Optional[int] = None):
+        self.pool = pool
+        self.max_workers = max_workers or pool.size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _threads(self) -> ThreadPoolExecutor:
+        # Created on first use, so the store works again after close()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='db')
+            return self._executor
+
+    def _call(self, function: Callable[..., Any], *args: Any) -> Any:
+        conn = self.pool.acquire()
+        try:
+            conn.row_factory = sqlite3.Row
+            result = function(conn, *args)
+            conn.commit()
+            return result
+        finally:
+            self.pool.release(conn)  # rolls back whatever a failed call left uncommitted
+
+    async def open(self) -> bool:
+        """Nothing to set up: init_database and migrate_database manage the SQLite schema.
+        Returns whether the tables were created (and need the demo users)."""
+        return False
+
+    async def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """function(conn, *args) on a store thread, in its own transaction"""
+        return await asyncio.get_running_loop().run_in_executor(self._threads(), self._call, function, *args)
+
+    # Users
+    async def get_user(self, email: str) -> Optional[dict]:
+        return await self.run(_get_user, email)
+
+    async def user_names(self) -> Dict[str, str]:
+        """Full name of every user, by email"""
+        return await self.run(_user_names)
+
+    async def create_user(self, user: Dict[str, Any]) -> bool:
+        """Insert a users row; False if the email is already registered"""
+        return await self.run(_create_user, user)
+
+    # Documents
+    def search_clause(self, search: str) -> Tuple[str, str, str, List[Any]]:
+        """(select columns, join, condition, params) restricting a query on `documents d` to
+        the documents matching a search box value. The two select columns are `snippet`, the
+        matching fragment of the text, and `search_rank`, the bm25 rank (lower is better)."""
+        match = match_query(search)
+        if match is None:
+            # No words to look up in the full-text index: match the file name
+            return ", NULL AS snippet, NULL AS search_rank", "", " AND d.original_name LIKE ?", [f"%{search}%"]
+        return (
+            f", {SEARCH_SNIPPET} AS snippet, {SEARCH_RANK} AS search_rank",
+            " JOIN documents_fts ON documents_fts.rowid = d.id",
+            " AND documents_fts MATCH ?",
+            [match]
+        )
+
+    async def count_documents(self, join: str, conditions: str, params: Sequence[Any]) -> int:
+        return await self.run(_count_documents, join, conditions, params)
+
+    async def list_documents(self, columns: str, join: str, conditions: str, params: Sequence[Any],
+                             order_by: str, limit: int) -> List[sqlite3.Row]:
+        """SELECT columns FROM documents d{join} WHERE 1=1{conditions} ORDER BY order_by LIMIT limit"""
+        return await self.run(_list_documents, columns, join, conditions, params, order_by, limit)
+
+    async def get_document(self, doc_id: str) -> Optional[dict]:
+        return await self.run(_get_document, doc_id)
+
+    async def insert_document(self, document: Dict[str, Any]) -> None:
+        await self.run(_insert, 'documents', document)
+
+    async def record_review(self, doc_id: str, review: Dict[str, Any], notification: Dict[str, Any]) -> bool:
+        """Set the review columns of a document and log the notification to its uploader
+        together; False (and nothing written) if the document does not exist"""
+        return await self.run(_record_review, doc_id, review, notification)
+
+    async def find_classified_by_hash(self, content_hash: str) -> Optional[dict]:
+        """Pipeline results of the first classified document with this content, if any"""
+        return await self.run(_find_classified_by_hash, content_hash)
+
+    # Notifications
+    async def insert_notification(self, notification: Dict[str, Any]) -> None:
+        await self.run(_insert, 'email_notifications', notification)
+
+    async def list_notifications(self, condition: str, params: Sequence[Any], limit: int = 50) -> List[dict]:
+        """Newest notifications first, each with the sender's full name as sent_by_name"""
+        return await self.run(_list_notifications, condition, params, limit)
+
+    # Upload batches
+    async def create_batch(self, batch: Dict[str, Any]) -> None:
+        await self.run(_insert, 'upload_batches', batch)
+
+    async def record_batch_progress(self, batch_id: str, succeeded: bool, reused: bool = False) -> None:
+        """Count one finished file against its batch and close the batch once every file is done"""
+        await self.run(_record_batch_progress, batch_id, succeeded, reused)
+
+    async def touch_batches(self, owner: str, now: str) -> None:
+        """Set the heartbeat of the batches an app instance is still processing"""
+        await self.run(_touch_batches, owner, now)
+
+    async def close_abandoned_batches(self, stale_before: str) -> int:
+        """Close the processing batches without a heartbeat since stale_before, counting
+        their unfinished files as failed. Returns the number of batches closed."""
+        return await self.run(_close_abandoned_batches, stale_before)
+
+    async def get_batch(self, batch_id: str) -> Optional[dict]:
+        return await self.run(_get_batch, batch_id)
+
+    async def batch_documents(self, batch_id: str) -> List[dict]:
+        return await self.run(_batch_documents, batch_id)
+
+    # Dashboard
+    async def document_stats(self, condition: str, params: Sequence[Any], since_day: str) -> dict:
+        """read_document_stats() on a store thread"""
+        return await self.run(read_document_stats, condition, list(params), since_day)
@@ -0,0 +1,63 @@
+"""FTS5 full-text index over the searchable document columns.
+
+`documents_fts` is an external-content FTS5 table: it stores only the index, and the
+column values are read back from `documents` (by rowid = documents.id) when snippet()
+needs them. Triggers keep it in sync with every insert, delete and update of the
+indexed columns, so the ingestion path does not have to know about it.
+
+Searches are ranked with bm25(); a match in the file name weighs more than one in the
+text, summary or key phrases.
+"""
+import re
+from typing import Optional
+
+SEARCH_COLUMNS = ['original_name', 'extracted_text', 'summary', 'key_phrases']
+# bm25() column weights, in SEARCH_COLUMNS order
+SEARCH_WEIGHTS = [10.0, 1.0, 2.0, 2.0]
+
+FULL_TEXT_SEARCH_SCHEMA = [
+    f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+        {', '.join(SEARCH_COLUMNS)},
+        content='documents', content_rowid='id'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts (rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + column for column in SEARCH_COLUMNS)});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts (documents_fts, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + column for column in SEARCH_COLUMNS)});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)} ON documents BEGIN
+        INSERT INTO documents_fts (documents_fts, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + column for column in SEARCH_COLUMNS)});
+        INSERT INTO documents_fts (rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + column for column in SEARCH_COLUMNS)});
+    END
+    ''',
+    # Index the documents stored before the table existed
+    "INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')",
+]
+
+SEARCH_RANK = f"bm25(documents_fts, {', '.join(map(str, SEARCH_WEIGHTS))})"
+# Best matching fragment of the extracted text (column 1), about 16 tokens long
+SEARCH_SNIPPET = "snippet(documents_fts, 1, '<mark>', '</mark>', '...', 16)"
+
+SEARCH_TOKEN = re.compile(r'[^\W_]+')
+
+
+def match_query(search: str) -> Optional[str]:
+    """FTS5 MATCH expression for a search box value: every word must occur, as a word
+    or the start of one (so results narrow while the user types). None if the value
+    has no letters or digits."""
+    tokens = SEARCH_TOKEN.findall(search)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,65 @@
+"""Keyset (cursor) pagination.
+
+A page is the rows sorted after the last row of the previous page, found with a
+row-value comparison on (sort key, unique tie-breaker) instead of OFFSET. With an index
+on the sort key, every page costs the same as the first one however deep it is.
+
+The cursor handed to clients is the last row's sort key and tie-breaker, together with
+the name of the sort order, base64-encoded JSON. Clients treat it as opaque.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetOrder:
+    """A sort order on one key expression, tie-broken by a unique column in the same
+    direction. The key must never be NULL (a row-value comparison with NULL is NULL)."""
+
+    def __init__(self, name: str, key: str, descending: bool = False, tie_breaker: str = 'd.doc_id'):
+        self.name = name
+        self.key = key
+        self.descending = descending
+        self.tie_breaker = tie_breaker
+
+    def order_by(self) -> str:
+        direction = 'DESC' if self.descending else 'ASC'
+        return f"{self.key} {direction}, {self.tie_breaker} {direction}"
+
+    def after(self, cursor: str) -> Tuple[str, List[Any]]:
+        """WHERE condition (with leading AND) and params selecting the rows after a cursor"""
+        key, tie = self.decode(cursor)
+        operator = '<' if self.descending else '>'
+        return f" AND ({self.key}, {self.tie_breaker}) {operator} (?, ?)", [key, tie]
+
+    def encode(self, key: Any, tie: Any) -> str:
+        payload = json.dumps([self.name, key, tie], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode(self, cursor: str) -> Tuple[Any, Any]:
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            name, key, tie = json.loads(payload)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+            raise InvalidCursor(f"Malformed cursor: {e}") from e
+        if name != self.name:
+            raise InvalidCursor(f"Cursor belongs to sort order '{name}', not '{self.name}'")
+        return key, tie
+
+
+def next_cursor(order: KeysetOrder, rows: list, page_size: int, key_index: int, tie_index: int) -> Optional[str]:
+    """Cursor after the last row of a page, or None when it is the last page.
+
+    `rows` is the result of a query with LIMIT page_size + 1; the extra row (which is
+    dropped from `rows`) only tells whether another page follows.
+    """
+    if len(rows) <= page_size:
+        return None
+    del rows[page_size:]
+    last = rows[-1]
+    return order.encode(last[key_index], last[tie_index])
@@ -0,0 +1,66 @@
+"""Versioned SQLite schema migrations.
+
+The schema version is kept in `PRAGMA user_version`. Each migration runs in its own
+transaction together with its query plan checks: after its statements, EXPLAIN QUERY
+PLAN of every check query must show the expected index, otherwise the migration is
+rolled back and MigrationError is raised.
+"""
+import sqlite3
+from typing import List, Sequence, Tuple
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, version: int, name: str, statements: Sequence[str],
+                 plan_checks: Sequence[Tuple[str, str]] = ()):
+        self.version = version
+        self.name = name
+        self.statements = list(statements)
+        self.plan_checks = list(plan_checks)  # (query, index the query must use)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def query_plan(conn: sqlite3.Connection, query: str) -> List[str]:
+    """EXPLAIN QUERY PLAN details of a query; its ? parameters are bound to NULL"""
+    params = [None] * query.count('?')
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+
+
+def uses_index(plan: Sequence[str], index: str) -> bool:
+    return any(f'INDEX {index} ' in detail + ' ' for detail in plan)
+
+
+def run_migrations(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> List[int]:
+    """Apply the migrations newer than the database's schema version, in order"""
+    applied = []
+    current = schema_version(conn)
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= current:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN')
+        try:
+            for statement in migration.statements:
+                conn.execute(statement)
+            for query, index in migration.plan_checks:
+                plan = query_plan(conn, query)
+                if not uses_index(plan, index):
+                    raise MigrationError(
+                        f"Migration {migration.version} ({migration.name}): query does not use {index}: "
+                        f"{' | '.join(plan)}"
+                    )
+            conn.execute(f'PRAGMA user_version = {int(migration.version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Applied migration {migration.version}: {migration.name}")
+        applied.append(migration.version)
+    return applied
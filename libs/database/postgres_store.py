@@ -0,0 +1,389 @@
+"""PostgreSQL implementation of the DocumentStore interface.
+
+Selected with IDCR_DATABASE_URL=postgresql://..., so that several app instances can
+share one database. Queries run on an asyncpg connection pool, with no threads
+involved. As in the SQLite store, each method runs its statements in one transaction.
+
+Schema differences from SQLite:
+
+- key_phrases and entities are JSONB columns; they are still written and read as JSON
+  text, as with SQLite.
+- Timestamps are stored as text in SQLite's format ('YYYY-MM-DD HH:MM:SS', UTC), so API
+  responses and keyset cursors are the same on both backends.
+- Full-text search uses a generated tsvector column with a GIN index instead of FTS5.
+- /api/stats aggregates `documents` directly, using the indexes on its filter columns.
+  It does not use trigger-maintained counters, because their few hot rows would
+  serialize concurrent uploads from several instances.
+
+The tables live in their own schema (`idcr` by default). This keeps them apart from
+the microservice tables that infrastructure/db/init.sql creates in `public`.
+"""
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+from libs.database.document_stats import tally_document_stats
+from libs.database.full_text_search import SEARCH_TOKEN
+
+NOW = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+# Text beyond this many characters is not indexed (a tsvector is limited to 1 MB)
+SEARCH_TEXT_LIMIT = 200000
+
+POSTGRES_SCHEMA = [
+    f'''
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL PRIMARY KEY,
+        full_name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        department TEXT NOT NULL,
+        role TEXT DEFAULT 'employee',
+        created_at TEXT DEFAULT {NOW}
+    )
+    ''',
+    f'''
+    CREATE TABLE IF NOT EXISTS documents (
+        id BIGSERIAL PRIMARY KEY,
+        doc_id TEXT UNIQUE NOT NULL,
+        original_name TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        file_size BIGINT NOT NULL,
+        file_type TEXT NOT NULL,
+        uploaded_by TEXT NOT NULL,
+        uploaded_at TEXT DEFAULT {NOW},
+        batch_name TEXT,
+        extracted_text TEXT,
+        document_type TEXT,
+        department TEXT,
+        priority TEXT DEFAULT 'medium',
+        classification_source TEXT,
+        processing_status TEXT DEFAULT 'uploaded',
+        review_status TEXT DEFAULT 'pending',
+        reviewed_by TEXT,
+        reviewed_at TEXT,
+        review_comments TEXT,
+        risk_score DOUBLE PRECISION DEFAULT 0.0,
+        confidentiality_percent DOUBLE PRECISION DEFAULT 0.0,
+        sentiment TEXT DEFAULT 'neutral',
+        summary TEXT,
+        key_phrases JSONB,
+        entities JSONB,
+        routed_to TEXT,
+        routing_reason TEXT,
+        batch_id TEXT,
+        content_hash TEXT,
+        -- Weighted like the FTS5 ranking: file name first, then summary and key phrases, then text
+        search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', COALESCE(original_name, '')), 'A') ||
+            setweight(to_tsvector('simple', COALESCE(summary, '')), 'B') ||
+            setweight(to_tsvector('simple', COALESCE(key_phrases::text, '')), 'B') ||
+            setweight(to_tsvector('simple', left(COALESCE(extracted_text, ''), {SEARCH_TEXT_LIMIT})), 'D')
+        ) STORED
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS upload_batches (
+        batch_id TEXT PRIMARY KEY,
+        batch_name TEXT,
+        uploaded_by TEXT NOT NULL,
+        total_files INTEGER NOT NULL,
+        processed_files INTEGER DEFAULT 0,
+        failed_files INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'processing',
+        created_at TEXT DEFAULT {now},
+        completed_at TEXT,
+        reused_files INTEGER DEFAULT 0,
+        deduplicated_bytes BIGINT DEFAULT 0,
+        owner TEXT,
+        heartbeat_at TEXT
+    )
+    '''.format(now=NOW),
+    # Tables created before batches had an owner instance and heartbeat
+    'ALTER TABLE upload_batches ADD COLUMN IF NOT EXISTS owner TEXT',
+    'ALTER TABLE upload_batches ADD COLUMN IF NOT EXISTS heartbeat_at TEXT',
+    'CREATE INDEX IF NOT EXISTS idx_upload_batches_status_heartbeat_at ON upload_batches (status, heartbeat_at)',
+    # Documents tables created before classifications recorded their source
+    'ALTER TABLE documents ADD COLUMN IF NOT EXISTS classification_source TEXT',
+    # No foreign key to documents: the routing notification is logged before its document is stored
+    f'''
+    CREATE TABLE IF NOT EXISTS email_notifications (
+        id BIGSERIAL PRIMARY KEY,
+        doc_id TEXT NOT NULL,
+        sent_by TEXT NOT NULL,
+        received_by TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body_preview TEXT,
+        email_type TEXT DEFAULT 'notification',
+        status TEXT DEFAULT 'sent',
+        sent_at TEXT DEFAULT {NOW},
+        document_name TEXT,
+        department TEXT,
+        priority TEXT DEFAULT 'medium'
+    )
+    ''',
+    # The indexes of the SQLite schema migrations, plus the full-text index
+    'CREATE INDEX IF NOT EXISTS idx_documents_department_uploaded_at ON documents (department, uploaded_at)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_uploaded_by_uploaded_at ON documents (uploaded_by, uploaded_at)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_review_status_uploaded_at ON documents (review_status, uploaded_at)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_processing_status_uploaded_at ON documents (processing_status, uploaded_at)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_uploaded_at ON documents (uploaded_at)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_batch_id ON documents (batch_id)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_search_vector ON documents USING GIN (search_vector)',
+    'CREATE INDEX IF NOT EXISTS idx_email_notifications_sent_by_sent_at ON email_notifications (sent_by, sent_at)',
+    'CREATE INDEX IF NOT EXISTS idx_email_notifications_received_by_sent_at ON email_notifications (received_by, sent_at)',
+    'CREATE INDEX IF NOT EXISTS idx_email_notifications_department_sent_at ON email_notifications (department, sent_at)',
+    'CREATE INDEX IF NOT EXISTS idx_email_notifications_sent_at ON email_notifications (sent_at)',
+]
+
+# Every column but search_vector, for SELECT * equivalents
+DOCUMENT_COLUMNS = (
+    'id, doc_id, original_name, file_path, file_size, file_type, uploaded_by, uploaded_at, batch_name,'
+    ' extracted_text, document_type, department, priority, processing_status, review_status, reviewed_by,'
+    ' reviewed_at, review_comments, risk_score, confidentiality_percent, sentiment, summary, key_phrases,'
+    ' entities, routed_to, routing_reason, batch_id, content_hash'
+)
+SEARCH_SNIPPET = (
+    "ts_headline('simple', d.extracted_text, search_query,"
+    " 'StartSel=<mark>, StopSel=</mark>, MaxFragments=1, MaxWords=16, MinWords=6')"
+)
+SCHEMA_LOCK = 0x1DC2  # advisory lock held while an instance creates the tables
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+def numbered_placeholders(query: str) -> str:
+    """The query with its ? placeholders numbered $1, $2, ... for asyncpg. Question marks
+    inside string literals are left alone."""
+    parts = query.split("'")
+    numbers = iter(range(1, query.count('?') + 1))
+    for i in range(0, len(parts), 2):  # even parts are outside string literals
+        parts[i] = re.sub(r'\?', lambda _: f'${next(numbers)}', parts[i])
+    return "'".join(parts)
+
+
+def _insert_query(table: str, values: Dict[str, Any]) -> str:
+    # Column names come from the callers' code, never from request data
+    return f"INSERT INTO {table} ({', '.join(values)}) VALUES ({', '.join('?' for _ in values)})"
+
+
+class PostgresDocumentStore:
+    """The queries of the API on PostgreSQL, with the same methods as DocumentStore.
+
+    Each app instance keeps between `min_size` and `max_size` connections open, so the
+    database's max_connections must cover every instance's `max_size`.
+    """
+
+    backend = 'postgresql'
+    # Sort key of search results, best match first (negated so that lower is better, as with bm25)
+    search_rank = "-ts_rank(d.search_vector, search_query)"
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 8, schema: str = 'idcr'):
+        if not IDENTIFIER.fullmatch(schema):
+            raise ValueError(f"Invalid schema name: {schema!r}")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.schema = schema
+        self._pool = None
+
+    async def open(self) -> bool:
+        """Connect, and create the schema unless another instance already did. Returns
+        whether the tables were created (and need the demo users)."""
+        if asyncpg is None:
+            raise RuntimeError("The PostgreSQL backend needs asyncpg: pip install asyncpg")
+        self._pool = await asyncpg.create_pool(
+            self.dsn, min_size=min(self.min_size, self.max_size), max_size=self.max_size,
+            server_settings={'search_path': self.schema, 'application_name': 'idcr'}
+        )
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                # Instances starting together create the tables one at a time
+                await conn.execute('SELECT pg_advisory_xact_lock($1)', SCHEMA_LOCK)
+                created = await conn.fetchval("SELECT to_regclass('users') IS NULL")
+                await conn.execute(f'CREATE SCHEMA IF NOT EXISTS "{self.schema}"')
+                for statement in POSTGRES_SCHEMA:
+                    await conn.execute(statement)
+        return created
+
+    async def close(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
+
+    async def _fetch(self, query: str, params: Sequence[Any] = ()) -> list:
+        async with self._pool.acquire() as conn:
+            return await conn.fetch(numbered_placeholders(query), *params)
+
+    async def _fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[dict]:
+        async with self._pool.acquire() as conn:
+            row = await conn.fetchrow(numbered_placeholders(query), *params)
+        return dict(row) if row is not None else None
+
+    async def _execute(self, query: str, params: Sequence[Any] = ()) -> str:
+        async with self._pool.acquire() as conn:
+            return await conn.execute(numbered_placeholders(query), *params)
+
+    # Users
+    async def get_user(self, email: str) -> Optional[dict]:
+        return await self._fetch_one('SELECT * FROM users WHERE email = ?', [email])
+
+    async def user_names(self) -> Dict[str, str]:
+        """Full name of every user, by email"""
+        return {row['email']: row['full_name'] for row in await self._fetch('SELECT email, full_name FROM users')}
+
+    async def create_user(self, user: Dict[str, Any]) -> bool:
+        """Insert a users row; False if the email is already registered"""
+        try:
+            await self._execute(_insert_query('users', user), list(user.values()))
+        except asyncpg.UniqueViolationError:
+            return False
+        return True
+
+    # Documents
+    def search_clause(self, search: str) -> Tuple[str, str, str, List[Any]]:
+        """(select columns, join, condition, params) restricting a query on `documents d` to
+        the documents matching a search box value, with `snippet` and `search_rank` columns
+        like DocumentStore.search_clause. Every word must occur, as a word or the start of one."""
+        tokens = SEARCH_TOKEN.findall(search)
+        if not tokens:
+            # No words to look up in the full-text index: match the file name
+            return ", NULL AS snippet, NULL AS search_rank", "", " AND d.original_name ILIKE ?", [f"%{search}%"]
+        return (
+            f", {SEARCH_SNIPPET} AS snippet, {self.search_rank} AS search_rank",
+            " CROSS JOIN to_tsquery('simple', ?) AS search_query",
+            " AND d.search_vector @@ search_query",
+            [' & '.join(f'{token}:*' for token in tokens)]
+        )
+
+    async def count_documents(self, join: str, conditions: str, params: Sequence[Any]) -> int:
+        async with self._pool.acquire() as conn:
+            return await conn.fetchval(
+                numbered_placeholders(f'SELECT COUNT(*) FROM documents d{join} WHERE 1=1{conditions}'), *params
+            )
+
+    async def list_documents(self, columns: str, join: str, conditions: str, params: Sequence[Any],
+                             order_by: str, limit: int) -> list:
+        """SELECT columns FROM documents d{join} WHERE 1=1{conditions} ORDER BY order_by LIMIT limit"""
+        return await self._fetch(
+            f'SELECT {columns} FROM documents d{join} WHERE 1=1{conditions} ORDER BY {order_by} LIMIT ?',
+            [*params, limit]
+        )
+
+    async def get_document(self, doc_id: str) -> Optional[dict]:
+        return await self._fetch_one(f'SELECT {DOCUMENT_COLUMNS} FROM documents WHERE doc_id = ?', [doc_id])
+
+    async def insert_document(self, document: Dict[str, Any]) -> None:
+        await self._execute(_insert_query('documents', document), list(document.values()))
+
+    async def record_review(self, doc_id: str, review: Dict[str, Any], notification: Dict[str, Any]) -> bool:
+        """Set the review columns of a document and log the notification to its uploader
+        together; False (and nothing written) if the document does not exist"""
+        assignments = ', '.join(f'{column} = ?' for column in review)
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                status = await conn.execute(
+                    numbered_placeholders(f'UPDATE documents SET {assignments} WHERE doc_id = ?'),
+                    *review.values(), doc_id
+                )
+                if status == 'UPDATE 0':
+                    return False
+                await conn.execute(
+                    numbered_placeholders(_insert_query('email_notifications', notification)), *notification.values()
+                )
+        return True
+
+    async def find_classified_by_hash(self, content_hash: str) -> Optional[dict]:
+        """Pipeline results of the first classified document with this content, if any"""
+        return await self._fetch_one('''
+            SELECT extracted_text, document_type, department, priority, classification_source, risk_score,
+                   confidentiality_percent, sentiment, summary, key_phrases, entities
+            FROM documents
+            WHERE content_hash = ? AND processing_status = 'classified'
+            ORDER BY id LIMIT 1
+        ''', [content_hash])
+
+    # Notifications
+    async def insert_notification(self, notification: Dict[str, Any]) -> None:
+        await self._execute(_insert_query('email_notifications', notification), list(notification.values()))
+
+    async def list_notifications(self, condition: str, params: Sequence[Any], limit: int = 50) -> List[dict]:
+        """Newest notifications first, each with the sender's full name as sent_by_name"""
+        rows = await self._fetch(f'''
+            SELECT e.*, u.full_name AS sent_by_name
+            FROM email_notifications e
+            LEFT JOIN users u ON e.sent_by = u.email
+            WHERE 1=1{condition}
+            ORDER BY e.sent_at DESC LIMIT ?
+        ''', list(params) + [limit])
+        return [dict(row) for row in rows]
+
+    # Upload batches
+    async def create_batch(self, batch: Dict[str, Any]) -> None:
+        await self._execute(_insert_query('upload_batches', batch), list(batch.values()))
+
+    async def record_batch_progress(self, batch_id: str, succeeded: bool, reused: bool = False) -> None:
+        """Count one finished file against its batch and close the batch once every file is done"""
+        # One statement: the row lock orders concurrent updates from every instance
+        await self._execute(f'''
+            UPDATE upload_batches
+            SET processed_files = processed_files + ?, failed_files = failed_files + ?,
+                reused_files = reused_files + ?,
+                status = CASE
+                    WHEN status <> 'processing' OR processed_files + failed_files + 1 < total_files THEN status
+                    WHEN failed_files + ? >= total_files THEN 'failed' ELSE 'completed' END,
+                completed_at = CASE
+                    WHEN status = 'processing' AND processed_files + failed_files + 1 >= total_files
+                    THEN {NOW} ELSE completed_at END
+            WHERE batch_id = ?
+        ''', [1 if succeeded else 0, 0 if succeeded else 1, 1 if reused else 0, 0 if succeeded else 1, batch_id])
+
+    async def touch_batches(self, owner: str, now: str) -> None:
+        """Set the heartbeat of the batches an app instance is still processing"""
+        await self._execute(
+            "UPDATE upload_batches SET heartbeat_at = ? WHERE owner = ? AND status = 'processing'", [now, owner]
+        )
+
+    async def close_abandoned_batches(self, stale_before: str) -> int:
+        """Close the processing batches without a heartbeat since stale_before, counting
+        their unfinished files as failed. Returns the number of batches closed."""
+        status = await self._execute(f'''
+            UPDATE upload_batches
+            SET failed_files = total_files - processed_files,
+                status = CASE WHEN processed_files = 0 THEN 'failed' ELSE 'completed' END,
+                completed_at = {NOW}
+            WHERE status = 'processing' AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+        ''', [stale_before])
+        return int(status.split()[-1])  # 'UPDATE <count>'
+
+    async def get_batch(self, batch_id: str) -> Optional[dict]:
+        return await self._fetch_one('SELECT * FROM upload_batches WHERE batch_id = ?', [batch_id])
+
+    async def batch_documents(self, batch_id: str) -> List[dict]:
+        rows = await self._fetch('''
+            SELECT original_name, doc_id, document_type, department, priority, summary, routing_reason
+            FROM documents WHERE batch_id = ? ORDER BY id
+        ''', [batch_id])
+        return [dict(row) for row in rows]
+
+    # Dashboard
+    async def document_stats(self, condition: str, params: Sequence[Any], since_day: str) -> dict:
+        """The counters of read_document_stats(), counted from `documents` in one snapshot"""
+        params = list(params)
+        async with self._pool.acquire() as conn:
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                buckets = await conn.fetch(numbered_placeholders(f'''
+                    SELECT document_type, department, priority,
+                           processing_status IN ('classified', 'completed'), review_status = 'pending', COUNT(*)
+                    FROM documents WHERE 1=1{condition}
+                    GROUP BY 1, 2, 3, 4, 5
+                '''), *params)
+                daily = await conn.fetch(numbered_placeholders(f'''
+                    SELECT substr(uploaded_at, 1, 10), COUNT(*)
+                    FROM documents WHERE uploaded_at >= ?{condition}
+                    GROUP BY 1
+                '''), since_day, *params)
+        return tally_document_stats(buckets, daily)
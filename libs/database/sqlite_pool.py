@@ -0,0 +1,80 @@
+"""Thread-safe pool of SQLite connections opened in WAL mode.
+
+In WAL mode readers never block the writer and the writer never blocks readers, so
+dashboard queries keep working while uploads are being stored. Connections are opened
+once and reused, which also keeps SQLite's page cache warm between requests.
+"""
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set
+
+# Applied to every new connection. journal_mode is stored in the database file itself.
+DEFAULT_PRAGMAS: Dict[str, object] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',   # durable in WAL mode except for the last commits on power loss
+    'busy_timeout': 5000,      # ms to wait for the write lock instead of failing
+    'cache_size': -32000,      # KiB (32 MB) per connection
+    'mmap_size': 268435456,    # 256 MB of the file read through the page cache
+    'temp_store': 'MEMORY',
+}
+
+
+class SQLitePool:
+    """Hands out connections to one SQLite database.
+
+    `acquire()` returns an idle connection or opens a new one (it never blocks), and
+    `release(conn)` puts it back; up to `size` idle connections are kept open.
+    Uncommitted changes are rolled back on release, as closing the connection would,
+    and the row factory is reset. Releasing a connection twice is harmless.
+    """
+
+    def __init__(self, database_file: str, size: int = 8, pragmas: Optional[Dict[str, object]] = None):
+        self.database_file = database_file
+        self.size = max(1, size)
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._idle: List[sqlite3.Connection] = []
+        # ids only: a connection a handler never releases is still closed when collected
+        self._in_use: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        timeout = float(self.pragmas.get('busy_timeout', 5000)) / 1000
+        # Connections move between worker threads, but only one thread uses each at a time
+        conn = sqlite3.connect(self.database_file, timeout=timeout, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        with self._lock:
+            self._in_use.add(id(conn))
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if id(conn) not in self._in_use:
+                return
+            self._in_use.discard(id(conn))
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None  # handlers may set their own
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close the idle connections; the pool opens new ones if used again"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
@@ -0,0 +1,184 @@
+"""Message brokers for the document processing pipeline.
+
+Messages are JSON objects published to named queues. A consumer handles up to
+`prefetch` of its queue's messages at a time. A message is acknowledged when its
+handler returns and rejected (dropped) when the handler raises, so handlers deal with
+their own failures. Consumers of the same queue compete for its messages, which is
+how the pipeline scales: every replica of a stage takes its share.
+
+RabbitMQBroker keeps durable queues and persistent messages on RabbitMQ (with aio-pika).
+InMemoryBroker keeps the queues in this process, so the pipeline can be run and tested
+without a RabbitMQ server.
+"""
+import asyncio
+import json
+import uuid
+from typing import Awaitable, Callable, Dict, Set
+
+try:
+    import aio_pika
+except ImportError:
+    aio_pika = None
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+async def _handle(queue: str, handler: Handler, body: bytes) -> bool:
+    """Run the handler on one message; False if it raised (the message is rejected)"""
+    try:
+        await handler(json.loads(body))
+        return True
+    except Exception as e:
+        print(f"Message on {queue} rejected: {str(e)}")
+        return False
+
+
+class InMemoryBroker:
+    """Queues of this process; messages go through JSON as they would on RabbitMQ"""
+
+    backend = 'memory'
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._consumers: Dict[str, asyncio.Task] = {}
+        self._handlers: Set[asyncio.Task] = set()
+        self._pending = 0  # published and not yet handled
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def _queue(self, name: str) -> asyncio.Queue:
+        return self._queues.setdefault(name, asyncio.Queue())
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        tasks = list(self._consumers.values()) + list(self._handlers)
+        self._consumers.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def declare_queue(self, name: str, exclusive: bool = False) -> None:
+        self._queue(name)
+
+    async def publish(self, queue: str, message: dict) -> None:
+        self._pending += 1
+        self._idle.clear()
+        self._queue(queue).put_nowait(json.dumps(message).encode('utf-8'))
+
+    async def consume(self, queue: str, handler: Handler, prefetch: int = 1) -> str:
+        """Start delivering the queue's messages to handler; returns the consumer tag"""
+        tag = uuid.uuid4().hex
+        self._consumers[tag] = asyncio.create_task(self._deliver(queue, handler, prefetch))
+        return tag
+
+    async def cancel(self, tag: str) -> None:
+        task = self._consumers.pop(tag, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _deliver(self, queue: str, handler: Handler, prefetch: int) -> None:
+        unacked = asyncio.Semaphore(prefetch)
+        messages = self._queue(queue)
+        while True:
+            await unacked.acquire()
+            try:
+                body = await messages.get()
+            except asyncio.CancelledError:
+                unacked.release()
+                raise
+            task = asyncio.create_task(self._run(queue, handler, body, unacked))
+            self._handlers.add(task)
+            task.add_done_callback(self._handlers.discard)
+
+    async def _run(self, queue: str, handler: Handler, body: bytes, unacked: asyncio.Semaphore) -> None:
+        try:
+            await _handle(queue, handler, body)
+        finally:
+            unacked.release()
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.set()
+
+    async def join(self) -> None:
+        """Wait until every published message (including those published by handlers) is handled"""
+        await self._idle.wait()
+
+
+class RabbitMQBroker:
+    """Queues on a RabbitMQ server. Each consumer gets its own channel, whose QoS
+    prefetch count bounds the messages it handles at a time."""
+
+    backend = 'rabbitmq'
+
+    def __init__(self, url: str):
+        self.url = url
+        self._connection = None
+        self._channel = None
+        self._exclusive: Dict[str, bool] = {}
+        self._consumers: Dict[str, tuple] = {}
+
+    async def connect(self) -> None:
+        if aio_pika is None:
+            raise RuntimeError("The RabbitMQ broker needs aio-pika: pip install aio-pika")
+        # Reconnects (and restores queues and consumers) after a broker restart
+        self._connection = await aio_pika.connect_robust(self.url)
+        self._channel = await self._connection.channel()
+
+    async def close(self) -> None:
+        self._consumers.clear()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _declare(self, channel, name: str):
+        # Stage queues outlive their consumers; exclusive (reply) queues go with the connection
+        exclusive = self._exclusive.get(name, False)
+        return await channel.declare_queue(name, durable=not exclusive, exclusive=exclusive, auto_delete=exclusive)
+
+    async def declare_queue(self, name: str, exclusive: bool = False) -> None:
+        self._exclusive[name] = exclusive
+        await self._declare(self._channel, name)
+
+    async def publish(self, queue: str, message: dict) -> None:
+        await self._channel.default_exchange.publish(
+            aio_pika.Message(
+                json.dumps(message).encode('utf-8'),
+                content_type='application/json',
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+            ),
+            routing_key=queue
+        )
+
+    async def consume(self, queue: str, handler: Handler, prefetch: int = 1) -> str:
+        channel = await self._connection.channel()
+        await channel.set_qos(prefetch_count=prefetch)
+        declared = await self._declare(channel, queue)
+
+        async def on_message(message) -> None:
+            if await _handle(queue, handler, message.body):
+                await message.ack()
+            else:
+                await message.reject(requeue=False)
+
+        tag = await declared.consume(on_message)
+        self._consumers[tag] = (channel, declared)
+        return tag
+
+    async def cancel(self, tag: str) -> None:
+        consumer = self._consumers.pop(tag, None)
+        if consumer is not None:
+            channel, declared = consumer
+            await declared.cancel(tag)
+            await channel.close()
+
+
+def create_broker(url: str):
+    """RabbitMQBroker for amqp:// URLs, InMemoryBroker for memory://"""
+    if url.startswith(('amqp://', 'amqps://')):
+        return RabbitMQBroker(url)
+    if url == 'memory://':
+        return InMemoryBroker()
+    raise ValueError("The broker URL must be an amqp:// URL or memory://")
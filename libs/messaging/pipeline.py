@@ -0,0 +1,127 @@
+"""Queue-based document pipeline: extracted -> classify -> analyze -> route -> notify.
+
+The app extracts a document's text and publishes it as a pipeline message. The
+classification, content_analysis and routing_engine services each consume their own
+queue. Each one adds its result to the message under its stage name and passes the
+message on.
+
+A message carries a routing slip, `stages`: the queues it still has to visit, in
+order. The stage consumer that finishes with a message publishes it to the next queue
+on the slip, and the last one to `reply_to`, the notify queue of the app instance that
+published it. Stages keep no state, so any replica can take any message, and
+throughput grows with the number of consumers. A stage that fails records its error
+under `errors` and still passes the message on; the app falls back to its local rules
+for whatever is missing.
+"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from libs.messaging.broker import create_broker
+
+CLASSIFY_QUEUE = 'idcr.classify'
+ANALYZE_QUEUE = 'idcr.analyze'
+ROUTE_QUEUE = 'idcr.route'
+# Stage name (the key of its result in a message) -> its queue
+STAGE_QUEUES = {
+    'classification': CLASSIFY_QUEUE,
+    'analysis': ANALYZE_QUEUE,
+    'routing': ROUTE_QUEUE,
+}
+
+Process = Callable[[dict], Awaitable[Any]]
+
+
+async def forward(broker, message: dict) -> None:
+    """Publish a message to the next queue on its routing slip, or to its reply queue"""
+    stages = message['stages']
+    if stages:
+        await broker.publish(stages[0], {**message, 'stages': stages[1:]})
+    else:
+        await broker.publish(message['reply_to'], message)
+
+
+async def run_stage(broker, stage: str, process: Process, prefetch: int = 1) -> str:
+    """Consume the queue of `stage`: message[stage] = await process(message), then forward.
+    Returns the consumer tag."""
+    queue = STAGE_QUEUES[stage]
+
+    async def handle(message: dict) -> None:
+        try:
+            message[stage] = await process(message)
+        except Exception as e:
+            print(f"Stage {stage} failed for document {message.get('doc_id')}: {str(e)}")
+            message.setdefault('errors', {})[stage] = str(e)
+        await forward(broker, message)
+
+    await broker.declare_queue(queue)
+    return await broker.consume(queue, handle, prefetch)
+
+
+@asynccontextmanager
+async def consume_stage(broker_url: str, stage: str, process: Process, prefetch: int) -> AsyncIterator[None]:
+    """Consume the queue of `stage` on the broker at broker_url for the duration of the
+    block (for a service's lifespan); does nothing when broker_url is empty"""
+    if not broker_url:
+        yield
+        return
+    broker = create_broker(broker_url)
+    await broker.connect()
+    try:
+        await run_stage(broker, stage, process, prefetch)
+        yield
+    finally:
+        await broker.close()
+
+
+class PipelineClient:
+    """The app's end of the pipeline: publishes documents and awaits their results on
+    this instance's own notify queue."""
+
+    def __init__(self, broker, timeout: float = 300.0, reply_prefetch: int = 100):
+        self.broker = broker
+        self.timeout = timeout
+        self.reply_prefetch = reply_prefetch
+        self.reply_queue = f"idcr.notify.{uuid.uuid4().hex}"
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._consumer: Optional[str] = None
+
+    async def open(self) -> None:
+        # Stage queues keep messages published before their consumers start
+        for queue in STAGE_QUEUES.values():
+            await self.broker.declare_queue(queue)
+        await self.broker.declare_queue(self.reply_queue, exclusive=True)
+        self._consumer = await self.broker.consume(self.reply_queue, self._on_reply, self.reply_prefetch)
+
+    async def close(self) -> None:
+        if self._consumer is not None:
+            await self.broker.cancel(self._consumer)
+            self._consumer = None
+
+    async def _on_reply(self, message: dict) -> None:
+        future = self._pending.get(message.get('correlation_id'))
+        if future is None or future.done():
+            print(f"Dropping late pipeline result for document {message.get('doc_id')}")
+            return
+        future.set_result(message)
+
+    async def run(self, document: Dict[str, Any], stages: List[str]) -> dict:
+        """Send a document through the given stages; returns the message as the last
+        stage left it. Raises asyncio.TimeoutError after `timeout` seconds, and the
+        broker's error when the document cannot be published."""
+        correlation_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[correlation_id] = future
+        message = {
+            **document,
+            'correlation_id': correlation_id,
+            'reply_to': self.reply_queue,
+            'stages': [STAGE_QUEUES[stage] for stage in stages],
+            'errors': {},
+        }
+        try:
+            await forward(self.broker, message)
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            del self._pending[correlation_id]
@@ -0,0 +1,314 @@
+"""Content-addressed storage for uploaded files.
+
+Files are stored once per content under content_key(sha256), so identical uploads share
+one blob. LocalBlobStore keeps them in a directory of this node; S3BlobStore keeps them
+in a bucket of MinIO or any other S3-compatible service, which every app instance can
+reach. Both offer the same async methods:
+
+    put_file(key, path)      move a staged file into the store (False if the key was new)
+    read(key, start, length) bytes of a blob, or a range of them
+    local_file(key)          async context manager yielding a local path to a blob, for
+                             parsers (PDF, DOCX) that need a real file
+    location(key)            where the blob lives, as stored in documents.file_path
+
+S3BlobStore talks to the S3 REST API over its own httpx client and signs requests with
+AWS Signature Version 4, so no SDK is needed. Files larger than `part_size` are sent as a
+multipart upload, one part in memory at a time.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024  # S3 parts must be at least 5MB, except the last one
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStoreError(Exception):
+    """The blob store could not be reached or refused a request"""
+
+
+def content_key(content_hash: str) -> str:
+    """Key of a blob from the SHA-256 of its content, fanned out by the first two hex digits"""
+    return f"{content_hash[:2]}/{content_hash}"
+
+
+def _byte_range(start: int, length: Optional[int]) -> str:
+    return f"bytes={start}-" if length is None else f"bytes={start}-{start + length - 1}"
+
+
+class LocalBlobStore:
+    """Blobs as files under `root` (root/ab/abcd...)"""
+
+    backend = 'local'
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self.root.mkdir, parents=True, exist_ok=True)
+
+    async def close(self) -> None:
+        pass
+
+    def location(self, key: str) -> str:
+        return str(self.root / key)
+
+    def _put_file(self, key: str, file_path: str) -> bool:
+        blob_path = self.root / key
+        if blob_path.exists():
+            os.remove(file_path)
+            return True
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(file_path, blob_path)
+        return False
+
+    async def put_file(self, key: str, file_path: str) -> bool:
+        """Move file_path into the store under key. Returns True (and deletes file_path)
+        when the key was already stored."""
+        return await asyncio.to_thread(self._put_file, key, file_path)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread((self.root / key).exists)
+
+    def _read(self, key: str, start: int, length: Optional[int]) -> bytes:
+        try:
+            with open(self.root / key, 'rb') as file:
+                file.seek(start)
+                return file.read() if length is None else file.read(length)
+        except FileNotFoundError:
+            raise BlobStoreError(f"Blob {key} not found")
+
+    async def read(self, key: str, start: int = 0, length: Optional[int] = None) -> bytes:
+        return await asyncio.to_thread(self._read, key, start, length)
+
+    @asynccontextmanager
+    async def local_file(self, key: str) -> AsyncIterator[str]:
+        yield self.location(key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread((self.root / key).unlink, True)
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def sign_request(method: str, url: str, headers: Dict[str, str], payload_hash: str, access_key: str,
+                 secret_key: str, region: str, amz_date: str, service: str = 's3') -> str:
+    """Authorization header of an AWS Signature Version 4 request.
+
+    Every header in `headers` (which must include host, x-amz-date and, for S3,
+    x-amz-content-sha256) is signed. `url` must already be percent-encoded.
+    """
+    parts = urlsplit(url)
+    query = sorted(
+        (name, value)
+        for name, _, value in (pair.partition('=') for pair in parts.query.split('&') if pair)
+    )
+    canonical_query = '&'.join(f"{name}={value}" for name, value in query)
+    signed = {name.lower(): ' '.join(str(value).split()) for name, value in headers.items()}
+    signed_headers = ';'.join(sorted(signed))
+    canonical_headers = ''.join(f"{name}:{signed[name]}\n" for name in sorted(signed))
+    canonical_request = '\n'.join([
+        method, parts.path or '/', canonical_query, canonical_headers, signed_headers, payload_hash
+    ])
+
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+    ])
+    signing_key = _hmac(_hmac(_hmac(_hmac(('AWS4' + secret_key).encode('utf-8'), amz_date[:8]), region),
+                              service), 'aws4_request')
+    signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    return (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}")
+
+
+def _read_part(file_path: str, offset: int, size: int) -> Tuple[bytes, str]:
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        data = file.read(size)
+    return data, hashlib.sha256(data).hexdigest()
+
+
+def _xml_text(body: bytes, tag: str) -> Optional[str]:
+    """Text of the first <tag> element of an S3 response, ignoring the namespace"""
+    for element in ET.fromstring(body).iter():
+        if element.tag.rsplit('}', 1)[-1] == tag:
+            return element.text
+    return None
+
+
+class S3BlobStore:
+    """Blobs as objects of an S3-compatible bucket, addressed path-style
+    (endpoint_url/bucket/key) as MinIO expects."""
+
+    backend = 's3'
+
+    def __init__(self, endpoint_url: str, bucket: str, access_key: str, secret_key: str,
+                 region: str = 'us-east-1', part_size: int = DEFAULT_PART_SIZE,
+                 timeout: float = 60.0):
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = part_size
+        self.timeout = timeout
+        self._host = urlsplit(self.endpoint_url).netloc
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def open(self) -> None:
+        """Connect, and create the bucket if it does not exist yet"""
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._request('HEAD', '')
+        if response.status_code == 404:
+            body = b''
+            if self.region != 'us-east-1':
+                body = (f'<CreateBucketConfiguration><LocationConstraint>{self.region}'
+                        f'</LocationConstraint></CreateBucketConfiguration>').encode('utf-8')
+            response = await self._request('PUT', '', body=body)
+            if response.status_code == 409:  # created meanwhile by another instance
+                return
+        self._check(response, f"bucket {self.bucket}")
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def location(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def _url(self, key: str, query: str = '') -> str:
+        path = f"/{quote(self.bucket)}/{quote(key, safe='/-_.~')}" if key else f"/{quote(self.bucket)}"
+        return f"{self.endpoint_url}{path}" + (f"?{query}" if query else '')
+
+    def _build(self, method: str, key: str, query: str = '', body: bytes = b'',
+               payload_hash: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Request:
+        url = self._url(key, query)
+        amz_date = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        payload_hash = payload_hash or hashlib.sha256(body).hexdigest()
+        signed = {'host': self._host, 'x-amz-content-sha256': payload_hash, 'x-amz-date': amz_date,
+                  **(headers or {})}
+        signed['authorization'] = sign_request(method, url, signed, payload_hash, self.access_key,
+                                               self.secret_key, self.region, amz_date)
+        return self._client.build_request(method, url, content=body, headers=signed)
+
+    async def _request(self, method: str, key: str, query: str = '', body: bytes = b'',
+                       payload_hash: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        if self._client is None:
+            raise BlobStoreError("The blob store is not open")
+        try:
+            return await self._client.send(self._build(method, key, query, body, payload_hash, headers))
+        except httpx.HTTPError as e:
+            raise BlobStoreError(f"S3 request failed: {e}") from e
+
+    @staticmethod
+    def _check(response: httpx.Response, what: str) -> None:
+        if response.status_code == 404:
+            raise BlobStoreError(f"{what} not found")
+        # CompleteMultipartUpload can fail with 200 and an <Error> body
+        if response.status_code >= 300 or response.content.lstrip().startswith(b'<Error'):
+            raise BlobStoreError(f"S3 error on {what}: {response.status_code} {response.text[:200]}")
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request('HEAD', key)
+        if response.status_code == 404:
+            return False
+        self._check(response, key)
+        return True
+
+    async def put_file(self, key: str, file_path: str) -> bool:
+        """Upload file_path under key and delete it. Returns True (uploading nothing)
+        when the key was already stored."""
+        try:
+            if await self.exists(key):
+                return True
+            size = await asyncio.to_thread(os.path.getsize, file_path)
+            if size <= self.part_size:
+                data, payload_hash = await asyncio.to_thread(_read_part, file_path, 0, size)
+                self._check(await self._request('PUT', key, body=data, payload_hash=payload_hash), key)
+            else:
+                await self._multipart_upload(key, file_path, size)
+            return False
+        finally:
+            await asyncio.to_thread(Path(file_path).unlink, True)
+
+    async def _multipart_upload(self, key: str, file_path: str, size: int) -> None:
+        response = await self._request('POST', key, 'uploads=')
+        self._check(response, key)
+        upload_id = _xml_text(response.content, 'UploadId')
+        upload_query = f"uploadId={quote(upload_id, safe='-_.~')}"
+        try:
+            parts: List[Tuple[int, str]] = []
+            for number, offset in enumerate(range(0, size, self.part_size), start=1):
+                data, payload_hash = await asyncio.to_thread(_read_part, file_path, offset, self.part_size)
+                response = await self._request('PUT', key, f"partNumber={number}&{upload_query}",
+                                               body=data, payload_hash=payload_hash)
+                self._check(response, f"{key} part {number}")
+                parts.append((number, response.headers['etag']))
+
+            body = '<CompleteMultipartUpload>' + ''.join(
+                f'<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>' for number, etag in parts
+            ) + '</CompleteMultipartUpload>'
+            self._check(await self._request('POST', key, upload_query, body=body.encode('utf-8')), key)
+        except BaseException:
+            try:
+                await self._request('DELETE', key, upload_query)  # drop the uploaded parts
+            except BlobStoreError:
+                pass
+            raise
+
+    async def read(self, key: str, start: int = 0, length: Optional[int] = None) -> bytes:
+        if length == 0:
+            return b''
+        headers = None if start == 0 and length is None else {'range': _byte_range(start, length)}
+        response = await self._request('GET', key, headers=headers)
+        if response.status_code == 416:  # range starts past the end
+            return b''
+        self._check(response, key)
+        return response.content
+
+    @asynccontextmanager
+    async def local_file(self, key: str) -> AsyncIterator[str]:
+        """Download the blob to a temporary file, deleted on exit"""
+        handle, path = tempfile.mkstemp(prefix='idcr-blob-')
+        os.close(handle)
+        try:
+            await self._download(key, path)
+            yield path
+        finally:
+            await asyncio.to_thread(Path(path).unlink, True)
+
+    async def _download(self, key: str, path: str) -> None:
+        if self._client is None:
+            raise BlobStoreError("The blob store is not open")
+        try:
+            response = await self._client.send(self._build('GET', key), stream=True)
+            try:
+                if response.status_code != 200:
+                    await response.aread()
+                    self._check(response, key)
+                with open(path, 'wb') as file:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        await asyncio.to_thread(file.write, chunk)
+            finally:
+                await response.aclose()
+        except httpx.HTTPError as e:
+            raise BlobStoreError(f"S3 request failed: {e}") from e
+
+    async def delete(self, key: str) -> None:
+        response = await self._request('DELETE', key)
+        if response.status_code != 404:
+            self._check(response, key)
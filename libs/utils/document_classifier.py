@@ -0,0 +1,76 @@
+"""Keyword-count document classification into (doc_type, department, priority).
+
+The rules are plain data: keyword tables (one category per department plus a
+'high_priority' category) and a list of departments. That keeps a classifier cheap to
+rebuild in a worker process and easy to compare between two configurations.
+"""
+from typing import List, Mapping, Sequence, Tuple
+
+from libs.utils.keyword_matcher import KeywordMatcher, KeywordTable
+from libs.utils.keyword_scoring import KeywordScoringMatrix, vectorized_scoring_available
+
+# (keyword category, doc_type, department, base priority)
+Department = Tuple[str, str, str, str]
+Classification = Tuple[str, str, str]
+
+UNCLASSIFIED: Classification = ('general', 'administration', 'low')
+
+
+class DepartmentClassifier:
+    """Picks the department whose keywords occur most often in a document.
+
+    Keywords count when they occur in the text or the file name; ties go to the earlier
+    department and a document without any department keyword is UNCLASSIFIED. The
+    department's base priority is used unless the text contains a 'high_priority' keyword.
+    """
+
+    def __init__(self, tables: Mapping[str, KeywordTable], departments: Sequence[Department]):
+        self.tables = dict(tables)
+        self.departments: List[Department] = [tuple(department) for department in departments]
+        self.matcher = KeywordMatcher(self.tables)
+        if vectorized_scoring_available():
+            self._department_scoring = KeywordScoringMatrix(self.matcher, [entry[0] for entry in self.departments])
+            self._priority_scoring = KeywordScoringMatrix(self.matcher, ['high_priority'])
+        else:
+            self._department_scoring = self._priority_scoring = None
+
+    def __reduce__(self):
+        # Workers rebuild the compiled tables instead of unpickling them
+        return DepartmentClassifier, (self.tables, self.departments)
+
+    def classify(self, text: str, filename: str) -> Classification:
+        text_hits = self.matcher.scan(text.lower())
+        hits = text_hits.union(self.matcher.scan(filename.lower()))
+
+        best_score, best_department = 0, None
+        for department in self.departments:
+            score = hits.count(department[0])
+            if score > best_score:
+                best_score, best_department = score, department
+
+        if best_department is None:
+            return UNCLASSIFIED
+        _, doc_type, department, base_priority = best_department
+        return doc_type, department, 'high' if text_hits.any('high_priority') else base_priority
+
+    def classify_many(self, documents: Sequence[Tuple[str, str]]) -> List[Classification]:
+        """classify() for many (text, filename) pairs, scored with one sparse matrix product"""
+        if self._department_scoring is None or not documents:
+            return [self.classify(text, filename) for text, filename in documents]
+
+        text_hits = [self.matcher.scan(text.lower()) for text, _ in documents]
+        all_hits = [
+            hits.union(self.matcher.scan(filename.lower()))
+            for hits, (_, filename) in zip(text_hits, documents)
+        ]
+        best, best_scores = self._department_scoring.best(all_hits)
+        high_priority = self._priority_scoring.scores(text_hits)[:, 0] > 0
+
+        results = []
+        for index in range(len(documents)):
+            if best_scores[index] == 0:
+                results.append(UNCLASSIFIED)
+                continue
+            _, doc_type, department, base_priority = self.departments[best[index]]
+            results.append((doc_type, department, 'high' if high_priority[index] else base_priority))
+        return results
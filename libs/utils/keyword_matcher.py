@@ -0,0 +1,157 @@
+"""Multi-keyword matching shared by the classifiers and content analyzers.
+
+Every keyword table is compiled once into an Aho-Corasick automaton, so a single pass
+over the text finds every keyword of every category. A keyword counts as found exactly
+when ``keyword in text`` would be true (plain substring match), so scores computed from
+the hits are identical to the old per-keyword ``in`` checks.
+
+pyahocorasick is used when installed; otherwise the keyword trie is compiled into a
+single regular expression, which keeps the scan in C.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+KeywordTable = Union[Iterable[str], Mapping[str, float]]
+
+
+class _TrieRegexAutomaton:
+    """Fallback automaton: the keyword trie compiled into one regular expression.
+
+    At every offset the regex returns the longest keyword starting there (greedy
+    optional groups walk the trie in C); shorter keywords starting at the same offset
+    are exactly the keywords that are prefixes of it.
+    """
+
+    def __init__(self, patterns: List[str]):
+        trie: dict = {}
+        for pattern in patterns:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[''] = True
+        self._regex = re.compile('(?=(' + self._compile(trie) + '))') if patterns else None
+        self._prefixes = {
+            pattern: [other for other in patterns if pattern.startswith(other)]
+            for pattern in patterns
+        }
+
+    @classmethod
+    def _compile(cls, node: dict) -> str:
+        branches = [re.escape(char) + cls._compile(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    def first_occurrences(self, text: str) -> Dict[str, int]:
+        first_seen: Dict[str, int] = {}
+        if self._regex is None:
+            return first_seen
+        for match in self._regex.finditer(text):
+            longest = match.group(1)
+            if longest in first_seen:
+                # its prefixes were recorded at that earlier offset too
+                continue
+            for pattern in self._prefixes[longest]:
+                first_seen.setdefault(pattern, match.start())
+        return first_seen
+
+
+class _AhoCorasickAutomaton:
+    def __init__(self, patterns: List[str]):
+        self._automaton = ahocorasick.Automaton()
+        for pattern in patterns:
+            self._automaton.add_word(pattern, pattern)
+        if patterns:
+            self._automaton.make_automaton()
+        self._empty = not patterns
+
+    def first_occurrences(self, text: str) -> Dict[str, int]:
+        first_seen: Dict[str, int] = {}
+        if self._empty:
+            return first_seen
+        for end, pattern in self._automaton.iter(text):
+            if pattern not in first_seen:
+                first_seen[pattern] = end - len(pattern) + 1
+        return first_seen
+
+
+class KeywordHits:
+    """Keywords found in one text, queried per category"""
+
+    def __init__(self, matcher: "KeywordMatcher", first_seen: Dict[str, int]):
+        self._matcher = matcher
+        self.first_seen = first_seen  # keyword -> offset of its first occurrence
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self.first_seen
+
+    def union(self, other: "KeywordHits") -> "KeywordHits":
+        """Hits of either text (e.g. document content or file name)"""
+        merged = dict(other.first_seen)
+        merged.update(self.first_seen)
+        return KeywordHits(self._matcher, merged)
+
+    def found(self, category: str) -> List[str]:
+        """Matching keywords of a category, in table order (duplicates in the table repeat)"""
+        return [keyword for keyword in self._matcher.categories[category] if keyword in self.first_seen]
+
+    def any(self, category: str) -> bool:
+        return any(keyword in self.first_seen for keyword in self._matcher.categories[category])
+
+    def count(self, category: str) -> int:
+        return len(self.found(category))
+
+    def score(self, category: str) -> float:
+        """Sum of the weights of the matching keywords of a category"""
+        weights = self._matcher.weights[category]
+        return sum((weights[keyword] for keyword in self.found(category)), 0.0)
+
+    def items(self) -> Iterator[Tuple[str, str, float]]:
+        """Every hit as (category, keyword, weight)"""
+        for category, keywords in self._matcher.categories.items():
+            weights = self._matcher.weights[category]
+            for keyword in keywords:
+                if keyword in self.first_seen:
+                    yield category, keyword, weights[keyword]
+
+
+class KeywordMatcher:
+    """Compiles named keyword tables into one automaton.
+
+    Tables are either lists of keywords (weight 1) or {keyword: weight} mappings:
+
+        matcher = KeywordMatcher({'finance': ['invoice', 'budget'], 'urgent': {'asap': 3}})
+        hits = matcher.scan(text.lower())
+        hits.count('finance'), hits.score('urgent')
+    """
+
+    def __init__(self, tables: Mapping[str, KeywordTable]):
+        self.categories: Dict[str, List[str]] = {}
+        self.weights: Dict[str, Dict[str, float]] = {}
+        for category, table in tables.items():
+            if isinstance(table, Mapping):
+                self.categories[category] = list(table.keys())
+                self.weights[category] = dict(table)
+            else:
+                self.categories[category] = list(table)
+                self.weights[category] = {keyword: 1 for keyword in self.categories[category]}
+
+        self.patterns = sorted({keyword for keywords in self.categories.values() for keyword in keywords if keyword})
+        automaton_class = _AhoCorasickAutomaton if ahocorasick is not None else _TrieRegexAutomaton
+        self._automaton = automaton_class(self.patterns)
+
+    def scan(self, text: str, *more_texts: Optional[str]) -> KeywordHits:
+        """Find every keyword occurring in `text` (and any extra texts) in one pass each"""
+        first_seen: Dict[str, int] = {}
+        for candidate in (text,) + more_texts:
+            if not candidate:
+                continue
+            for pattern, offset in self._automaton.first_occurrences(candidate).items():
+                first_seen.setdefault(pattern, offset)
+        return KeywordHits(self, first_seen)
@@ -0,0 +1,73 @@
+"""Vectorized keyword scoring for many documents at once.
+
+Each document's keyword hits become one row of a sparse documents x keywords 0/1
+matrix. Multiplying it by a keywords x categories weight matrix gives every category
+score of every document in one operation, and argmax picks the winning category.
+
+Weights are the multiplicity of the keyword in the category table times its weight.
+The result is therefore the same number a per-document ``hits.score(category)`` gives.
+For integer weights (plain keyword lists) it is bit-for-bit identical.
+"""
+from itertools import chain
+from typing import Sequence
+
+from libs.utils.keyword_matcher import KeywordHits, KeywordMatcher
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+
+def vectorized_scoring_available() -> bool:
+    return np is not None and sparse is not None
+
+
+class KeywordScoringMatrix:
+    """Category scores of many documents from their KeywordHits"""
+
+    def __init__(self, matcher: KeywordMatcher, categories: Sequence[str]):
+        if not vectorized_scoring_available():
+            raise RuntimeError("numpy and scipy are required for vectorized keyword scoring")
+        self.matcher = matcher
+        self.categories = list(categories)
+        self.columns = {keyword: column for column, keyword in enumerate(matcher.patterns)}
+
+        integral = all(
+            float(matcher.weights[category][keyword]).is_integer()
+            for category in self.categories for keyword in matcher.categories[category]
+        )
+        self.dtype = np.int64 if integral else np.float64
+        weights = np.zeros((len(self.columns), len(self.categories)), dtype=self.dtype)
+        for index, category in enumerate(self.categories):
+            category_weights = matcher.weights[category]
+            for keyword in matcher.categories[category]:
+                if keyword not in self.columns:
+                    continue  # empty keywords never match
+                # np.add.at so a keyword listed twice in a table counts twice
+                np.add.at(weights, (self.columns[keyword], index), category_weights[keyword])
+        self.weights = sparse.csr_matrix(weights)
+
+    def hit_matrix(self, documents: Sequence[KeywordHits]) -> "sparse.csr_matrix":
+        """documents x keywords matrix with 1 where the keyword occurs in the document"""
+        lengths = [len(hits.first_seen) for hits in documents]
+        indptr = np.zeros(len(documents) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter(
+            map(self.columns.__getitem__, chain.from_iterable(hits.first_seen for hits in documents)),
+            dtype=np.int64, count=int(indptr[-1])
+        )
+        data = np.ones(len(indices), dtype=self.dtype)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(documents), len(self.columns)))
+
+    def scores(self, documents: Sequence[KeywordHits]) -> "np.ndarray":
+        """documents x categories score matrix, columns in `categories` order"""
+        return (self.hit_matrix(documents) @ self.weights).toarray()
+
+    def best(self, documents: Sequence[KeywordHits]):
+        """(index of the best category, its score) per document; ties go to the earlier category"""
+        scores = self.scores(documents)
+        best = scores.argmax(axis=1)
+        return best, scores[np.arange(len(documents)), best]
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on a dedicated thread pool.
+
+    bcrypt releases the GIL while it works, so threads keep the event loop responsive and
+    use several cores. At most `max_workers` hashes run at a time; further logins wait
+    in the pool's queue instead of competing with uploads and dashboards for the CPU.
+    `context` is anything with passlib's hash(secret) and verify(secret, hash) methods.
+    """
+
+    def __init__(self, context, max_workers: Optional[int] = None):
+        self.context = context
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created on first use, so the hasher works again after shutdown()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+            return self._executor
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool(), self.context.verify, password, hashed_password
+        )
+
+    def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        """Hash several passwords in parallel (for synchronous callers such as database setup)"""
+        return list(self._pool().map(self.context.hash, passwords))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
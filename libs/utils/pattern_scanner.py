@@ -0,0 +1,91 @@
+"""Named entity / PII patterns, compiled once and matched at most once per text.
+
+A PatternScanner holds a table of named regular expressions. `scan(text)` returns a
+PatternMatches view whose results equal ``re.findall``/``re.search`` for each pattern.
+Each distinct pattern is run over the text only the first time one of its names is
+queried. The result is then shared by every analyzer that asks, including analyzers
+that register the same regex under another name.
+
+CPython's ``re`` tries the branches of an alternation one after another and loses the
+literal/charset prefix skipping it does for a single pattern. Merging these patterns
+into one regex was no faster on prose and about 3x slower on number-heavy text, so
+patterns stay separate and the savings come from not repeating work.
+"""
+import re
+from typing import Dict, List, Mapping, Pattern, Tuple, Union
+
+PatternSpec = Union[str, Tuple[str, int]]
+
+# Sensitive-data patterns shared by the confidentiality scorers
+PII_PATTERNS: Dict[str, str] = {
+    'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
+    'credit_card': r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
+    'money': r'\$\d+(?:,\d{3})*(?:\.\d{2})?',
+    'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'phone': r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
+    'employee_id': r'\bEMP\d+\b|\bID[-\s]?\d+\b',
+}
+
+
+class PatternMatches:
+    """Matches of a scanner's patterns in one text"""
+
+    def __init__(self, scanner: "PatternScanner", text: str):
+        self.text = text
+        self._scanner = scanner
+        self._spans: Dict[Pattern, List[Tuple[int, int]]] = {}
+
+    def spans(self, name: str) -> List[Tuple[int, int]]:
+        """(start, end) offsets of the leftmost non-overlapping matches"""
+        regex = self._scanner.regexes[name]
+        if regex not in self._spans:
+            self._spans[regex] = [match.span() for match in regex.finditer(self.text)]
+        return self._spans[regex]
+
+    def found(self, name: str) -> List[str]:
+        """Matched strings, as re.findall(pattern, text) returns them"""
+        return [self.text[start:end] for start, end in self.spans(name)]
+
+    def count(self, name: str) -> int:
+        return len(self.spans(name))
+
+    def any(self, name: str) -> bool:
+        regex = self._scanner.regexes[name]
+        if regex in self._spans:
+            return bool(self._spans[regex])
+        return regex.search(self.text) is not None
+
+    def all(self) -> List[Tuple[int, int, str]]:
+        """Every match of every pattern as (start, end, name), in text order"""
+        return sorted(
+            (start, end, name)
+            for name in self._scanner.regexes
+            for start, end in self.spans(name)
+        )
+
+
+class PatternScanner:
+    """Compiles a table of named patterns once.
+
+    Patterns are strings or (pattern, flags) pairs without capturing groups:
+
+        scanner = PatternScanner({'ssn': r'\\b\\d{3}-\\d{2}-\\d{4}\\b', 'month': (r'\\bmay\\b', re.IGNORECASE)})
+        matches = scanner.scan(text)
+        matches.count('ssn'), matches.found('month')
+    """
+
+    def __init__(self, patterns: Mapping[str, PatternSpec]):
+        compiled: Dict[Tuple[str, int], Pattern] = {}
+        self.regexes: Dict[str, Pattern] = {}
+        for name, spec in patterns.items():
+            key = (spec, 0) if isinstance(spec, str) else tuple(spec)
+            if key not in compiled:
+                regex = re.compile(*key)
+                if regex.groups:
+                    raise ValueError(f"Pattern '{name}' must not contain capturing groups")
+                compiled[key] = regex
+            # The same regex under several names shares one set of matches
+            self.regexes[name] = compiled[key]
+
+    def scan(self, text: str) -> PatternMatches:
+        return PatternMatches(self, text)
@@ -0,0 +1,333 @@
+"""Incremental reclassification of stored documents after the keyword rules change.
+
+An inverted index maps every term (maximal run of lowercase letters and digits) of a
+document's extracted text and file name to the documents containing it. A document
+containing a keyword always has a term containing the keyword's longest letter/digit
+run. So the documents an added or removed keyword can affect are found from the index
+and its (much smaller) term vocabulary, without reading any document text. Only those documents are re-scored,
+in chunks spread over worker processes, and changed rows are written back in batched
+transactions.
+
+Postings are stored per indexed chunk of documents: one row per (term, segment) holding
+the ids of that chunk's documents containing the term, which keeps the index a few
+rows per term instead of one row per term and document.
+
+Only documents classified by these local rules (classification_source 'local') and not
+yet reviewed are re-scored; classifications from the classification service and those a
+reviewer has seen are left alone.
+
+The rules the stored classifications were computed with, and the last indexed document
+id, are kept in `classification_state`. The first run only records the current rules:
+the stored classifications are taken as computed with them. The rule tables of the
+running classification service are recorded with them, so a run reports whether the
+service's rules changed since the last run that could fetch them.
+"""
+import json
+import re
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from libs.database.sqlite_pool import SQLitePool
+from libs.utils.document_classifier import DepartmentClassifier
+
+TERM = re.compile(r'[a-z0-9]+')
+RULES_STATE = 'classification_rules'
+INDEX_STATE = 'term_index_through'  # highest documents.id in the term index
+
+RECLASSIFICATION_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS term_postings (
+        term TEXT NOT NULL,
+        segment INTEGER NOT NULL,
+        document_ids TEXT NOT NULL,
+        PRIMARY KEY (term, segment)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS classification_state (
+        name TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+]
+
+# Documents whose classification is this module's to change
+RESCORABLE = "classification_source = 'local' AND COALESCE(review_status, 'pending') = 'pending'"
+
+# SQLite limits the number of ? parameters per statement
+QUERY_CHUNK_SIZE = 500
+
+
+def document_terms(*texts: Optional[str]) -> Set[str]:
+    terms: Set[str] = set()
+    for text in texts:
+        if text:
+            terms.update(TERM.findall(text.lower()))
+    return terms
+
+
+def keyword_probe(keyword: str) -> Optional[str]:
+    """Longest letter/digit run of a keyword (None if it has none)"""
+    runs = TERM.findall(keyword.lower())
+    return max(runs, key=len) if runs else None
+
+
+def rules_snapshot(classifier: DepartmentClassifier, service_rules: Optional[dict] = None) -> dict:
+    """JSON-compatible description of the rules a classifier applies, and of the
+    classification service's rule tables"""
+    return json.loads(json.dumps({
+        'categories': classifier.matcher.categories,
+        'weights': classifier.matcher.weights,
+        'departments': classifier.departments,
+        'service': service_rules,
+    }))
+
+
+def _keyword_weights(snapshot: dict, category: str) -> Dict[str, float]:
+    # A keyword listed twice in a table counts twice
+    weights: Dict[str, float] = {}
+    for keyword in snapshot['categories'].get(category, []):
+        weights[keyword] = weights.get(keyword, 0) + snapshot['weights'][category][keyword]
+    return weights
+
+
+def changed_keywords(old: Optional[dict], new: dict) -> Optional[Set[str]]:
+    """Keywords added, removed or reweighted in any category.
+
+    None means every document has to be re-scored: there are no previous rules, or the
+    department list itself (order, doc types, base priorities) changed.
+    """
+    if old is None or old.get('departments') != new['departments']:
+        return None
+    changed: Set[str] = set()
+    for category in set(old['categories']) | set(new['categories']):
+        before = _keyword_weights(old, category)
+        after = _keyword_weights(new, category)
+        changed.update(keyword for keyword in before.keys() | after.keys() if before.get(keyword) != after.get(keyword))
+    changed.discard('')  # empty keywords never match
+    return changed
+
+
+def _chunks(items: Sequence, size: int) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _get_state(conn: sqlite3.Connection, name: str) -> Optional[str]:
+    row = conn.execute('SELECT value FROM classification_state WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_state(conn: sqlite3.Connection, name: str, value: str) -> None:
+    conn.execute(
+        'INSERT OR REPLACE INTO classification_state (name, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
+        (name, value)
+    )
+
+
+# Worker process state: the classifier is rebuilt once per process
+_worker_classifier: Optional[DepartmentClassifier] = None
+
+
+def _init_worker(classifier: DepartmentClassifier) -> None:
+    global _worker_classifier
+    _worker_classifier = classifier
+
+
+def _index_chunk(rows: List[tuple]) -> Tuple[int, List[tuple]]:
+    """(id, original_name, extracted_text) rows -> (highest id, (term, segment, comma-separated ids) postings)"""
+    rows = sorted(rows, key=lambda row: row[0])
+    postings: Dict[str, List[int]] = {}
+    for document_id, name, text in rows:
+        for term in document_terms(name, text):
+            postings.setdefault(term, []).append(document_id)
+    segment = rows[0][0]
+    return rows[-1][0], [(term, segment, ','.join(map(str, ids))) for term, ids in sorted(postings.items())]
+
+
+def _classify_chunk(rows: List[tuple]) -> List[tuple]:
+    """Re-score (id, original_name, extracted_text, document_type, department, priority)
+    rows; returns (document_type, department, priority, id) for rows that changed"""
+    results = _worker_classifier.classify_many([(row[2] or '', row[1] or '') for row in rows])
+    return [
+        (*result, row[0])
+        for row, result in zip(rows, results)
+        if result != tuple(row[3:6])
+    ]
+
+
+class CorpusReclassifier:
+    """Brings stored classifications in line with the current keyword rules.
+
+    `run()` indexes documents added since the last run, finds the documents affected by
+    the rule changes since then, re-scores them on `workers` processes (in-process when
+    workers <= 1) in chunks of `chunk_size` documents and commits every
+    `write_batch_size` updates. It returns a report of what was done.
+
+    It works on a connection of `pool`, so it gets the pool's pragmas (WAL, busy
+    timeout). `service_rules` are the classification service's rule tables; None when
+    the service could not be asked, in which case the recorded tables are kept and
+    the report's service_rules_changed is None.
+    """
+
+    def __init__(self, pool: SQLitePool, classifier: DepartmentClassifier, workers: int = 1,
+                 chunk_size: int = 500, write_batch_size: int = 2000, service_rules: Optional[dict] = None):
+        self.pool = pool
+        self.classifier = classifier
+        self.service_rules = service_rules
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.write_batch_size = max(1, write_batch_size)
+
+    def run(self) -> dict:
+        conn = self.pool.acquire()
+        executor = None
+        try:
+            for statement in RECLASSIFICATION_SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+
+            if self.workers > 1:
+                executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(self.classifier,)
+                )
+            else:
+                _init_worker(self.classifier)
+
+            indexed = self._index_new_documents(conn, executor)
+
+            rules = rules_snapshot(self.classifier, self.service_rules)
+            previous = _get_state(conn, RULES_STATE)
+            previous = json.loads(previous) if previous else None
+            recorded_service_rules = previous.get('service') if previous else None
+            if rules['service'] is None:
+                rules['service'] = recorded_service_rules
+            if previous is None:
+                # First run: nothing says the stored classifications used other rules
+                keywords, candidates, changed = set(), [], 0
+            else:
+                keywords = changed_keywords(previous, rules)
+                candidates = self._affected_documents(conn, keywords)
+                changed = self._reclassify(conn, executor, candidates)
+
+            _set_state(conn, RULES_STATE, json.dumps(rules))
+            conn.commit()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            self.pool.release(conn)
+
+        service_rules_changed = None  # unknown without both the current and the recorded tables
+        if self.service_rules is not None and recorded_service_rules is not None:
+            service_rules_changed = rules['service'] != recorded_service_rules
+
+        return {
+            'indexed_documents': indexed,
+            'seeded': previous is None,
+            'service_rules_changed': service_rules_changed,
+            'full_rescan': keywords is None,
+            'changed_keywords': sorted(keywords) if keywords is not None else None,
+            'candidate_documents': len(candidates),
+            'changed_documents': changed,
+        }
+
+    def _map_chunks(self, executor: Optional[ProcessPoolExecutor], function: Callable[[List[tuple]], list],
+                    chunks: Iterable[List[tuple]]) -> Iterator[list]:
+        """Results of function(chunk) in order, with at most two chunks per worker in flight"""
+        if executor is None:
+            for chunk in chunks:
+                yield function(chunk)
+            return
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(function, chunk))
+            if len(pending) >= self.workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _fetch_chunks(self, conn: sqlite3.Connection, columns: str, document_ids: List[int]) -> Iterator[List[tuple]]:
+        """Document rows for document_ids, `chunk_size` at a time (each chunk is read
+        completely, so updates between chunks are safe)"""
+        for chunk in _chunks(document_ids, self.chunk_size):
+            rows: List[tuple] = []
+            for query_ids in _chunks(chunk, QUERY_CHUNK_SIZE):
+                placeholders = ','.join('?' * len(query_ids))
+                rows.extend(conn.execute(
+                    f'SELECT {columns} FROM documents WHERE id IN ({placeholders})', list(query_ids)
+                ).fetchall())
+            if rows:
+                yield rows
+
+    def _index_new_documents(self, conn: sqlite3.Connection, executor: Optional[ProcessPoolExecutor]) -> int:
+        indexed_through = int(_get_state(conn, INDEX_STATE) or 0)
+        document_ids = [row[0] for row in conn.execute(
+            'SELECT id FROM documents WHERE id > ? ORDER BY id', (indexed_through,)
+        )]
+        chunks = self._fetch_chunks(conn, 'id, original_name, extracted_text', document_ids)
+        for last_id, postings in self._map_chunks(executor, _index_chunk, chunks):
+            conn.executemany(
+                'INSERT OR REPLACE INTO term_postings (term, segment, document_ids) VALUES (?, ?, ?)', postings
+            )
+            # Chunks come back in id order and ids only grow, so everything up to last_id is indexed
+            _set_state(conn, INDEX_STATE, str(last_id))
+            conn.commit()
+        return len(document_ids)
+
+    def _affected_documents(self, conn: sqlite3.Connection, keywords: Optional[Set[str]]) -> List[int]:
+        if keywords is None:
+            return [row[0] for row in conn.execute(f'SELECT id FROM documents WHERE {RESCORABLE} ORDER BY id')]
+        probes = {keyword_probe(keyword) for keyword in keywords}
+        if not probes:
+            return []
+        if None in probes:
+            # a keyword without letters or digits can match anywhere
+            return [row[0] for row in conn.execute(f'SELECT id FROM documents WHERE {RESCORABLE} ORDER BY id')]
+
+        probe_pattern = re.compile('|'.join(re.escape(probe) for probe in sorted(probes)))
+        terms = [
+            term for (term,) in conn.execute('SELECT DISTINCT term FROM term_postings')
+            if probe_pattern.search(term)
+        ]
+        document_ids: Set[int] = set()
+        for query_terms in _chunks(terms, QUERY_CHUNK_SIZE):
+            placeholders = ','.join('?' * len(query_terms))
+            for (ids,) in conn.execute(
+                f'SELECT document_ids FROM term_postings WHERE term IN ({placeholders})', list(query_terms)
+            ):
+                document_ids.update(map(int, ids.split(',')))
+
+        rescorable: List[int] = []
+        for query_ids in _chunks(sorted(document_ids), QUERY_CHUNK_SIZE):
+            placeholders = ','.join('?' * len(query_ids))
+            rescorable.extend(row[0] for row in conn.execute(
+                f'SELECT id FROM documents WHERE id IN ({placeholders}) AND {RESCORABLE} ORDER BY id', list(query_ids)
+            ))
+        return rescorable
+
+    def _reclassify(self, conn: sqlite3.Connection, executor: Optional[ProcessPoolExecutor],
+                    document_ids: List[int]) -> int:
+        columns = 'id, original_name, extracted_text, document_type, department, priority'
+        changed = 0
+        updates: List[tuple] = []
+        for results in self._map_chunks(executor, _classify_chunk, self._fetch_chunks(conn, columns, document_ids)):
+            updates.extend(results)
+            if len(updates) >= self.write_batch_size:
+                changed += self._write_updates(conn, updates)
+                updates = []
+        changed += self._write_updates(conn, updates)
+        return changed
+
+    @staticmethod
+    def _write_updates(conn: sqlite3.Connection, updates: List[tuple]) -> int:
+        if not updates:
+            return 0
+        # Rows reviewed since they were read keep their classification
+        with conn:
+            return conn.executemany(
+                f'UPDATE documents SET document_type = ?, department = ?, priority = ? WHERE id = ? AND {RESCORABLE}',
+                updates
+            ).rowcount
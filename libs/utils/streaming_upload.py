@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+MAX_FIELD_SIZE = 64 * 1024  # plain form fields (batch_name etc.)
+
+
+class UploadRejected(Exception):
+    pass
+
+
+class _StreamingUploadReceiver:
+    """Writes each file part of a multipart body straight to disk as it arrives.
+
+    python-multipart calls the on_* callbacks synchronously while parsing a chunk; they
+    only queue events, which `receive` then applies (file writes happen off the loop).
+    """
+
+    def __init__(self, dest_dir: Path, max_file_size: int, allowed_extensions: Iterable[str]):
+        self.dest_dir = dest_dir
+        self.max_file_size = max_file_size
+        self.allowed_extensions = set(allowed_extensions)
+        self.fields: Dict[str, str] = {}
+        self.files: List[dict] = []
+        self.skipped: List[dict] = []
+        self._events: list = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        # state of the part currently being written
+        self._field_name: Optional[str] = None
+        self._field_data = bytearray()
+        self._upload: Optional[dict] = None
+        self._handle = None
+        self._hasher = None
+        self._discard = False
+
+    # parser callbacks
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._events.append(("start", options))
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append(("data", data[start:end]))
+
+    def on_part_end(self):
+        self._events.append(("end", None))
+
+    # event handling
+    async def process_events(self):
+        events, self._events = self._events, []
+        for kind, payload in events:
+            if kind == "start":
+                await self._start_part(payload)
+            elif kind == "data":
+                await self._write(payload)
+            else:
+                await self._finish_part()
+
+    async def _start_part(self, options: dict):
+        self._field_name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        self._field_data = bytearray()
+        self._discard = False
+        if b"filename" not in options:
+            self._upload = None
+            return
+
+        # Never trust the client's path components
+        filename = os.path.basename(options[b"filename"].decode("utf-8", errors="replace"))
+        file_extension = filename.split('.')[-1].lower()
+        self._upload = {'filename': filename, 'file_extension': file_extension, 'file_size': 0}
+        if not filename or file_extension not in self.allowed_extensions:
+            self._reject("unsupported file type")
+            return
+
+        # Parts may share a name; each is staged under its own name (the original is kept as 'filename')
+        file_path = self.dest_dir / f"{uuid.uuid4().hex}.{file_extension}"
+        self._upload['file_path'] = str(file_path)
+        self._handle = await asyncio.to_thread(open, file_path, "wb")
+        self._hasher = hashlib.sha256()
+
+    async def _write(self, chunk: bytes):
+        if self._discard:
+            return
+        if self._upload is None:
+            if len(self._field_data) + len(chunk) > MAX_FIELD_SIZE:
+                raise UploadRejected(f"Form field '{self._field_name}' is too large")
+            self._field_data.extend(chunk)
+            return
+
+        self._upload['file_size'] += len(chunk)
+        if self._upload['file_size'] > self.max_file_size:
+            # Abort this file as soon as it crosses the limit; the rest of the part is dropped
+            await self._close_handle(delete=True)
+            self._reject("file too large")
+            return
+        self._hasher.update(chunk)
+        await asyncio.to_thread(self._handle.write, chunk)
+
+    async def _finish_part(self):
+        if self._upload is None:
+            self.fields[self._field_name] = self._field_data.decode("utf-8", errors="replace")
+        elif not self._discard:
+            await self._close_handle()
+            self._upload['sha256'] = self._hasher.hexdigest()
+            self.files.append(self._upload)
+        self._upload = None
+        self._discard = False
+
+    def _reject(self, reason: str):
+        self._discard = True
+        self.skipped.append({'filename': self._upload['filename'], 'reason': reason})
+
+    async def _close_handle(self, delete: bool = False):
+        if self._handle is None:
+            return
+        handle, self._handle = self._handle, None
+        await asyncio.to_thread(handle.close)
+        if delete:
+            await asyncio.to_thread(Path(handle.name).unlink, True)
+
+    async def cleanup(self):
+        """Remove everything written so far (used when the request fails part-way)"""
+        await self._close_handle(delete=True)
+        for upload in self.files:
+            await asyncio.to_thread(Path(upload['file_path']).unlink, True)
+
+
+async def receive_streaming_upload(
+    content_type: str,
+    stream: AsyncIterator[bytes],
+    dest_dir: Path,
+    max_file_size: int,
+    allowed_extensions: Iterable[str]
+) -> Tuple[Dict[str, str], List[dict], List[dict]]:
+    """Stream a multipart/form-data body to `dest_dir` without buffering whole files.
+
+    Each file is written chunk by chunk while its SHA-256 is computed, and is abandoned
+    (partial file deleted) the moment it exceeds `max_file_size`. Returns
+    (form fields, stored files, skipped files); stored files are dicts with filename
+    (as sent by the client), file_path (a unique name in `dest_dir`), file_size,
+    file_extension and sha256.
+    """
+    content_type_value, params = parse_options_header(content_type)
+    if content_type_value != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadRejected("Expected a multipart/form-data upload")
+
+    receiver = _StreamingUploadReceiver(dest_dir, max_file_size, allowed_extensions)
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": receiver.on_part_begin,
+        "on_part_data": receiver.on_part_data,
+        "on_part_end": receiver.on_part_end,
+        "on_header_field": receiver.on_header_field,
+        "on_header_value": receiver.on_header_value,
+        "on_header_end": receiver.on_header_end,
+        "on_headers_finished": receiver.on_headers_finished,
+    })
+    try:
+        async for chunk in stream:
+            parser.write(chunk)
+            await receiver.process_events()
+        parser.finalize()
+        await receiver.process_events()
+    except UploadRejected:
+        await receiver.cleanup()
+        raise
+    except Exception as e:
+        await receiver.cleanup()
+        raise UploadRejected(f"Malformed upload: {str(e)}")
+
+    return receiver.fields, receiver.files, receiver.skipped
@@ -0,0 +1,125 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+import PyPDF2
+from docx import Document as DocxDocument
+
+
+def extract_text_from_file(file_path: str, file_type: str) -> str:
+    """Extract the full text of a document (runs inside a worker process)"""
+    try:
+        if file_type.lower() == 'pdf':
+            with open(file_path, 'rb') as file:
+                reader = PyPDF2.PdfReader(file)
+                return ''.join(page.extract_text() + "\n" for page in reader.pages)
+        elif file_type.lower() in ['docx', 'doc']:
+            doc = DocxDocument(file_path)
+            return ''.join(paragraph.text + "\n" for paragraph in doc.paragraphs)
+        elif file_type.lower() == 'txt':
+            with open(file_path, 'r', encoding='utf-8') as file:
+                return file.read()
+        else:
+            return "Unsupported file type for text extraction"
+    except Exception as e:
+        return f"Error extracting text: {str(e)}"
+
+
+def count_pdf_pages(file_path: str) -> int:
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF, one string per page"""
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+class TextExtractor:
+    """Runs document parsing in a process pool so it never blocks the event loop.
+
+    Large PDFs are split into page ranges that are parsed in parallel and joined back
+    in page order. A document that takes longer than `timeout` seconds has its worker
+    processes killed and the pool is replaced. The workers are shared, so this also
+    stops the other documents being extracted on the pool; they are retried once on the
+    new pool.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: float = 120.0,
+                 pages_per_task: int = 25, parallel_page_threshold: int = 50):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.pages_per_task = pages_per_task
+        self.parallel_page_threshold = parallel_page_threshold
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    async def extract(self, file_path: str, file_type: str) -> str:
+        for attempt in range(2):
+            executor = self._executor
+            try:
+                return await asyncio.wait_for(self._extract(executor, file_path, file_type), self.timeout)
+            except asyncio.TimeoutError:
+                self._restart(executor)
+                return f"Error extracting text: timed out after {self.timeout:.0f} seconds"
+            except BrokenProcessPool:
+                # Another document's runaway parse took the pool down; retry once on the new pool
+                self._restart(executor)
+            except asyncio.CancelledError:
+                # Queued on a pool that another document's timeout shut down, unless this
+                # task itself is being cancelled
+                if executor is self._executor or asyncio.current_task().cancelling():
+                    raise
+            except Exception as e:
+                return f"Error extracting text: {str(e)}"
+        return "Error extracting text: extraction worker crashed"
+
+    async def _extract(self, executor: ProcessPoolExecutor, file_path: str, file_type: str) -> str:
+        loop = asyncio.get_running_loop()
+        if file_type.lower() != 'pdf':
+            return await loop.run_in_executor(executor, extract_text_from_file, file_path, file_type)
+
+        try:
+            page_count = await loop.run_in_executor(executor, count_pdf_pages, file_path)
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            return f"Error extracting text: {str(e)}"
+
+        if page_count < self.parallel_page_threshold:
+            return await loop.run_in_executor(executor, extract_text_from_file, file_path, file_type)
+
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        try:
+            chunks = await asyncio.gather(*[
+                loop.run_in_executor(executor, extract_pdf_pages, file_path, start, end)
+                for start, end in ranges
+            ])
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            return f"Error extracting text: {str(e)}"
+        return ''.join(page + "\n" for chunk in chunks for page in chunk)
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """Kill the workers of `executor` and install a fresh pool (once per broken pool).
+
+        Every worker is killed, not just the one running the timed out document: the
+        other extractions running on them fail with BrokenProcessPool and those still
+        queued are cancelled.
+        """
+        if executor is not self._executor:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
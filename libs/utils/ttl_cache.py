@@ -0,0 +1,79 @@
+"""In-process response cache with a TTL, an LRU size bound and explicit invalidation.
+
+Keys are tuples whose first element names what is cached (an endpoint, say), so that a
+write can drop everything it makes stale with `invalidate(name, ...)`.
+
+A value computed while an invalidation happened may already be stale. Callers take
+`version()` before reading the data and pass it to `set()`, which drops the value if
+anything was invalidated in the meantime.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        """The cached value, or None if there is none or it expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def set(self, key: Tuple[Hashable, ...], value: Any, version: Optional[int] = None) -> None:
+        with self._lock:
+            if version is not None and version != self._version:
+                return  # invalidated while the value was being computed
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *names: Hashable) -> None:
+        """Drop the entries of the given names (every entry when called without names)"""
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+            if not names:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] in names]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -1,5 +1,9 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Iterator, List, Tuple
+import asyncio
+from contextlib import asynccontextmanager
 import sys
 import os
 import uvicorn
@@ -11,13 +15,37 @@ import docx
 import tempfile
 import uuid
 
-app = FastAPI(title="Classification Service")
+# Add the project root to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+
+from libs.messaging.pipeline import consume_stage
+from libs.utils.keyword_matcher import KeywordMatcher
+from libs.utils.keyword_scoring import KeywordScoringMatrix, vectorized_scoring_available
+
+# With AMQP_URL set, the service also classifies documents queued on the pipeline's
+# classify queue, handling up to PIPELINE_PREFETCH of them at a time
+AMQP_URL = os.environ.get("AMQP_URL", "")
+PIPELINE_PREFETCH = int(os.environ.get("PIPELINE_PREFETCH", "8"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with consume_stage(AMQP_URL, "classification", classify_message, PIPELINE_PREFETCH):
+        yield
+
+app = FastAPI(title="Classification Service", lifespan=lifespan)
+
+MAX_BATCH_ITEMS = int(os.environ.get("CLASSIFY_BATCH_MAX_ITEMS", "500"))
+# Documents scored per matrix product when streaming a batch
+SCORING_CHUNK_SIZE = int(os.environ.get("CLASSIFY_SCORING_CHUNK_SIZE", "64"))
 
 class ClassificationRequest(BaseModel):
     content: str
     filename: str
     file_type: str
 
+class ClassificationBatchRequest(BaseModel):
+    items: List[ClassificationRequest]
+
 class ClassificationResponse(BaseModel):
     doc_type: str
     department: str
@@ -29,238 +57,236 @@ class ClassificationResponse(BaseModel):
     tags: list
     priority_keywords: list
 
+# Enhanced priority classification keywords
+HIGH_PRIORITY_KEYWORDS = [
+    "by EOD", "by end of day", "by today", "asap", "urgent", "immediate", "within 24 hours", 
+    "deadline today", "due today", "respond by", "reply immediately", "EOD", "end of day", "today",
+    "action required", "requires immediate attention", "please review urgently", "high priority", 
+    "critical issue", "resolve now", "immediate action", "urgent response",
+    "escalated", "service disruption", "breach", "incident", "system down", "customer complaint", 
+    "payment failed", "critical error", "emergency", "outage", "security breach",
+    "today's meeting", "final review", "must attend", "confirmation needed", "urgent meeting"
+]
+
+MEDIUM_PRIORITY_KEYWORDS = [
+    "reminder", "follow up", "this week", "pending", "awaiting response", "check status", 
+    "update needed", "follow-up", "status update",
+    "by tomorrow", "due in 2 days", "schedule by", "before Friday", "complete by", "ETA",
+    "due this week", "by end of week", "within 3 days",
+    "scheduled for", "calendar invite", "tentative", "planned discussion", "agenda",
+    "meeting request", "schedule meeting",
+    "work in progress", "assigned", "need update", "submit by", "to be reviewed",
+    "in progress", "task assigned", "please review"
+]
+
+LOW_PRIORITY_KEYWORDS = [
+    "for your information", "no action needed", "for record", "just sharing", 
+    "reference document", "read only", "optional", "fyi", "for reference",
+    "next quarter", "next month", "future release", "roadmap", "tentative plan", 
+    "long-term goal", "backlog item", "future consideration",
+    "weekly summary", "monthly report", "feedback", "draft version", "notes", 
+    "not urgent", "informational", "general update"
+]
+
+# Enhanced classification rules
+CLASSIFICATION_RULES = [
+    {
+        "keywords": ["hr", "human resources", "employee relations", "talent acquisition", "recruitment", 
+                    "onboarding", "performance management", "compensation & benefits", "payroll", 
+                    "employee engagement", "training & development", "succession planning", 
+                    "workforce planning", "hr policies", "diversity & inclusion", "labor relations", 
+                    "employee retention", "hris", "benefits administration", "workplace safety", 
+                    "employee", "personnel", "hiring", "training", "performance", "benefits", 
+                    "leave", "vacation", "sick leave", "maternity", "paternity", "disciplinary", 
+                    "termination", "resignation", "promotion", "performance review", "appraisal", 
+                    "job description", "organizational chart", "employee handbook", "workplace policy", 
+                    "harassment", "diversity", "inclusion", "staff", "workforce", "compensation", 
+                    "salary review", "performance evaluation", "employee satisfaction", "team building", 
+                    "skill development", "career development"],
+        "filename_keywords": ["hr", "human resources", "employee", "personnel", "hiring", "recruitment", 
+                             "training", "benefits", "leave", "performance", "onboarding", "handbook", 
+                             "policy", "staff", "workforce", "compensation", "evaluation", "talent", 
+                             "payroll", "engagement"],
+        "doc_type": "hr_document",
+        "department": "hr",
+        "confidence": 0.95,
+        "base_priority": "medium",
+        "tags": ["hr", "employee", "personnel"]
+    },
+    {
+        "keywords": ["finance", "financial planning", "budgeting", "accounting", "financial reporting", 
+                    "accounts payable", "accounts receivable", "general ledger", "cash flow", 
+                    "profit & loss", "balance sheet", "financial analysis", "treasury", 
+                    "tax compliance", "auditing", "cost management", "revenue forecasting", 
+                    "capital expenditure", "financial risk management", "erp", "enterprise resource planning", 
+                    "invoice", "payment", "bill", "receipt", "expense", "revenue", "profit", "loss", 
+                    "tax", "audit", "salary", "wage", "reimbursement", "cost", "expenditure", 
+                    "vendor payment", "purchase order", "transaction", "bank statement", "credit", "debit", 
+                    "financial", "fiscal", "budget", "expenditures"],
+        "filename_keywords": ["finance", "financial", "budget", "accounting", "invoice", "bill", "receipt", 
+                             "payment", "expense", "tax", "audit", "payroll", "cost", "purchase", 
+                             "transaction", "bank", "credit", "debit", "treasury", "revenue", "profit", "loss"],
+        "doc_type": "financial_document",
+        "department": "finance",
+        "confidence": 0.95,
+        "base_priority": "high",
+        "tags": ["finance", "accounting", "financial"]
+    },
+    {
+        "keywords": ["legal", "compliance", "contracts", "corporate governance", "litigation", 
+                    "regulatory affairs", "intellectual property", "ip", "risk management", 
+                    "employment law", "data privacy", "gdpr", "general data protection regulation", 
+                    "legal counsel", "dispute resolution", "due diligence", "mergers & acquisitions", 
+                    "m&a", "corporate law", "legal documentation", "policy compliance", 
+                    "contract", "agreement", "terms", "policy", "regulation", "lawsuit", 
+                    "copyright", "trademark", "patent", "non-disclosure", "nda", "privacy policy", 
+                    "terms of service", "liability", "warranty", "indemnification", "arbitration", 
+                    "clause", "amendment", "addendum", "legal notice", "cease and desist", 
+                    "attorney", "lawyer", "court", "judge", "settlement"],
+        "filename_keywords": ["legal", "contract", "agreement", "terms", "compliance", "policy", "nda", 
+                             "lawsuit", "patent", "copyright", "trademark", "liability", "amendment", 
+                             "litigation", "gdpr", "governance", "regulatory", "intellectual property"],
+        "doc_type": "legal_document",
+        "department": "legal",
+        "confidence": 0.95,
+        "base_priority": "high",
+        "tags": ["legal", "contract", "compliance"]
+    },
+    {
+        "keywords": ["sales", "lead", "customer", "deal", "proposal", "quotation", "order", "client", 
+                    "prospect", "opportunity", "pipeline", "crm", "revenue", "commission", "target", 
+                    "forecast", "sales report", "customer acquisition", "retention", "upsell", 
+                    "cross-sell", "conversion", "roi", "kpi", "territory", "account management"],
+        "filename_keywords": ["sales", "lead", "proposal", "quote", "order", "client", "customer", 
+                             "deal", "opportunity", "pipeline", "forecast", "commission"],
+        "doc_type": "sales_document",
+        "department": "sales",
+        "confidence": 0.90,
+        "base_priority": "high",
+        "tags": ["sales", "customer", "revenue"]
+    },
+    {
+        "keywords": ["marketing", "campaign", "advertisement", "promotion", "brand", "social media", 
+                    "digital marketing", "content marketing", "seo", "sem", "ppc", "email marketing", 
+                    "influencer", "analytics", "metrics", "engagement", "reach", "impression", 
+                    "conversion rate", "market research", "competitor analysis", "target audience", 
+                    "demographic", "segmentation"],
+        "filename_keywords": ["marketing", "campaign", "ad", "promo", "brand", "social", "seo", 
+                             "analytics", "content", "digital", "email"],
+        "doc_type": "marketing_document",
+        "department": "marketing",
+        "confidence": 0.85,
+        "base_priority": "medium",
+        "tags": ["marketing", "campaign", "brand"]
+    },
+    {
+        "keywords": ["technology", "it", "software", "hardware", "system", "network", "security", 
+                    "server", "database", "infrastructure", "cybersecurity", "firewall", "backup", 
+                    "cloud", "api", "integration", "deployment", "maintenance", "troubleshooting", 
+                    "bug report", "feature request", "technical documentation", "user manual", 
+                    "system requirements"],
+        "filename_keywords": ["it", "tech", "software", "system", "network", "security", "server", 
+                             "database", "cloud", "api", "bug", "technical"],
+        "doc_type": "it_document",
+        "department": "it",
+        "confidence": 0.88,
+        "base_priority": "high",
+        "tags": ["it", "technology", "technical"]
+    },
+    {
+        "keywords": ["operations", "process", "workflow", "procedure", "logistics", "supply chain"],
+        "filename_keywords": ["operations", "process", "workflow", "procedure"],
+        "doc_type": "operations_document",
+        "department": "operations",
+        "confidence": 0.7,
+        "base_priority": "medium",
+        "tags": ["operations", "process"]
+    },
+    {
+        "keywords": ["support", "ticket", "issue", "complaint", "feedback", "resolution"],
+        "filename_keywords": ["support", "ticket", "issue"],
+        "doc_type": "support_document",
+        "department": "support",
+        "confidence": 0.7,
+        "base_priority": "medium",
+        "tags": ["support", "customer"]
+    },
+    {
+        "keywords": ["procurement", "purchase", "vendor", "supplier", "acquisition", "RFP"],
+        "filename_keywords": ["procurement", "purchase", "vendor", "supplier"],
+        "doc_type": "procurement_document",
+        "department": "procurement",
+        "confidence": 0.75,
+        "base_priority": "medium",
+        "tags": ["procurement", "purchase"]
+    },
+    {
+        "keywords": ["product", "research", "development", "innovation", "design", "prototype"],
+        "filename_keywords": ["product", "research", "development", "design"],
+        "doc_type": "product_document",
+        "department": "product",
+        "confidence": 0.75,
+        "base_priority": "medium",
+        "tags": ["product", "research"]
+    },
+    {
+        "keywords": ["administration", "admin", "office", "facility", "maintenance", "general"],
+        "filename_keywords": ["admin", "office", "facility", "maintenance"],
+        "doc_type": "admin_document",
+        "department": "administration",
+        "confidence": 0.6,
+        "base_priority": "low",
+        "tags": ["administration", "office"]
+    },
+    {
+        "keywords": ["executive", "management", "board", "strategy", "decision", "leadership"],
+        "filename_keywords": ["executive", "management", "board", "strategy"],
+        "doc_type": "executive_document",
+        "department": "executive",
+        "confidence": 0.8,
+        "base_priority": "high",
+        "tags": ["executive", "management"]
+    }
+]
+
+# Priority keywords match case-insensitively; rule keywords match as written
+LOCAL_KEYWORDS = KeywordMatcher({
+    'priority': [keyword.lower() for keyword in HIGH_PRIORITY_KEYWORDS + MEDIUM_PRIORITY_KEYWORDS + LOW_PRIORITY_KEYWORDS],
+    **{rule["department"]: rule["keywords"] for rule in CLASSIFICATION_RULES},
+    **{rule["department"] + ":filename": rule["filename_keywords"] for rule in CLASSIFICATION_RULES},
+})
+
 def classify_document_locally(content: str, filename: str):
     """Enhanced local classification with comprehensive keywords"""
     # Handle large documents by limiting content length for processing
     content_to_analyze = content[:5000] if len(content) > 5000 else content
-    content_lower = content_to_analyze.lower()
-    filename_lower = filename.lower()
-
-    # Enhanced priority classification keywords
-    high_priority_keywords = [
-        "by EOD", "by end of day", "by today", "asap", "urgent", "immediate", "within 24 hours", 
-        "deadline today", "due today", "respond by", "reply immediately", "EOD", "end of day", "today",
-        "action required", "requires immediate attention", "please review urgently", "high priority", 
-        "critical issue", "resolve now", "immediate action", "urgent response",
-        "escalated", "service disruption", "breach", "incident", "system down", "customer complaint", 
-        "payment failed", "critical error", "emergency", "outage", "security breach",
-        "today's meeting", "final review", "must attend", "confirmation needed", "urgent meeting"
-    ]
-
-    medium_priority_keywords = [
-        "reminder", "follow up", "this week", "pending", "awaiting response", "check status", 
-        "update needed", "follow-up", "status update",
-        "by tomorrow", "due in 2 days", "schedule by", "before Friday", "complete by", "ETA",
-        "due this week", "by end of week", "within 3 days",
-        "scheduled for", "calendar invite", "tentative", "planned discussion", "agenda",
-        "meeting request", "schedule meeting",
-        "work in progress", "assigned", "need update", "submit by", "to be reviewed",
-        "in progress", "task assigned", "please review"
-    ]
-
-    low_priority_keywords = [
-        "for your information", "no action needed", "for record", "just sharing", 
-        "reference document", "read only", "optional", "fyi", "for reference",
-        "next quarter", "next month", "future release", "roadmap", "tentative plan", 
-        "long-term goal", "backlog item", "future consideration",
-        "weekly summary", "monthly report", "feedback", "draft version", "notes", 
-        "not urgent", "informational", "general update"
-    ]
+    content_hits = LOCAL_KEYWORDS.scan(content_to_analyze.lower())
+    filename_hits = LOCAL_KEYWORDS.scan(filename.lower())
 
     # Priority determination with weighted scoring
     priority_score = 0
     matched_keywords = []
 
-    for keyword in high_priority_keywords:
-        if keyword.lower() in content_lower or keyword.lower() in filename_lower:
-            priority_score += 3
-            matched_keywords.append(keyword)
-
-    for keyword in medium_priority_keywords:
-        if keyword.lower() in content_lower or keyword.lower() in filename_lower:
-            priority_score += 2
-            matched_keywords.append(keyword)
-
-    for keyword in low_priority_keywords:
-        if keyword.lower() in content_lower or keyword.lower() in filename_lower:
-            priority_score += 1
-            matched_keywords.append(keyword)
+    for keywords, weight in ((HIGH_PRIORITY_KEYWORDS, 3), (MEDIUM_PRIORITY_KEYWORDS, 2), (LOW_PRIORITY_KEYWORDS, 1)):
+        for keyword in keywords:
+            if keyword.lower() in content_hits or keyword.lower() in filename_hits:
+                priority_score += weight
+                matched_keywords.append(keyword)
 
     # Determine final priority based on score
     if priority_score >= 6:
         keyword_priority = "high"
     elif priority_score >= 3:
-        keyword_priority = "high" if any(kw.lower() in content_lower for kw in high_priority_keywords[:10]) else "medium"
+        keyword_priority = "high" if any(kw.lower() in content_hits for kw in HIGH_PRIORITY_KEYWORDS[:10]) else "medium"
     elif priority_score >= 2:
         keyword_priority = "medium"
     else:
         keyword_priority = "low"
 
-    # Enhanced classification rules
-    classification_rules = [
-        {
-            "keywords": ["hr", "human resources", "employee relations", "talent acquisition", "recruitment", 
-                        "onboarding", "performance management", "compensation & benefits", "payroll", 
-                        "employee engagement", "training & development", "succession planning", 
-                        "workforce planning", "hr policies", "diversity & inclusion", "labor relations", 
-                        "employee retention", "hris", "benefits administration", "workplace safety", 
-                        "employee", "personnel", "hiring", "training", "performance", "benefits", 
-                        "leave", "vacation", "sick leave", "maternity", "paternity", "disciplinary", 
-                        "termination", "resignation", "promotion", "performance review", "appraisal", 
-                        "job description", "organizational chart", "employee handbook", "workplace policy", 
-                        "harassment", "diversity", "inclusion", "staff", "workforce", "compensation", 
-                        "salary review", "performance evaluation", "employee satisfaction", "team building", 
-                        "skill development", "career development"],
-            "filename_keywords": ["hr", "human resources", "employee", "personnel", "hiring", "recruitment", 
-                                 "training", "benefits", "leave", "performance", "onboarding", "handbook", 
-                                 "policy", "staff", "workforce", "compensation", "evaluation", "talent", 
-                                 "payroll", "engagement"],
-            "doc_type": "hr_document",
-            "department": "hr",
-            "confidence": 0.95,
-            "base_priority": "medium",
-            "tags": ["hr", "employee", "personnel"]
-        },
-        {
-            "keywords": ["finance", "financial planning", "budgeting", "accounting", "financial reporting", 
-                        "accounts payable", "accounts receivable", "general ledger", "cash flow", 
-                        "profit & loss", "balance sheet", "financial analysis", "treasury", 
-                        "tax compliance", "auditing", "cost management", "revenue forecasting", 
-                        "capital expenditure", "financial risk management", "erp", "enterprise resource planning", 
-                        "invoice", "payment", "bill", "receipt", "expense", "revenue", "profit", "loss", 
-                        "tax", "audit", "salary", "wage", "reimbursement", "cost", "expenditure", 
-                        "vendor payment", "purchase order", "transaction", "bank statement", "credit", "debit", 
-                        "financial", "fiscal", "budget", "expenditures"],
-            "filename_keywords": ["finance", "financial", "budget", "accounting", "invoice", "bill", "receipt", 
-                                 "payment", "expense", "tax", "audit", "payroll", "cost", "purchase", 
-                                 "transaction", "bank", "credit", "debit", "treasury", "revenue", "profit", "loss"],
-            "doc_type": "financial_document",
-            "department": "finance",
-            "confidence": 0.95,
-            "base_priority": "high",
-            "tags": ["finance", "accounting", "financial"]
-        },
-        {
-            "keywords": ["legal", "compliance", "contracts", "corporate governance", "litigation", 
-                        "regulatory affairs", "intellectual property", "ip", "risk management", 
-                        "employment law", "data privacy", "gdpr", "general data protection regulation", 
-                        "legal counsel", "dispute resolution", "due diligence", "mergers & acquisitions", 
-                        "m&a", "corporate law", "legal documentation", "policy compliance", 
-                        "contract", "agreement", "terms", "policy", "regulation", "lawsuit", 
-                        "copyright", "trademark", "patent", "non-disclosure", "nda", "privacy policy", 
-                        "terms of service", "liability", "warranty", "indemnification", "arbitration", 
-                        "clause", "amendment", "addendum", "legal notice", "cease and desist", 
-                        "attorney", "lawyer", "court", "judge", "settlement"],
-            "filename_keywords": ["legal", "contract", "agreement", "terms", "compliance", "policy", "nda", 
-                                 "lawsuit", "patent", "copyright", "trademark", "liability", "amendment", 
-                                 "litigation", "gdpr", "governance", "regulatory", "intellectual property"],
-            "doc_type": "legal_document",
-            "department": "legal",
-            "confidence": 0.95,
-            "base_priority": "high",
-            "tags": ["legal", "contract", "compliance"]
-        },
-        {
-            "keywords": ["sales", "lead", "customer", "deal", "proposal", "quotation", "order", "client", 
-                        "prospect", "opportunity", "pipeline", "crm", "revenue", "commission", "target", 
-                        "forecast", "sales report", "customer acquisition", "retention", "upsell", 
-                        "cross-sell", "conversion", "roi", "kpi", "territory", "account management"],
-            "filename_keywords": ["sales", "lead", "proposal", "quote", "order", "client", "customer", 
-                                 "deal", "opportunity", "pipeline", "forecast", "commission"],
-            "doc_type": "sales_document",
-            "department": "sales",
-            "confidence": 0.90,
-            "base_priority": "high",
-            "tags": ["sales", "customer", "revenue"]
-        },
-        {
-            "keywords": ["marketing", "campaign", "advertisement", "promotion", "brand", "social media", 
-                        "digital marketing", "content marketing", "seo", "sem", "ppc", "email marketing", 
-                        "influencer", "analytics", "metrics", "engagement", "reach", "impression", 
-                        "conversion rate", "market research", "competitor analysis", "target audience", 
-                        "demographic", "segmentation"],
-            "filename_keywords": ["marketing", "campaign", "ad", "promo", "brand", "social", "seo", 
-                                 "analytics", "content", "digital", "email"],
-            "doc_type": "marketing_document",
-            "department": "marketing",
-            "confidence": 0.85,
-            "base_priority": "medium",
-            "tags": ["marketing", "campaign", "brand"]
-        },
-        {
-            "keywords": ["technology", "it", "software", "hardware", "system", "network", "security", 
-                        "server", "database", "infrastructure", "cybersecurity", "firewall", "backup", 
-                        "cloud", "api", "integration", "deployment", "maintenance", "troubleshooting", 
-                        "bug report", "feature request", "technical documentation", "user manual", 
-                        "system requirements"],
-            "filename_keywords": ["it", "tech", "software", "system", "network", "security", "server", 
-                                 "database", "cloud", "api", "bug", "technical"],
-            "doc_type": "it_document",
-            "department": "it",
-            "confidence": 0.88,
-            "base_priority": "high",
-            "tags": ["it", "technology", "technical"]
-        },
-        {
-            "keywords": ["operations", "process", "workflow", "procedure", "logistics", "supply chain"],
-            "filename_keywords": ["operations", "process", "workflow", "procedure"],
-            "doc_type": "operations_document",
-            "department": "operations",
-            "confidence": 0.7,
-            "base_priority": "medium",
-            "tags": ["operations", "process"]
-        },
-        {
-            "keywords": ["support", "ticket", "issue", "complaint", "feedback", "resolution"],
-            "filename_keywords": ["support", "ticket", "issue"],
-            "doc_type": "support_document",
-            "department": "support",
-            "confidence": 0.7,
-            "base_priority": "medium",
-            "tags": ["support", "customer"]
-        },
-        {
-            "keywords": ["procurement", "purchase", "vendor", "supplier", "acquisition", "RFP"],
-            "filename_keywords": ["procurement", "purchase", "vendor", "supplier"],
-            "doc_type": "procurement_document",
-            "department": "procurement",
-            "confidence": 0.75,
-            "base_priority": "medium",
-            "tags": ["procurement", "purchase"]
-        },
-        {
-            "keywords": ["product", "research", "development", "innovation", "design", "prototype"],
-            "filename_keywords": ["product", "research", "development", "design"],
-            "doc_type": "product_document",
-            "department": "product",
-            "confidence": 0.75,
-            "base_priority": "medium",
-            "tags": ["product", "research"]
-        },
-        {
-            "keywords": ["administration", "admin", "office", "facility", "maintenance", "general"],
-            "filename_keywords": ["admin", "office", "facility", "maintenance"],
-            "doc_type": "admin_document",
-            "department": "administration",
-            "confidence": 0.6,
-            "base_priority": "low",
-            "tags": ["administration", "office"]
-        },
-        {
-            "keywords": ["executive", "management", "board", "strategy", "decision", "leadership"],
-            "filename_keywords": ["executive", "management", "board", "strategy"],
-            "doc_type": "executive_document",
-            "department": "executive",
-            "confidence": 0.8,
-            "base_priority": "high",
-            "tags": ["executive", "management"]
-        }
-    ]
-
     # Check each classification rule
-    for rule in classification_rules:
-        content_match = any(word in content_lower for word in rule["keywords"])
-        filename_match = any(word in filename_lower for word in rule["filename_keywords"])
+    for rule in CLASSIFICATION_RULES:
+        content_match = content_hits.any(rule["department"])
+        filename_match = filename_hits.any(rule["department"] + ":filename")
 
         if content_match or filename_match:
             final_priority = keyword_priority
@@ -296,99 +322,135 @@ def classify_document_locally(content: str, filename: str):
 async def root():
     return {"message": "Classification Service is running", "service": "classification"}
 
+# Keywords for /classify-text
+TEXT_HIGH_PRIORITY_KEYWORDS = ["urgent", "immediate", "asap", "critical", "emergency", "high priority"]
+TEXT_MEDIUM_PRIORITY_KEYWORDS = ["important", "priority", "attention", "review"]
+
+TEXT_KEYWORDS = KeywordMatcher({
+    # HR Keywords
+    'hr': ["hr", "human resources", "employee relations", "talent acquisition", "recruitment", 
+           "onboarding", "performance management", "compensation & benefits", "payroll",
+           "employee engagement", "training & development", "succession planning",
+           "workforce planning", "hr policies", "diversity & inclusion", "labor relations",
+           "employee retention", "hris", "benefits administration", "workplace safety",
+           "employee", "personnel", "hiring", "training", "performance", "benefits",
+           "leave", "vacation", "sick leave", "maternity", "paternity", "disciplinary",
+           "termination", "resignation", "promotion", "performance review", "appraisal",
+           "job description", "organizational chart", "employee handbook", "workplace policy",
+           "harassment", "diversity", "inclusion", "staff", "workforce", "compensation"],
+
+    # Finance Keywords
+    'finance': ["finance", "financial", "accounting", "invoice", "receipt", "payment", 
+                "billing", "budget", "expense", "revenue", "profit", "loss", "tax",
+                "audit", "financial statement", "balance sheet", "income statement",
+                "cash flow", "accounts payable", "accounts receivable", "procurement",
+                "purchase order", "vendor", "supplier", "cost", "pricing", "quote",
+                "estimate", "contract value", "financial analysis", "roi", "investment"],
+
+    # Legal Keywords  
+    'legal': ["legal", "law", "contract", "agreement", "terms", "conditions", "clause", 
+              "litigation", "compliance", "regulation", "policy", "procedure", "lawsuit",
+              "settlement", "damages", "liability", "intellectual property", "copyright",
+              "trademark", "patent", "confidentiality", "non-disclosure", "nda",
+              "terms of service", "privacy policy", "legal notice", "attorney", "lawyer"],
+
+    # IT Keywords
+    'it': ["it", "information technology", "software", "hardware", "system", "network", 
+           "security", "cybersecurity", "database", "server", "cloud", "infrastructure",
+           "technical", "programming", "development", "application", "platform",
+           "integration", "api", "maintenance", "support", "troubleshooting", "bug",
+           "feature", "requirement", "specification", "architecture", "deployment"],
+
+    'high_priority': TEXT_HIGH_PRIORITY_KEYWORDS,
+    'medium_priority': TEXT_MEDIUM_PRIORITY_KEYWORDS,
+})
+
+# (doc_type, department) per keyword category; ties go to the earlier entry
+TEXT_DEPARTMENTS = {
+    'hr': ('hr_document', 'hr'),
+    'finance': ('invoice', 'finance'),
+    'legal': ('contract', 'legal'),
+    'it': ('it_document', 'it'),
+}
+
+def rule_tables() -> dict:
+    """The tables this service classifies with; the main app fetches them (GET /rules) to
+    tell when documents it classified were scored with older rules"""
+    return {
+        'priority_keywords': [HIGH_PRIORITY_KEYWORDS, MEDIUM_PRIORITY_KEYWORDS, LOW_PRIORITY_KEYWORDS],
+        'classification_rules': CLASSIFICATION_RULES,
+        'text_keywords': TEXT_KEYWORDS.categories,
+        'text_priority_keywords': [TEXT_HIGH_PRIORITY_KEYWORDS, TEXT_MEDIUM_PRIORITY_KEYWORDS],
+        'text_departments': TEXT_DEPARTMENTS,
+    }
+
+TEXT_SCORING = KeywordScoringMatrix(TEXT_KEYWORDS, list(TEXT_DEPARTMENTS)) if vectorized_scoring_available() else None
+
+def text_priority(content_hits) -> str:
+    if content_hits.any('high_priority'):
+        return "high"
+    if content_hits.any('medium_priority'):
+        return "medium"
+    return "low"
+
+def build_classification(content: str, doc_type: str, department: str, score: int, priority: str) -> dict:
+    # If no clear classification, default to general
+    if score == 0:
+        doc_type = "general"
+        department = "administration"
+
+    return {
+        "doc_type": doc_type,
+        "department": department,
+        "confidence": min(score / 5.0, 1.0),  # Normalize confidence score
+        "priority": priority,
+        "extracted_text": content[:1000],
+        "page_count": 1,
+        "language": "en",
+        "tags": [doc_type, department, priority],
+        "priority_keywords": TEXT_HIGH_PRIORITY_KEYWORDS if priority == "high" else TEXT_MEDIUM_PRIORITY_KEYWORDS if priority == "medium" else []
+    }
+
+def classify_content(content: str, filename: str) -> dict:
+    """Keyword classification shared by /classify-text and /classify-batch"""
+    content_hits = TEXT_KEYWORDS.scan(content.lower())
+    hits = content_hits.union(TEXT_KEYWORDS.scan(filename.lower()))
+
+    # Determine classification
+    scores = {
+        doc_type: (hits.count(category), department)
+        for category, (doc_type, department) in TEXT_DEPARTMENTS.items()
+    }
+    scores['general'] = (0, 'administration')
+
+    # Find highest scoring category
+    best_match = max(scores.items(), key=lambda x: x[1][0])
+    doc_type, (score, department) = best_match
+
+    return build_classification(content, doc_type, department, score, text_priority(content_hits))
+
+def classify_contents(items: List[Tuple[str, str]]) -> List[dict]:
+    """classify_content for many (content, filename) pairs, scored with one sparse matrix product"""
+    if TEXT_SCORING is None or not items:
+        return [classify_content(content, filename) for content, filename in items]
+
+    content_hits = [TEXT_KEYWORDS.scan(content.lower()) for content, _ in items]
+    hits = [
+        document_hits.union(TEXT_KEYWORDS.scan(filename.lower()))
+        for document_hits, (_, filename) in zip(content_hits, items)
+    ]
+    best, best_scores = TEXT_SCORING.best(hits)
+    departments = list(TEXT_DEPARTMENTS.values())
+    return [
+        build_classification(content, *departments[best[index]], int(best_scores[index]), text_priority(content_hits[index]))
+        for index, (content, _) in enumerate(items)
+    ]
+
 @app.post("/classify-text")
 async def classify_text(request: ClassificationRequest):
     """Classify document based on text content"""
     try:
-        content_lower = request.content.lower()
-        filename_lower = request.filename.lower()
-
-        # Enhanced classification logic with comprehensive keywords
-        # HR Keywords
-        hr_keywords = ["hr", "human resources", "employee relations", "talent acquisition", "recruitment", 
-                      "onboarding", "performance management", "compensation & benefits", "payroll", 
-                      "employee engagement", "training & development", "succession planning", 
-                      "workforce planning", "hr policies", "diversity & inclusion", "labor relations", 
-                      "employee retention", "hris", "benefits administration", "workplace safety", 
-                      "employee", "personnel", "hiring", "training", "performance", "benefits", 
-                      "leave", "vacation", "sick leave", "maternity", "paternity", "disciplinary", 
-                      "termination", "resignation", "promotion", "performance review", "appraisal", 
-                      "job description", "organizational chart", "employee handbook", "workplace policy", 
-                      "harassment", "diversity", "inclusion", "staff", "workforce", "compensation"]
-
-        # Finance Keywords
-        finance_keywords = ["finance", "financial", "accounting", "invoice", "receipt", "payment", 
-                           "billing", "budget", "expense", "revenue", "profit", "loss", "tax", 
-                           "audit", "financial statement", "balance sheet", "income statement", 
-                           "cash flow", "accounts payable", "accounts receivable", "procurement", 
-                           "purchase order", "vendor", "supplier", "cost", "pricing", "quote", 
-                           "estimate", "contract value", "financial analysis", "roi", "investment"]
-
-        # Legal Keywords  
-        legal_keywords = ["legal", "law", "contract", "agreement", "terms", "conditions", "clause", 
-                         "litigation", "compliance", "regulation", "policy", "procedure", "lawsuit", 
-                         "settlement", "damages", "liability", "intellectual property", "copyright", 
-                         "trademark", "patent", "confidentiality", "non-disclosure", "nda", 
-                         "terms of service", "privacy policy", "legal notice", "attorney", "lawyer"]
-
-        # IT Keywords
-        it_keywords = ["it", "information technology", "software", "hardware", "system", "network", 
-                      "security", "cybersecurity", "database", "server", "cloud", "infrastructure", 
-                      "technical", "programming", "development", "application", "platform", 
-                      "integration", "api", "maintenance", "support", "troubleshooting", "bug", 
-                      "feature", "requirement", "specification", "architecture", "deployment"]
-
-        # General Keywords
-        general_keywords = ["general", "misc", "other", "administrative", "office", "facility", 
-                           "maintenance", "general inquiry", "information", "announcement", 
-                           "notification", "memo", "correspondence", "communication"]
-
-        # Classification logic
-        hr_score = sum(1 for keyword in hr_keywords if keyword in content_lower or keyword in filename_lower)
-        finance_score = sum(1 for keyword in finance_keywords if keyword in content_lower or keyword in filename_lower)
-        legal_score = sum(1 for keyword in legal_keywords if keyword in content_lower or keyword in filename_lower)
-        it_score = sum(1 for keyword in it_keywords if keyword in content_lower or keyword in filename_lower)
-
-        # Determine classification
-        scores = {
-            'hr_document': (hr_score, 'hr'),
-            'invoice': (finance_score, 'finance'), 
-            'contract': (legal_score, 'legal'),
-            'it_document': (it_score, 'it'),
-            'general': (0, 'administration')
-        }
-
-        # Find highest scoring category
-        best_match = max(scores.items(), key=lambda x: x[1][0])
-        doc_type, (score, department) = best_match
-
-        # Determine priority based on keywords
-        high_priority_keywords = ["urgent", "immediate", "asap", "critical", "emergency", "high priority"]
-        medium_priority_keywords = ["important", "priority", "attention", "review"]
-
-        priority = "low"
-        if any(keyword in content_lower for keyword in high_priority_keywords):
-            priority = "high"
-        elif any(keyword in content_lower for keyword in medium_priority_keywords):
-            priority = "medium"
-
-        # If no clear classification, default to general
-        if score == 0:
-            doc_type = "general"
-            department = "administration"
-
-        return {
-            "doc_type": doc_type,
-            "department": department,
-            "confidence": min(score / 5.0, 1.0),  # Normalize confidence score
-            "priority": priority,
-            "extracted_text": request.content[:1000],
-            "page_count": 1,
-            "language": "en",
-            "tags": [doc_type, department, priority],
-            "priority_keywords": high_priority_keywords if priority == "high" else medium_priority_keywords if priority == "medium" else []
-        }
-
+        return classify_content(request.content, request.filename)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
 
@@ -453,9 +515,55 @@ async def classify_document(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File classification failed: {str(e)}")
 
+def classify_batch_items(items: List[ClassificationRequest]) -> Iterator[dict]:
+    """Classify each item in order; a failing item yields an error entry instead of a result"""
+    for start in range(0, len(items), SCORING_CHUNK_SIZE):
+        chunk = items[start:start + SCORING_CHUNK_SIZE]
+        try:
+            results = classify_contents([(item.content, item.filename) for item in chunk])
+        except Exception:
+            # Classify one by one so only the failing items get an error entry
+            results = []
+            for item in chunk:
+                try:
+                    results.append(classify_content(item.content, item.filename))
+                except Exception as e:
+                    results.append({"error": f"Classification failed: {str(e)}"})
+        yield from results
+
+def stream_batch_results(items: List[ClassificationRequest]) -> Iterator[str]:
+    for result in classify_batch_items(items):
+        yield json.dumps(result) + "\n"
+
+@app.post("/classify-batch")
+async def classify_batch(batch: ClassificationBatchRequest, request: Request):
+    """Classify many documents in one request; results are returned in input order.
+
+    Clients that send `Accept: application/x-ndjson` get one JSON line per document,
+    streamed as soon as it is classified (recommended for large batches).
+    """
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} documents per batch")
+
+    # Scoring is CPU-bound: run it in the threadpool, not on the event loop
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(stream_batch_results(batch.items), media_type="application/x-ndjson")
+    results = await asyncio.to_thread(lambda: list(classify_batch_items(batch.items)))
+    return {"results": results}
+
+async def classify_message(message: dict) -> dict:
+    """Pipeline stage: classify the extracted text of a queued document"""
+    result = await asyncio.to_thread(classify_content, message["extracted_text"], message["filename"])
+    # The text itself is already in the message
+    return {key: value for key, value in result.items() if key != "extracted_text"}
+
 @app.get("/ping")
 async def ping():
     return {"message": "pong from Classification Service"}
 
+@app.get("/rules")
+async def get_rules():
+    return rule_tables()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
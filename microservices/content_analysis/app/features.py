@@ -0,0 +1,67 @@
+import re
+from typing import List, Tuple
+
+from libs.utils.keyword_matcher import KeywordHits, KeywordMatcher
+from libs.utils.pattern_scanner import PatternMatches, PatternScanner
+
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+')
+PARAGRAPH_BREAK = '\n\n'
+
+Span = Tuple[int, int]
+
+
+def split_spans(pattern: re.Pattern, text: str) -> List[Span]:
+    """(start, end) offsets of the pieces `pattern.split(text)` would return"""
+    spans = []
+    start = 0
+    for match in pattern.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return spans
+
+
+class DocumentFeatures:
+    """Text features of one document, computed once and shared by every analyzer.
+
+    `content_lower` / `tokens` / sentence spans are taken from the content as received;
+    `normalized` is the stripped text with line endings folded to '\\n' (used for the
+    summary). Keyword hits come from a single scan with `matcher`; regex matches from
+    `scanner` are computed on first use.
+    """
+
+    def __init__(self, content: str, matcher: KeywordMatcher, scanner: PatternScanner):
+        self.content = content
+        self.content_lower = content.lower()
+        self.normalized = content.strip().replace('\r\n', '\n').replace('\r', '\n')
+        self.normalized_lower = self.normalized.lower()
+        self.tokens = content.split()
+        self.sentence_spans = split_spans(SENTENCE_BOUNDARY, content)
+        self.paragraph_spans = [
+            (start, end) for start, end in split_spans(re.compile(re.escape(PARAGRAPH_BREAK)), content)
+            if content[start:end].strip()
+        ]
+        # Keywords never contain line breaks or edge whitespace, so hits in the raw
+        # lowercase text are the same as in the normalized text
+        self.hits: KeywordHits = matcher.scan(self.content_lower)
+        self.patterns: PatternMatches = scanner.scan(content)
+        # Stripping never changes which strings match; only a '\r' (which the summary
+        # folds to '\n') can, so the summary reuses the content matches when possible
+        self.summary_patterns: PatternMatches = (
+            self.patterns if '\r' not in content else scanner.scan(self.normalized)
+        )
+
+    @property
+    def word_count(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_spans)
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self.paragraph_spans)
+
+    def sentences(self) -> List[str]:
+        return [self.content[start:end] for start, end in self.sentence_spans]
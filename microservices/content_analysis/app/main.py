@@ -1,5 +1,8 @@
 from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import asyncio
 import sys
 import os
 import uvicorn
@@ -16,7 +19,22 @@ except ImportError:
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Content Analysis Service")
+from libs.messaging.pipeline import consume_stage
+from libs.utils.keyword_matcher import KeywordMatcher
+from libs.utils.pattern_scanner import PII_PATTERNS, PatternScanner
+from .features import DocumentFeatures
+
+# With AMQP_URL set, the service also analyzes documents queued on the pipeline's
+# analyze queue, handling up to PIPELINE_PREFETCH of them at a time
+AMQP_URL = os.environ.get("AMQP_URL", "")
+PIPELINE_PREFETCH = int(os.environ.get("PIPELINE_PREFETCH", "8"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with consume_stage(AMQP_URL, "analysis", analyze_message, PIPELINE_PREFETCH):
+        yield
+
+app = FastAPI(title="Content Analysis Service", lifespan=lifespan)
 
 class AnalysisRequest(BaseModel):
     doc_id: str
@@ -32,69 +50,67 @@ class AnalysisResponse(BaseModel):
     confidentiality_percent: float
     metadata: dict
 
-def extract_entities(content: str) -> dict:
+MONTH_DATE = r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b'
+
+# Entity, PII and summary patterns; each runs at most once per document
+ANALYSIS_PATTERNS = PatternScanner({
+    # Entity dates (case-insensitive)
+    'date_iso': (r'\d{4}-\d{2}-\d{2}', re.IGNORECASE),
+    'date_slash': (r'\d{2}/\d{2}/\d{4}', re.IGNORECASE),
+    'date_dash': (r'\d{2}-\d{2}-\d{4}', re.IGNORECASE),
+    'date_month': (MONTH_DATE, re.IGNORECASE),
+    # Potential names (capitalized words)
+    'name': r'\b[A-Z][a-z]+ [A-Z][a-z]+\b',
+    'amount_dollars': r'\$\d+\.?\d*',
+    'amount_words': r'\d+\.\d+\s*(?:dollars?|USD)',
+    'amount_grouped': r'\b\d+,\d+(?:\.\d+)?\b',
+    **PII_PATTERNS,
+    # Summary dates
+    'summary_date_month': MONTH_DATE,
+    'summary_date_dmy': r'\b\d{1,2}[/-]\d{1,2}[/-]\d{4}\b',
+    'summary_date_ymd': r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',
+})
+
+DATE_PATTERNS = ['date_iso', 'date_slash', 'date_dash', 'date_month']
+AMOUNT_PATTERNS = ['amount_dollars', 'amount_words', 'amount_grouped']
+
+def extract_entities(features: DocumentFeatures) -> dict:
     """Extract entities from content"""
+    matches = features.patterns
     entities = {
-        "names": [],
-        "dates": [],
-        "amounts": [],
+        "names": matches.found('name'),
+        "dates": [date for name in DATE_PATTERNS for date in matches.found(name)],
+        "amounts": [amount for name in AMOUNT_PATTERNS for amount in matches.found(name)],
         "organizations": [],
         "locations": []
     }
 
-    # Extract dates
-    date_patterns = [
-        r'\d{4}-\d{2}-\d{2}',
-        r'\d{2}/\d{2}/\d{4}',
-        r'\d{2}-\d{2}-\d{4}',
-        r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b'
-    ]
-    for pattern in date_patterns:
-        entities["dates"].extend(re.findall(pattern, content, re.IGNORECASE))
-
-    # Extract potential names (capitalized words)
-    name_pattern = r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'
-    entities["names"] = re.findall(name_pattern, content)
-
-    # Extract amounts
-    amount_patterns = [
-        r'\$\d+\.?\d*',
-        r'\d+\.\d+\s*(?:dollars?|USD)',
-        r'\b\d+,\d+(?:\.\d+)?\b'
-    ]
-    for pattern in amount_patterns:
-        entities["amounts"].extend(re.findall(pattern, content))
-
     return entities
 
-def extract_key_phrases(content: str) -> list:
-    """Extract key phrases from content"""
-    key_phrases = []
-
+# Keyword tables of every analyzer; they are compiled together into ANALYSIS_KEYWORDS
+# so each document is scanned once
+KEY_PHRASE_KEYWORDS = {
     # Important business terms
-    business_keywords = [
+    'business': [
         'contract', 'agreement', 'policy', 'procedure', 'deadline', 'budget',
         'invoice', 'payment', 'employee', 'department', 'manager', 'director',
         'project', 'meeting', 'review', 'approval', 'compliance', 'audit',
         'training', 'benefits', 'salary', 'performance', 'evaluation'
-    ]
+    ],
+}
 
-    content_lower = content.lower()
-    for keyword in business_keywords:
-        if keyword in content_lower:
-            key_phrases.append(keyword.title())
+def extract_key_phrases(features: DocumentFeatures) -> list:
+    """Extract key phrases from content"""
+    key_phrases = [keyword.title() for keyword in features.hits.found('business')]
 
     return list(set(key_phrases))[:10]  # Limit to 10 unique phrases
 
-def calculate_readability_score(content: str) -> float:
+def calculate_readability_score(features: DocumentFeatures) -> float:
     """Calculate basic readability score"""
-    words = content.split()
-    sentences = re.split(r'[.!?]+', content)
-
-    if len(sentences) == 0 or len(words) == 0:
+    if features.sentence_count == 0 or features.word_count == 0:
         return 0.5
 
-    avg_words_per_sentence = len(words) / max(len(sentences), 1)
+    avg_words_per_sentence = features.word_count / max(features.sentence_count, 1)
 
     # Simple readability: lower score for longer sentences
     if avg_words_per_sentence < 15:
@@ -104,89 +120,76 @@ def calculate_readability_score(content: str) -> float:
     else:
         return 0.4
 
-def calculate_risk_score(content: str, entities: dict) -> float:
-    """Calculate risk score based on content"""
-    risk_score = 0.0
-    content_lower = content.lower()
-
-    # High risk keywords
-    high_risk_keywords = ['urgent', 'immediate', 'deadline', 'legal', 'lawsuit', 'compliance', 'violation', 'emergency']
-    medium_risk_keywords = ['review', 'approve', 'action required', 'important', 'attention']
-
-    for keyword in high_risk_keywords:
-        if keyword in content_lower:
-            risk_score += 0.3
+RISK_KEYWORDS = {
+    'risk': {
+        # High risk keywords
+        **dict.fromkeys(['urgent', 'immediate', 'deadline', 'legal', 'lawsuit', 'compliance', 'violation', 'emergency'], 0.3),
+        # Medium risk keywords
+        **dict.fromkeys(['review', 'approve', 'action required', 'important', 'attention'], 0.1),
+    },
+}
 
-    for keyword in medium_risk_keywords:
-        if keyword in content_lower:
-            risk_score += 0.1
+def calculate_risk_score(features: DocumentFeatures, entities: dict) -> float:
+    """Calculate risk score based on content"""
+    risk_score = features.hits.score('risk')
 
     return min(risk_score, 1.0)
 
-def calculate_confidentiality_score(content: str) -> float:
-    """Calculate confidentiality percentage based on document content"""
-    content_lower = content.lower()
-
-    # High confidentiality keywords (30-50 points each)
-    high_conf_keywords = [
+CONFIDENTIALITY_KEYWORDS = {
+    # High confidentiality keywords (35 points each)
+    'confidentiality_high': dict.fromkeys([
         'confidential', 'classified', 'proprietary', 'trade secret', 'nda', 'non-disclosure',
         'salary', 'compensation', 'payroll', 'employee id', 'ssn', 'social security',
         'personal information', 'private', 'restricted', 'internal only', 'sensitive',
         'password', 'credit card', 'bank account', 'financial records', 'tax information',
         'medical records', 'health information', 'performance review', 'disciplinary action',
         'legal action', 'lawsuit', 'settlement', 'merger', 'acquisition', 'strategic plan'
-    ]
-
-    # Medium confidentiality keywords (10-20 points each)
-    medium_conf_keywords = [
+    ], 35),
+    # Medium confidentiality keywords (15 points each)
+    'confidentiality_medium': dict.fromkeys([
         'employee', 'staff', 'personnel', 'hr', 'human resources', 'department',
         'manager', 'supervisor', 'team', 'project', 'budget', 'cost', 'expense',
         'contract', 'agreement', 'vendor', 'client', 'customer', 'business plan',
         'meeting notes', 'discussion', 'strategy', 'policy', 'procedure'
-    ]
-
-    # Low confidentiality keywords (5-10 points each)
-    low_conf_keywords = [
+    ], 15),
+    # Low confidentiality keywords (reduce the score by 5 each)
+    'confidentiality_low': dict.fromkeys([
         'public', 'announcement', 'press release', 'newsletter', 'general information',
         'training', 'workshop', 'seminar', 'event', 'schedule', 'calendar'
-    ]
+    ], -5),
+    # Document type indicators
+    'confidentiality_request': ['request for', 'application', 'leave', 'vacation'],
+    'confidentiality_urgency': ['urgent', 'immediate', 'asap', 'priority'],
+}
+
+CONFIDENTIALITY_PATTERN_POINTS = {
+    'ssn': 40,
+    'credit_card': 45,
+    'money': 20,
+    'email': 15,
+    'phone': 10,
+    'employee_id': 25,
+}
+
+def calculate_confidentiality_score(features: DocumentFeatures) -> float:
+    """Calculate confidentiality percentage based on document content"""
+    content = features.content
+    hits = features.hits
 
     score = 0.0
-
-    # Check for high confidentiality content
-    for keyword in high_conf_keywords:
-        if keyword in content_lower:
-            score += 35
-
-    # Check for medium confidentiality content
-    for keyword in medium_conf_keywords:
-        if keyword in content_lower:
-            score += 15
-
-    # Check for low confidentiality content (reduces score)
-    for keyword in low_conf_keywords:
-        if keyword in content_lower:
-            score -= 5
+    for category in ('confidentiality_high', 'confidentiality_medium', 'confidentiality_low'):
+        score += hits.score(category)
 
     # Check for specific patterns that indicate confidentiality
-    patterns = {
-        r'\b\d{3}-\d{2}-\d{4}\b': 40,  # SSN pattern
-        r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b': 45,  # Credit card pattern
-        r'\$\d+(?:,\d{3})*(?:\.\d{2})?': 20,  # Money amounts
-        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b': 15,  # Email addresses
-        r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b': 10,  # Phone numbers
-        r'\bEMP\d+\b|\bID[-\s]?\d+\b': 25,  # Employee IDs
-    }
-
-    for pattern, points in patterns.items():
-        if re.search(pattern, content):
+    for name, points in CONFIDENTIALITY_PATTERN_POINTS.items():
+        if features.patterns.any(name):
             score += points
 
     # Document type indicators
-    if any(indicator in content_lower for indicator in ['request for', 'application', 'leave', 'vacation']):
+    if hits.any('confidentiality_request'):
         score += 20
 
-    if any(indicator in content_lower for indicator in ['urgent', 'immediate', 'asap', 'priority']):
+    if hits.any('confidentiality_urgency'):
         score += 10
 
     # Normalize score to percentage (0-100)
@@ -194,29 +197,60 @@ def calculate_confidentiality_score(content: str) -> float:
 
     return normalized_score
 
-def generate_summary(content: str) -> str:
+SUMMARY_KEYWORDS = {
+    # Document purpose, checked in this order
+    'purpose_request': ['request', 'application', 'asking', 'inquiry'],
+    'purpose_policy': ['policy', 'procedure', 'guideline', 'rule'],
+    'purpose_financial': ['invoice', 'bill', 'payment', 'receipt'],
+    'purpose_legal': ['contract', 'agreement', 'terms'],
+    'purpose_report': ['report', 'analysis', 'summary', 'findings'],
+    # Single terms looked up for requests, timeline and next steps
+    'summary_terms': ['remote work', 'work from home', 'leave balance', 'annual leave', 'vacation',
+                      'training', 'nomina', 'enroll', 'insurance', 'coverage', 'enrollment',
+                      'august', '2025', 'september', 'please let me know', 'documentation',
+                      'application', 'thank you'],
+    'topic_remote_work': ['remote work', 'work from home', 'flexible work', 'home office'],
+    'topic_leave_management': ['leave balance', 'annual leave', 'vacation', 'time off', 'pto'],
+    'topic_training': ['training', 'course', 'workshop', 'development', 'skill building'],
+    'topic_benefits': ['insurance', 'benefits', 'health coverage', 'medical plan'],
+    'topic_hr_policies': ['policy', 'procedure', 'hr', 'human resources'],
+    'topic_performance': ['performance', 'review', 'evaluation', 'assessment'],
+    'urgency': ['urgent', 'immediate', 'asap', 'priority', 'critical', 'important'],
+}
+
+SUMMARY_TOPICS = {
+    'Remote Work': 'topic_remote_work',
+    'Leave Management': 'topic_leave_management',
+    'Training': 'topic_training',
+    'Benefits': 'topic_benefits',
+    'HR Policies': 'topic_hr_policies',
+    'Performance': 'topic_performance'
+}
+
+def generate_summary(features: DocumentFeatures) -> str:
     """Generate intelligent bullet-point summary that analyzes and summarizes document content"""
-    if not content or len(content.strip()) == 0:
+    if not features.normalized:
         return "• Empty document uploaded\n• No content available for analysis\n• Please upload a document with text content"
 
     # Clean content
-    content = content.strip().replace('\r\n', '\n').replace('\r', '\n')
-    content_lower = content.lower()
+    content = features.normalized
+    content_lower = features.normalized_lower
+    hits = features.hits
 
     # Extract key information first
     summary_points = []
 
     # 1. Document Type and Purpose Analysis
     doc_purpose = ""
-    if any(keyword in content_lower for keyword in ['request', 'application', 'asking', 'inquiry']):
+    if hits.any('purpose_request'):
         doc_purpose = "Employee request/inquiry document"
-    elif any(keyword in content_lower for keyword in ['policy', 'procedure', 'guideline', 'rule']):
+    elif hits.any('purpose_policy'):
         doc_purpose = "Policy or procedural document"
-    elif any(keyword in content_lower for keyword in ['invoice', 'bill', 'payment', 'receipt']):
+    elif hits.any('purpose_financial'):
         doc_purpose = "Financial/billing document"
-    elif any(keyword in content_lower for keyword in ['contract', 'agreement', 'terms']):
+    elif hits.any('purpose_legal'):
         doc_purpose = "Legal/contractual document"
-    elif any(keyword in content_lower for keyword in ['report', 'analysis', 'summary', 'findings']):
+    elif hits.any('purpose_report'):
         doc_purpose = "Report or analysis document"
     else:
         doc_purpose = "General business document"
@@ -228,8 +262,7 @@ def generate_summary(content: str) -> str:
     dept_pattern = r'\b(?:hr|human resources|finance|legal|it|marketing|sales|operations|administration)\b'
     departments = list(set(re.findall(dept_pattern, content_lower)))
 
-    name_pattern = r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'
-    names = re.findall(name_pattern, content)
+    names = features.summary_patterns.found('name')
 
     if names:
         people_mentioned = list(set(names))[:3]  # Limit to 3 names
@@ -247,16 +280,16 @@ def generate_summary(content: str) -> str:
     action_items = []
 
     # Look for specific request patterns with better context
-    if 'remote work' in content_lower or 'work from home' in content_lower:
+    if 'remote work' in hits or 'work from home' in hits:
         action_items.append("Request for remote work flexibility")
 
-    if 'leave balance' in content_lower or 'annual leave' in content_lower or 'vacation' in content_lower:
+    if 'leave balance' in hits or 'annual leave' in hits or 'vacation' in hits:
         action_items.append("Request for leave balance inquiry")
 
-    if 'training' in content_lower and ('nomina' in content_lower or 'enroll' in content_lower):
+    if 'training' in hits and ('nomina' in hits or 'enroll' in hits):
         action_items.append("Request for training enrollment")
 
-    if 'insurance' in content_lower and ('coverage' in content_lower or 'enrollment' in content_lower):
+    if 'insurance' in hits and ('coverage' in hits or 'enrollment' in hits):
         action_items.append("Request for insurance information")
 
     # Generic pattern matching as fallback
@@ -282,20 +315,14 @@ def generate_summary(content: str) -> str:
     timeline_info = []
 
     # Find specific dates
-    date_patterns = [
-        r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',
-        r'\b\d{1,2}[/-]\d{1,2}[/-]\d{4}\b',
-        r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b'
-    ]
-
-    for pattern in date_patterns:
-        dates = re.findall(pattern, content)
+    for name in ('summary_date_month', 'summary_date_dmy', 'summary_date_ymd'):
+        dates = features.summary_patterns.found(name)
         date_info.extend(dates[:3])
 
     # Look for timeline context
-    if 'august' in content_lower and '2025' in content_lower:
+    if 'august' in hits and '2025' in hits:
         timeline_info.append("Starting August 2025")
-    if 'september' in content_lower:
+    if 'september' in hits:
         timeline_info.append("September planning mentioned")
 
     if date_info or timeline_info:
@@ -307,26 +334,13 @@ def generate_summary(content: str) -> str:
         summary_points.append(f"• Important Dates: {' | '.join(date_summary)}")
 
     # 5. Key Topics and Categories
-    topic_keywords = {
-        'Remote Work': ['remote work', 'work from home', 'flexible work', 'home office'],
-        'Leave Management': ['leave balance', 'annual leave', 'vacation', 'time off', 'pto'],
-        'Training': ['training', 'course', 'workshop', 'development', 'skill building'],
-        'Benefits': ['insurance', 'benefits', 'health coverage', 'medical plan'],
-        'HR Policies': ['policy', 'procedure', 'hr', 'human resources'],
-        'Performance': ['performance', 'review', 'evaluation', 'assessment']
-    }
-
-    identified_topics = []
-    for topic, keywords in topic_keywords.items():
-        if any(keyword in content_lower for keyword in keywords):
-            identified_topics.append(topic)
+    identified_topics = [topic for topic, category in SUMMARY_TOPICS.items() if hits.any(category)]
 
     if identified_topics:
         summary_points.append(f"• Main Topics: {', '.join(identified_topics[:4])}")
 
     # 6. Urgency and Priority Indicators
-    urgency_keywords = ['urgent', 'immediate', 'asap', 'priority', 'critical', 'important']
-    urgent_indicators = [keyword for keyword in urgency_keywords if keyword in content_lower]
+    urgent_indicators = hits.found('urgency')
 
     if urgent_indicators:
         summary_points.append(f"• Priority Level: High - contains {', '.join(urgent_indicators[:3])}")
@@ -335,11 +349,11 @@ def generate_summary(content: str) -> str:
 
     # 7. Document Conclusion/Next Steps
     next_steps = []
-    if 'please let me know' in content_lower:
+    if 'please let me know' in hits:
         next_steps.append("Awaiting response from HR")
-    if 'documentation' in content_lower or 'application' in content_lower:
+    if 'documentation' in hits or 'application' in hits:
         next_steps.append("May require additional documentation")
-    if 'thank you' in content_lower:
+    if 'thank you' in hits:
         next_steps.append("Formal request submitted")
 
     if next_steps:
@@ -358,36 +372,47 @@ def generate_summary(content: str) -> str:
 async def root():
     return {"message": "Content Analysis Service is running", "service": "content_analysis"}
 
-@app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_content(request: AnalysisRequest):
+SENTIMENT_KEYWORDS = {
+    'positive': ["good", "excellent", "positive", "success", "approve", "great", "thank you", "appreciate"],
+    'negative': ["bad", "terrible", "negative", "fail", "reject", "poor", "urgent", "problem", "issue"],
+}
+
+ANALYSIS_KEYWORDS = KeywordMatcher({
+    **KEY_PHRASE_KEYWORDS,
+    **RISK_KEYWORDS,
+    **CONFIDENTIALITY_KEYWORDS,
+    **SUMMARY_KEYWORDS,
+    **SENTIMENT_KEYWORDS,
+})
+
+def analyze_document(request: AnalysisRequest) -> AnalysisResponse:
     """Analyze document content and return comprehensive analysis"""
     try:
+        # Tokens, sentences and keyword hits are computed once for all analyzers
+        features = DocumentFeatures(request.content, ANALYSIS_KEYWORDS, ANALYSIS_PATTERNS)
+
         # Extract entities
-        entities = extract_entities(request.content)
+        entities = extract_entities(features)
 
         # Generate intelligent summary
-        summary = generate_summary(request.content)
+        summary = generate_summary(features)
 
         # Extract key phrases
-        key_phrases = extract_key_phrases(request.content)
+        key_phrases = extract_key_phrases(features)
 
         # Calculate readability score
-        readability_score = calculate_readability_score(request.content)
+        readability_score = calculate_readability_score(features)
 
         # Calculate risk score
-        risk_score = calculate_risk_score(request.content, entities)
+        risk_score = calculate_risk_score(features, entities)
 
         # Calculate confidentiality score
-        confidentiality_percent = calculate_confidentiality_score(request.content)
+        confidentiality_percent = calculate_confidentiality_score(features)
 
         # Basic sentiment analysis (simplified)
         sentiment = "neutral"
-        positive_words = ["good", "excellent", "positive", "success", "approve", "great", "thank you", "appreciate"]
-        negative_words = ["bad", "terrible", "negative", "fail", "reject", "poor", "urgent", "problem", "issue"]
-
-        content_lower = request.content.lower()
-        positive_count = sum(1 for word in positive_words if word in content_lower)
-        negative_count = sum(1 for word in negative_words if word in content_lower)
+        positive_count = features.hits.count('positive')
+        negative_count = features.hits.count('negative')
 
         if positive_count > negative_count:
             sentiment = "positive"
@@ -396,10 +421,10 @@ async def analyze_content(request: AnalysisRequest):
 
         # Additional metadata
         metadata = {
-            "word_count": len(request.content.split()),
-            "sentence_count": len(re.split(r'[.!?]+', request.content)),
-            "paragraph_count": len([p for p in request.content.split('\n\n') if p.strip()]),
-            "avg_sentence_length": len(request.content.split()) / max(len(re.split(r'[.!?]+', request.content)), 1),
+            "word_count": features.word_count,
+            "sentence_count": features.sentence_count,
+            "paragraph_count": features.paragraph_count,
+            "avg_sentence_length": features.word_count / max(features.sentence_count, 1),
             "confidentiality_level": "High" if confidentiality_percent >= 70 else "Medium" if confidentiality_percent >= 30 else "Low"
         }
 
@@ -429,6 +454,16 @@ async def analyze_content(request: AnalysisRequest):
             metadata={"word_count": 0, "sentence_count": 0, "paragraph_count": 0, "avg_sentence_length": 0, "confidentiality_level": "Low"}
         )
 
+@app.post("/analyze", response_model=AnalysisResponse)
+async def analyze_content(request: AnalysisRequest):
+    """Analyze document content and return comprehensive analysis"""
+    return analyze_document(request)
+
+async def analyze_message(message: dict) -> dict:
+    """Pipeline stage: analyze the extracted text of a queued document"""
+    request = AnalysisRequest(doc_id=message["doc_id"], content=message["extracted_text"])
+    return jsonable_encoder(await asyncio.to_thread(analyze_document, request))
+
 @app.get("/ping")
 async def ping():
     return {"message": "pong from Content Analysis Service"}
@@ -1,12 +1,29 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 import sys
 import os
 import uvicorn
 from typing import Dict, List, Optional
 import datetime
 
-app = FastAPI(title="Routing Engine Service")
+# Add the project root to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+
+from libs.messaging.pipeline import consume_stage
+
+# With AMQP_URL set, the service also routes documents queued on the pipeline's
+# route queue, handling up to PIPELINE_PREFETCH of them at a time
+AMQP_URL = os.environ.get("AMQP_URL", "")
+PIPELINE_PREFETCH = int(os.environ.get("PIPELINE_PREFETCH", "8"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with consume_stage(AMQP_URL, "routing", route_message, PIPELINE_PREFETCH):
+        yield
+
+app = FastAPI(title="Routing Engine Service", lifespan=lifespan)
 
 class RoutingRequest(BaseModel):
     doc_id: str
@@ -334,6 +351,20 @@ async def bulk_route_documents(requests: List[RoutingRequest]):
 
     return {"results": results, "total_processed": len(results)}
 
+async def route_message(message: dict) -> dict:
+    """Pipeline stage: route a queued document by its classification and analysis"""
+    classification = message["classification"]
+    request = RoutingRequest(
+        doc_id=message["doc_id"],
+        doc_type=classification["doc_type"],
+        department=classification["department"],
+        priority=classification["priority"],
+        content_summary=(message.get("analysis") or {}).get("summary"),
+        file_size=message.get("file_size"),
+        user_department=message.get("user_department")
+    )
+    return jsonable_encoder(await route_document(request))
+
 @app.get("/ping")
 async def ping():
     return {"message": "pong from Routing Engine Service"}
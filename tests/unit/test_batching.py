@@ -0,0 +1,27 @@
+import asyncio
+import pytest
+from libs.utils.batching import MicroBatcher
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_batches_in_order():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=3, max_wait=0.01)
+    results = await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+    assert results == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2], [3, 4]]
+    await batcher.close()
+
+@pytest.mark.asyncio
+async def test_handler_error_reaches_every_caller():
+    async def handler(items):
+        raise RuntimeError("service down")
+
+    batcher = MicroBatcher(handler, max_batch_size=10, max_wait=0.01)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    await batcher.close()
@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from microservices.classification.app.main import app
@@ -9,6 +10,13 @@ def test_ping():
     assert response.status_code == 200
     assert response.json() == {"message": "pong from Classification Service"}
 
+def test_rules_lists_the_classification_tables():
+    response = client.get("/rules")
+    assert response.status_code == 200
+    rules = response.json()
+    assert rules["text_departments"]["finance"] == ["invoice", "finance"]
+    assert "invoice" in rules["text_keywords"]["finance"]
+
 @pytest.mark.asyncio
 async def test_classify_document():
     with open("test.txt", "w") as f:
@@ -17,4 +25,17 @@ async def test_classify_document():
         response = client.post("/classify", files={"file": ("test.txt", f, "text/plain")})
     assert response.status_code == 200
     assert response.json()["doc_type"] == "invoice"
-    assert response.json()["confidence"] == 0.95
\ No newline at end of file
+    assert response.json()["confidence"] == 0.95
+
+def test_classify_batch_keeps_input_order():
+    items = [
+        {"content": "Invoice payment budget", "filename": "a.txt", "file_type": "txt"},
+        {"content": "Employee leave request", "filename": "b.txt", "file_type": "txt"},
+    ]
+    response = client.post("/classify-batch", json={"items": items})
+    assert response.status_code == 200
+    assert [result["department"] for result in response.json()["results"]] == ["finance", "hr"]
+
+    streamed = client.post("/classify-batch", json={"items": items}, headers={"Accept": "application/x-ndjson"})
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in streamed.text.splitlines()] == response.json()["results"]
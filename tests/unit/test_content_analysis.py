@@ -1,6 +1,8 @@
+import re
 import pytest
 from fastapi.testclient import TestClient
-from microservices.content_analysis.app.main import app
+from microservices.content_analysis.app.main import app, ANALYSIS_KEYWORDS, ANALYSIS_PATTERNS
+from microservices.content_analysis.app.features import DocumentFeatures
 
 client = TestClient(app)
 
@@ -14,4 +16,12 @@ async def test_analyze_content():
     response = client.post("/analyze", json={"doc_id": "123e4567-e89b-12d3-a456-426614174000", "content": "John Doe signed on 2025-07-11"})
     assert response.status_code == 200
     assert response.json()["entities"]["names"] == ["John Doe"]
-    assert response.json()["entities"]["dates"] == ["2025-07-11"]
\ No newline at end of file
+    assert response.json()["entities"]["dates"] == ["2025-07-11"]
+
+def test_document_features_match_plain_splits():
+    content = "Urgent: budget review.\r\n\nPlease approve! Thanks...\n\n\n  \n\nFinal note"
+    features = DocumentFeatures(content, ANALYSIS_KEYWORDS, ANALYSIS_PATTERNS)
+    assert features.tokens == content.split()
+    assert features.sentences() == re.split(r'[.!?]+', content)
+    assert features.paragraph_count == len([p for p in content.split('\n\n') if p.strip()])
+    assert features.hits.found('urgency') == ['urgent']
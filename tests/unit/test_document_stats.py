@@ -0,0 +1,44 @@
+import sqlite3
+
+from libs.database.document_stats import DOCUMENT_STATS_SCHEMA, read_document_stats
+
+def make_connection():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE documents (id INTEGER PRIMARY KEY, uploaded_by TEXT, uploaded_at TEXT, document_type TEXT, '
+                 'department TEXT, priority TEXT, processing_status TEXT, review_status TEXT)')
+    conn.execute("INSERT INTO documents VALUES (1, 'a@x', '2025-01-01 09:00:00', 'invoice', 'finance', 'high', "
+                 "'classified', 'pending')")
+    for statement in DOCUMENT_STATS_SCHEMA:
+        conn.execute(statement)
+    return conn
+
+def add(conn, uploaded_by, department, review_status='pending', day='2025-01-02'):
+    conn.execute("INSERT INTO documents (uploaded_by, uploaded_at, document_type, department, priority, "
+                 "processing_status, review_status) VALUES (?, ?, NULL, ?, NULL, 'uploaded', ?)",
+                 (uploaded_by, f'{day} 10:00:00', department, review_status))
+
+def test_counters_include_existing_and_new_documents():
+    conn = make_connection()
+    add(conn, 'b@x', 'legal')
+    stats = read_document_stats(conn, since_day='2025-01-01')
+    assert (stats['total_documents'], stats['processed_documents'], stats['pending_documents']) == (2, 1, 2)
+    assert stats['document_types'] == {'invoice': 1, 'unknown': 1}
+    assert stats['priorities'] == {'high': 1, 'medium': 1}
+    assert stats['daily_uploads'] == {'2025-01-01': 1, '2025-01-02': 1}
+    assert read_document_stats(conn, since_day='2025-01-02')['daily_uploads'] == {'2025-01-02': 1}
+
+def test_counters_follow_updates_deletes_and_role_filters():
+    conn = make_connection()
+    add(conn, 'b@x', 'legal')
+    add(conn, 'a@x', 'legal')
+    conn.execute("UPDATE documents SET review_status = 'approved', department = 'hr' WHERE id = 1")
+    conn.execute("DELETE FROM documents WHERE id = 2")
+    stats = read_document_stats(conn)
+    assert (stats['total_documents'], stats['pending_documents']) == (2, 1)
+    assert stats['departments'] == {'hr': 1, 'legal': 1}
+
+    manager = read_document_stats(conn, " AND (uploaded_by = ? OR department = ?)", ['b@x', 'hr'])
+    assert manager['total_documents'] == 1
+    employee = read_document_stats(conn, " AND uploaded_by = ?", ['a@x'])
+    assert employee['total_documents'] == 2
+    assert read_document_stats(conn, " AND uploaded_by = ?", ['b@x'])['departments'] == {}
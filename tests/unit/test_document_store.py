@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from libs.database.document_store import DocumentStore
+from libs.database.sqlite_pool import SQLitePool
+
+SCHEMA = [
+    'CREATE TABLE users (id INTEGER PRIMARY KEY, full_name TEXT, email TEXT UNIQUE, password_hash TEXT,'
+    ' department TEXT, role TEXT)',
+    'CREATE TABLE documents (id INTEGER PRIMARY KEY, doc_id TEXT UNIQUE, original_name TEXT, uploaded_by TEXT,'
+    ' department TEXT, review_status TEXT, reviewed_by TEXT)',
+    'CREATE TABLE email_notifications (id INTEGER PRIMARY KEY, doc_id TEXT, sent_by TEXT, received_by TEXT,'
+    ' subject TEXT NOT NULL, sent_at TEXT DEFAULT CURRENT_TIMESTAMP)',
+    'CREATE TABLE upload_batches (batch_id TEXT PRIMARY KEY, total_files INTEGER, processed_files INTEGER DEFAULT 0,'
+    " failed_files INTEGER DEFAULT 0, reused_files INTEGER DEFAULT 0, status TEXT DEFAULT 'processing',"
+    ' completed_at TEXT, owner TEXT, heartbeat_at TEXT)',
+]
+
+@pytest.fixture
+def store(tmp_path):
+    pool = SQLitePool(str(tmp_path / 'test.db'))
+    conn = pool.acquire()
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    pool.release(conn)
+    store = DocumentStore(pool, max_workers=2)
+    yield store
+    pool.close()
+
+@pytest.mark.asyncio
+async def test_queries_run_off_the_event_loop_and_return_named_rows(store):
+    assert await store.create_user({'full_name': 'Ann', 'email': 'ann@x', 'password_hash': 'h',
+                                    'department': 'hr', 'role': 'manager'})
+    assert not await store.create_user({'full_name': 'Ann', 'email': 'ann@x', 'password_hash': 'h',
+                                        'department': 'hr', 'role': 'manager'})
+    user = await store.get_user('ann@x')
+    assert (user['full_name'], user['role']) == ('Ann', 'manager')
+    assert await store.get_user('nobody@x') is None
+    assert await store.user_names() == {'ann@x': 'Ann'}
+
+    await store.insert_document({'doc_id': 'a', 'original_name': 'a.txt', 'uploaded_by': 'ann@x', 'department': 'hr'})
+    await store.insert_document({'doc_id': 'b', 'original_name': 'b.txt', 'uploaded_by': 'bob@x', 'department': 'it'})
+    assert await store.count_documents('', ' AND d.department = ?', ['hr']) == 1
+    rows = await store.list_documents('d.doc_id, d.original_name AS name', '', '', [], 'd.doc_id DESC', 1)
+    assert [(row['doc_id'], row['name']) for row in rows] == [('b', 'b.txt')]
+
+    threads = await store.run(lambda conn: threading.current_thread().name)
+    assert threads.startswith('db') and threads != threading.current_thread().name
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_review_and_notification_are_written_together(store):
+    await store.insert_document({'doc_id': 'a', 'original_name': 'a.txt', 'uploaded_by': 'ann@x'})
+    review = {'review_status': 'approved', 'reviewed_by': 'boss@x'}
+    assert await store.record_review('a', review, {'doc_id': 'a', 'sent_by': 'boss@x', 'received_by': 'ann@x',
+                                                   'subject': 'Approved'})
+    assert (await store.get_document('a'))['review_status'] == 'approved'
+    assert not await store.record_review('missing', review, {'doc_id': 'missing', 'sent_by': 'boss@x',
+                                                             'received_by': 'ann@x', 'subject': 'Approved'})
+
+    # A failing notification insert (subject is NOT NULL) rolls the review back
+    with pytest.raises(Exception):
+        await store.record_review('a', {'review_status': 'rejected'}, {'doc_id': 'a', 'sent_by': 'boss@x',
+                                                                        'received_by': 'ann@x', 'subject': None})
+    assert (await store.get_document('a'))['review_status'] == 'approved'
+    notifications = await store.list_notifications(' AND e.received_by = ?', ['ann@x'])
+    assert [(n['subject'], n['sent_by_name']) for n in notifications] == [('Approved', None)]
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_batches_without_a_recent_heartbeat_are_closed(store):
+    await store.create_batch({'batch_id': 'started', 'total_files': 3, 'owner': 'gone',
+                              'heartbeat_at': '2024-01-01T00:00:00+00:00'})
+    await store.create_batch({'batch_id': 'queued', 'total_files': 2, 'owner': 'gone',
+                              'heartbeat_at': '2024-01-01T00:00:00+00:00'})
+    await store.create_batch({'batch_id': 'live', 'total_files': 1, 'owner': 'live',
+                              'heartbeat_at': '2024-01-01T00:00:00+00:00'})
+    await store.record_batch_progress('started', succeeded=True)
+    await store.touch_batches('live', '2024-01-01T00:05:00+00:00')
+
+    assert await store.close_abandoned_batches('2024-01-01T00:02:00+00:00') == 2
+    started, queued, live = [await store.get_batch(b) for b in ('started', 'queued', 'live')]
+    assert (started['status'], started['processed_files'], started['failed_files']) == ('completed', 1, 2)
+    assert (queued['status'], queued['failed_files']) == ('failed', 2) and queued['completed_at']
+    assert live['status'] == 'processing'
+    assert await store.close_abandoned_batches('2024-01-01T00:02:00+00:00') == 0
+    await store.close()
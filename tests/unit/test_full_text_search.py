@@ -0,0 +1,39 @@
+import sqlite3
+
+from libs.database.full_text_search import FULL_TEXT_SEARCH_SCHEMA, SEARCH_SNIPPET, match_query
+
+def make_connection():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE documents (id INTEGER PRIMARY KEY, original_name TEXT, extracted_text TEXT, '
+                 'summary TEXT, key_phrases TEXT, department TEXT)')
+    conn.execute("INSERT INTO documents VALUES (1, 'invoice.pdf', 'Payment due for services', '', '[]', 'finance')")
+    for statement in FULL_TEXT_SEARCH_SCHEMA:
+        conn.execute(statement)
+    return conn
+
+def search(conn, text):
+    return conn.execute(
+        f"SELECT d.id, {SEARCH_SNIPPET} FROM documents d JOIN documents_fts ON documents_fts.rowid = d.id "
+        "WHERE documents_fts MATCH ? ORDER BY d.id", (match_query(text),)
+    ).fetchall()
+
+def test_match_query_requires_every_word_as_prefix():
+    assert match_query('Invoice pay"') == '"Invoice"* "pay"*'
+    assert match_query(' -- ') is None
+
+def test_existing_and_new_documents_are_searchable():
+    conn = make_connection()
+    conn.execute("INSERT INTO documents VALUES (2, 'contract.docx', 'Payment terms of the agreement', '', '[]', 'legal')")
+    assert search(conn, 'invoice') == [(1, 'Payment due for services')]
+    assert search(conn, 'paym') == [(1, '<mark>Payment</mark> due for services'),
+                                    (2, '<mark>Payment</mark> terms of the agreement')]
+
+def test_index_follows_updates_and_deletes():
+    conn = make_connection()
+    conn.execute("UPDATE documents SET extracted_text = 'Overdue reminder' WHERE id = 1")
+    assert search(conn, 'payment') == []
+    assert [row[0] for row in search(conn, 'overdue')] == [1]
+    conn.execute("UPDATE documents SET department = 'legal' WHERE id = 1")
+    assert [row[0] for row in search(conn, 'overdue')] == [1]
+    conn.execute('DELETE FROM documents WHERE id = 1')
+    assert search(conn, 'overdue') == []
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from libs.database.keyset_pagination import InvalidCursor, KeysetOrder, next_cursor
+
+def make_connection():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE documents (id INTEGER PRIMARY KEY, doc_id TEXT UNIQUE, uploaded_at TEXT)')
+    # Three documents share each timestamp, so pages have to break ties on doc_id
+    conn.executemany('INSERT INTO documents (doc_id, uploaded_at) VALUES (?, ?)',
+                     [(f'doc-{i:02d}', f'2025-01-0{i % 4 + 1}') for i in range(12)])
+    return conn
+
+def pages(conn, order, page_size):
+    cursor, result = None, []
+    while True:
+        condition, params = order.after(cursor) if cursor else ('', [])
+        rows = conn.execute(
+            f'SELECT d.doc_id, {order.key} FROM documents d WHERE 1=1{condition} ORDER BY {order.order_by()} LIMIT ?',
+            params + [page_size + 1]
+        ).fetchall()
+        cursor = next_cursor(order, rows, page_size, key_index=-1, tie_index=0)
+        result.append([row[0] for row in rows])
+        if cursor is None:
+            return result
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_pages_cover_the_sorted_rows_once(descending):
+    conn = make_connection()
+    order = KeysetOrder('uploaded_at', 'd.uploaded_at', descending=descending)
+    everything = [row[0] for row in conn.execute(f'SELECT d.doc_id FROM documents d ORDER BY {order.order_by()}')]
+    result = pages(conn, order, page_size=5)
+    assert [len(page) for page in result] == [5, 5, 2]
+    assert sum(result, []) == everything
+
+def test_cursor_is_checked_against_the_sort_order():
+    cursor = KeysetOrder('name_asc', 'd.original_name').encode('a.txt', 'doc-01')
+    with pytest.raises(InvalidCursor):
+        KeysetOrder('uploaded_at_desc', 'd.uploaded_at', descending=True).after(cursor)
+    with pytest.raises(InvalidCursor):
+        KeysetOrder('name_asc', 'd.original_name').after('not a cursor')
@@ -0,0 +1,26 @@
+import random
+from libs.utils.keyword_matcher import KeywordMatcher
+
+def test_hits_match_substring_semantics():
+    keywords = ['hr', 'human resources', 'leave', 'sick leave', 'it', 'tax', 'tax information']
+    matcher = KeywordMatcher({'words': keywords})
+    alphabet = 'hrumanesoclavkitxfn '
+    for _ in range(500):
+        text = ''.join(random.choice(alphabet) for _ in range(random.randint(0, 60)))
+        hits = matcher.scan(text)
+        assert hits.found('words') == [keyword for keyword in keywords if keyword in text]
+        for keyword, offset in hits.first_seen.items():
+            assert text.find(keyword) == offset
+
+def test_categories_weights_and_extra_texts():
+    matcher = KeywordMatcher({
+        'finance': ['invoice', 'payroll', 'roi'],
+        'hr': ['payroll', 'leave'],
+        'urgency': {'urgent': 3, 'asap': 2},
+    })
+    hits = matcher.scan('urgent: payroll report', 'q3_roi.pdf')
+    assert hits.found('finance') == ['payroll', 'roi']
+    assert hits.count('hr') == 1
+    assert hits.any('urgency') and hits.score('urgency') == 3
+    assert list(hits.items()) == [('finance', 'payroll', 1), ('finance', 'roi', 1), ('hr', 'payroll', 1), ('urgency', 'urgent', 3)]
+    assert not matcher.scan('').any('finance')
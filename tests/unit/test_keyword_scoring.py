@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from libs.utils.keyword_matcher import KeywordMatcher
+from libs.utils.keyword_scoring import KeywordScoringMatrix
+
+def test_matrix_scores_match_per_document_scores():
+    matcher = KeywordMatcher({
+        'finance': ['invoice', 'tax', 'tax information', 'invoice'],
+        'hr': ['hr', 'leave', 'sick leave'],
+        'urgency': {'urgent': 3, 'asap': 2, '': 5},
+    })
+    scoring = KeywordScoringMatrix(matcher, ['finance', 'hr', 'urgency'])
+    words = matcher.patterns + ['the', 'report']
+    documents = [
+        matcher.scan(' '.join(random.choice(words) for _ in range(random.randint(0, 8))))
+        for _ in range(300)
+    ]
+    scores = scoring.scores(documents)
+    for row, hits in zip(scores, documents):
+        assert list(row) == [hits.score('finance'), hits.score('hr'), hits.score('urgency')]
+
+def test_best_prefers_earlier_category_on_ties():
+    matcher = KeywordMatcher({'finance': ['invoice'], 'legal': ['contract']})
+    scoring = KeywordScoringMatrix(matcher, ['finance', 'legal'])
+    best, best_scores = scoring.best([matcher.scan('contract invoice'), matcher.scan('contract'), matcher.scan('')])
+    assert list(best) == [0, 1, 0]
+    assert list(best_scores) == [1, 1, 0]
+    assert scoring.scores([]).shape == (0, 2)
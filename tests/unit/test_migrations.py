@@ -0,0 +1,34 @@
+import sqlite3
+
+import pytest
+
+from libs.database.migrations import Migration, MigrationError, query_plan, run_migrations, schema_version
+
+def make_connection():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE documents (id INTEGER PRIMARY KEY, department TEXT, uploaded_at TEXT)')
+    return conn
+
+DEPARTMENT_QUERY = "SELECT * FROM documents WHERE department = ? ORDER BY uploaded_at DESC"
+
+def test_migrations_apply_once_in_version_order():
+    conn = make_connection()
+    migrations = [
+        Migration(2, "status column", ['ALTER TABLE documents ADD COLUMN status TEXT']),
+        Migration(1, "department index",
+                  ['CREATE INDEX idx_department_uploaded_at ON documents (department, uploaded_at)'],
+                  plan_checks=[(DEPARTMENT_QUERY, 'idx_department_uploaded_at')]),
+    ]
+    assert run_migrations(conn, migrations) == [1, 2]
+    assert schema_version(conn) == 2
+    assert run_migrations(conn, migrations) == []
+    assert any('idx_department_uploaded_at' in detail for detail in query_plan(conn, DEPARTMENT_QUERY))
+
+def test_failed_plan_check_rolls_back_the_migration():
+    conn = make_connection()
+    migration = Migration(1, "wrong index", ['CREATE INDEX idx_uploaded_at ON documents (uploaded_at)'],
+                          plan_checks=[("SELECT * FROM documents WHERE department = ?", 'idx_uploaded_at')])
+    with pytest.raises(MigrationError):
+        run_migrations(conn, [migration])
+    assert schema_version(conn) == 0
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0] == 0
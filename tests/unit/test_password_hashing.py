@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+from libs.utils.password_hashing import PasswordHasher
+
+class RecordingContext:
+    """Stand-in for a passlib CryptContext that records the threads it runs on"""
+    def __init__(self):
+        self.threads = set()
+
+    def hash(self, password):
+        self.threads.add(threading.current_thread().name)
+        return 'hashed:' + password
+
+    def verify(self, password, hashed_password):
+        self.threads.add(threading.current_thread().name)
+        return hashed_password == 'hashed:' + password
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_run_on_the_pool():
+    context = RecordingContext()
+    hasher = PasswordHasher(context, max_workers=2)
+    hashed = await hasher.hash('secret')
+    assert await hasher.verify('secret', hashed)
+    assert not await hasher.verify('wrong', hashed)
+    assert context.threads and all(name.startswith('password-hash') for name in context.threads)
+    hasher.shutdown()
+
+def test_hash_many_keeps_order_and_survives_shutdown():
+    hasher = PasswordHasher(RecordingContext(), max_workers=3)
+    assert hasher.hash_many(['a', 'b', 'c']) == ['hashed:a', 'hashed:b', 'hashed:c']
+    hasher.shutdown()
+    assert hasher.hash_many(['d']) == ['hashed:d']
+    hasher.shutdown()
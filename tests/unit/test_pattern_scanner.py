@@ -0,0 +1,20 @@
+import re
+import pytest
+from libs.utils.pattern_scanner import PII_PATTERNS, PatternScanner
+
+def test_matches_equal_findall():
+    text = "SSN 123-45-6789, card 1234 5678 9012 3456, paid $1,200.50 to john@corp.com (555.123.4567) EMP42 ID-7"
+    scanner = PatternScanner({**PII_PATTERNS, 'month': (r'\bmarch\s+\d{1,2}\b', re.IGNORECASE)})
+    matches = scanner.scan(text + " on MARCH 3")
+    for name, pattern in PII_PATTERNS.items():
+        assert matches.found(name) == re.findall(pattern, text + " on MARCH 3")
+    assert matches.found('month') == ['MARCH 3']
+    assert matches.spans('ssn') == [(4, 15)]
+    assert not scanner.scan("nothing here").any('ssn')
+    assert [name for _, _, name in matches.all()][:3] == ['ssn', 'credit_card', 'money']
+
+def test_shared_regex_and_capturing_groups():
+    scanner = PatternScanner({'name': r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', 'person': r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'})
+    assert scanner.regexes['name'] is scanner.regexes['person']
+    with pytest.raises(ValueError):
+        PatternScanner({'amount': r'(\d+) dollars'})
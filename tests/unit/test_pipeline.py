@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from libs.messaging.broker import InMemoryBroker
+from libs.messaging.pipeline import PipelineClient, run_stage
+
+async def classify(message):
+    return {'department': 'finance' if 'invoice' in message['extracted_text'] else 'general'}
+
+async def analyze(message):
+    raise RuntimeError("analyzer down")
+
+async def route(message):
+    return {'assignee': message['classification']['department'] + '_team'}
+
+@pytest.mark.asyncio
+async def test_messages_follow_their_routing_slip_and_carry_stage_errors():
+    broker = InMemoryBroker()
+    client = PipelineClient(broker, timeout=5)
+    try:
+        await client.open()
+        await run_stage(broker, 'classification', classify, prefetch=2)
+        await run_stage(broker, 'analysis', analyze)
+        await run_stage(broker, 'routing', route)
+
+        results = await asyncio.gather(*[
+            client.run({'doc_id': str(n), 'extracted_text': text}, ['classification', 'analysis', 'routing'])
+            for n, text in enumerate(['invoice 1', 'memo', 'invoice 2'])
+        ])
+        assert [r['routing']['assignee'] for r in results] == ['finance_team', 'general_team', 'finance_team']
+        assert all(r['errors'] == {'analysis': 'analyzer down'} and 'analysis' not in r for r in results)
+
+        # A slip can skip stages
+        routed = await client.run({'doc_id': 'x', 'classification': {'department': 'legal'}}, ['routing'])
+        assert routed['routing'] == {'assignee': 'legal_team'} and 'errors' in routed
+    finally:
+        await client.close()
+        await broker.close()
+
+@pytest.mark.asyncio
+async def test_results_that_do_not_come_back_time_out():
+    broker = InMemoryBroker()
+    client = PipelineClient(broker, timeout=0.05)
+    try:
+        await client.open()
+        with pytest.raises(asyncio.TimeoutError):
+            await client.run({'doc_id': 'a'}, ['classification'])  # nobody consumes the classify queue
+    finally:
+        await client.close()
+        await broker.close()
+
+@pytest.mark.asyncio
+async def test_microservice_stages_process_a_document():
+    from microservices.classification.app.main import classify_message
+    from microservices.content_analysis.app.main import analyze_message
+    from microservices.routing_engine.app.main import route_message
+
+    broker = InMemoryBroker()
+    client = PipelineClient(broker, timeout=30)
+    try:
+        await client.open()
+        await run_stage(broker, 'classification', classify_message, prefetch=4)
+        await run_stage(broker, 'analysis', analyze_message, prefetch=4)
+        await run_stage(broker, 'routing', route_message, prefetch=4)
+
+        message = await client.run({
+            'doc_id': 'doc-1', 'filename': 'invoice.txt', 'file_type': 'txt', 'file_size': 120,
+            'user_department': 'hr',
+            'extracted_text': 'Invoice 42: payment of $1,200 is due. Please process the invoice urgently.'
+        }, ['classification', 'analysis', 'routing'])
+
+        assert message['errors'] == {}
+        assert (message['classification']['department'], message['classification']['priority']) == ('finance', 'high')
+        assert 'extracted_text' not in message['classification']
+        assert message['analysis']['summary'] and 'risk_score' in message['analysis']
+        assert message['routing']['doc_id'] == 'doc-1' and message['routing']['routing_status'] == 'routed'
+    finally:
+        await client.close()
+        await broker.close()
+
+class UnreachableBroker(InMemoryBroker):
+    async def publish(self, queue, message):
+        raise ConnectionError("broker unreachable")
+
+@pytest.mark.asyncio
+async def test_publish_errors_reach_the_caller():
+    broker = UnreachableBroker()
+    client = PipelineClient(broker, timeout=5)
+    try:
+        await client.open()
+        with pytest.raises(ConnectionError):
+            await client.run({'doc_id': 'a'}, ['classification'])
+        assert client._pending == {}
+    finally:
+        await client.close()
+        await broker.close()
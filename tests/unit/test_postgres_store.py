@@ -0,0 +1,89 @@
+import os
+import uuid
+
+import pytest
+
+from libs.database.keyset_pagination import KeysetOrder, next_cursor
+from libs.database.postgres_store import PostgresDocumentStore, numbered_placeholders
+
+# e.g. postgresql://postgres@localhost/postgres; each run uses (and drops) its own schema
+TEST_DATABASE_URL = os.environ.get("IDCR_TEST_DATABASE_URL")
+
+def test_placeholders_are_numbered_outside_string_literals():
+    assert numbered_placeholders("SELECT * FROM t WHERE a = ? AND b = '?' AND c IN (?, ?)") == \
+        "SELECT * FROM t WHERE a = $1 AND b = '?' AND c IN ($2, $3)"
+    assert numbered_placeholders("SELECT 'it''s ?', ?") == "SELECT 'it''s ?', $1"
+
+def document(doc_id, name, **columns):
+    return {'doc_id': doc_id, 'original_name': name, 'file_path': f'/blobs/{doc_id}', 'file_size': 1,
+            'file_type': 'txt', 'uploaded_by': 'ann@x', **columns}
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="IDCR_TEST_DATABASE_URL is not set")
+async def test_postgres_store():
+    asyncpg = pytest.importorskip("asyncpg")
+    schema = f"idcr_test_{uuid.uuid4().hex[:8]}"
+    store = PostgresDocumentStore(TEST_DATABASE_URL, max_size=2, schema=schema)
+    assert await store.open()
+    try:
+        await check_postgres_store(store)
+    finally:
+        await store.close()
+        conn = await asyncpg.connect(TEST_DATABASE_URL)
+        await conn.execute(f'DROP SCHEMA "{schema}" CASCADE')
+        await conn.close()
+
+async def check_postgres_store(store):
+    await store.close()
+    assert not await store.open()  # the tables exist now
+    user = {'full_name': 'Ann', 'email': 'ann@x', 'password_hash': 'h', 'department': 'hr', 'role': 'manager'}
+    assert await store.create_user(user) and not await store.create_user(user)
+    assert (await store.get_user('ann@x'))['role'] == 'manager'
+
+    await store.insert_document(document('a', 'invoice.txt', extracted_text='Invoice payment due', department='finance',
+                                         key_phrases='["payment"]', processing_status='classified'))
+    await store.insert_document(document('b', 'contract.txt', extracted_text='Service agreement', department='legal'))
+    await store.insert_document(document('c', 'notes.txt', extracted_text='Payments list', department='finance'))
+
+    # Full-text search: prefix matches, snippet and rank; keyset pages over the rank
+    columns, join, conditions, params = store.search_clause('pay')
+    assert await store.count_documents(join, conditions, params) == 2
+    order = KeysetOrder('relevance', store.search_rank)
+    rows = await store.list_documents(f'd.doc_id{columns}, {order.key}', join, conditions, params, order.order_by(), 2)
+    cursor = next_cursor(order, rows, 1, key_index=-1, tie_index=0)
+    after, after_params = order.after(cursor)
+    rest = await store.list_documents(f'd.doc_id{columns}, {order.key}', join, conditions + after,
+                                      params + after_params, order.order_by(), 2)
+    assert sorted([rows[0]['doc_id'], rest[0]['doc_id']]) == ['a', 'c'] and len(rest) == 1
+    assert '<mark>' in rows[0]['snippet']
+
+    assert await store.record_review('a', {'review_status': 'approved'},
+                                     {'doc_id': 'a', 'sent_by': 'boss@x', 'received_by': 'ann@x', 'subject': 'ok'})
+    assert not await store.record_review('z', {'review_status': 'approved'},
+                                         {'doc_id': 'z', 'sent_by': 'boss@x', 'received_by': 'ann@x', 'subject': 'ok'})
+    assert [n['doc_id'] for n in await store.list_notifications('', [])] == ['a']
+    assert (await store.get_document('a'))['key_phrases'] == '["payment"]'
+
+    stats = await store.document_stats(' AND department = ?', ['finance'], since_day='2000-01-01')
+    assert (stats['total_documents'], stats['processed_documents'], stats['pending_documents']) == (2, 1, 1)
+    assert sum(stats['daily_uploads'].values()) == 2
+
+    await store.create_batch({'batch_id': 'b1', 'uploaded_by': 'ann@x', 'total_files': 2})
+    await store.record_batch_progress('b1', succeeded=True)
+    assert (await store.get_batch('b1'))['status'] == 'processing'
+    await store.record_batch_progress('b1', succeeded=False)
+    batch = await store.get_batch('b1')
+    assert (batch['status'], batch['processed_files'], batch['failed_files']) == ('completed', 1, 1)
+    assert batch['completed_at']
+
+    # Batches of a stopped instance stop getting heartbeats and are closed
+    await store.create_batch({'batch_id': 'b2', 'uploaded_by': 'ann@x', 'total_files': 3, 'owner': 'gone',
+                              'heartbeat_at': '2024-01-01T00:00:00+00:00'})
+    await store.create_batch({'batch_id': 'b3', 'uploaded_by': 'ann@x', 'total_files': 1, 'owner': 'live',
+                              'heartbeat_at': '2024-01-01T00:00:00+00:00'})
+    await store.record_batch_progress('b2', succeeded=True)
+    await store.touch_batches('live', '2024-01-01T00:05:00+00:00')
+    assert await store.close_abandoned_batches('2024-01-01T00:02:00+00:00') == 1
+    batch = await store.get_batch('b2')
+    assert (batch['status'], batch['processed_files'], batch['failed_files']) == ('completed', 1, 2)
+    assert (await store.get_batch('b3'))['status'] == 'processing'
@@ -0,0 +1,107 @@
+import sqlite3
+
+from libs.database.sqlite_pool import SQLitePool
+from libs.utils.document_classifier import DepartmentClassifier
+from libs.utils.reclassification import CorpusReclassifier, changed_keywords, rules_snapshot
+
+DEPARTMENTS = [('finance', 'invoice', 'finance', 'high'), ('hr', 'hr_document', 'hr', 'medium')]
+
+def make_classifier(finance_keywords):
+    return DepartmentClassifier({
+        'finance': finance_keywords,
+        'hr': ['employee', 'payroll'],
+        'high_priority': ['urgent'],
+    }, DEPARTMENTS)
+
+def make_database(path, documents):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT UNIQUE NOT NULL, original_name TEXT NOT NULL,
+            extracted_text TEXT, document_type TEXT, department TEXT, priority TEXT, classification_source TEXT,
+            review_status TEXT DEFAULT 'pending'
+        )
+    ''')
+    conn.executemany(
+        "INSERT INTO documents (doc_id, original_name, extracted_text, document_type, department, priority,"
+        " classification_source, review_status) VALUES (?, ?, ?, 'general', 'administration', 'low', ?, ?)",
+        # (doc_id, name, text) rows are locally classified and unreviewed
+        [document if len(document) == 5 else (*document, 'local', 'pending') for document in documents]
+    )
+    conn.commit()
+    conn.close()
+
+def stored(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT doc_id, document_type, department, priority FROM documents ORDER BY id').fetchall()
+    conn.close()
+    return {doc_id: values for doc_id, *values in rows}
+
+def test_changed_keywords():
+    old = rules_snapshot(make_classifier(['invoice', 'budget']))
+    assert changed_keywords(None, old) is None
+    assert changed_keywords(old, old) == set()
+    assert changed_keywords(old, rules_snapshot(make_classifier(['invoice', 'receipts']))) == {'budget', 'receipts'}
+    # Service rules are fingerprinted too, but only the local keywords select documents to re-score
+    assert changed_keywords(old, rules_snapshot(make_classifier(['invoice', 'budget']), {'rules': ['x']})) == set()
+
+def test_only_documents_with_changed_keywords_are_rescored(tmp_path):
+    database = str(tmp_path / 'documents.db')
+    make_database(database, [
+        ('a', 'notes.txt', 'Employee onboarding checklist'),
+        ('b', 'q3.txt', 'URGENT: invoice overdue'),
+        ('c', 'expenses.txt', 'Travel receipts for the employee offsite and payroll'),
+        ('d', 'misc.txt', 'Lunch menu'),
+    ])
+    pool = SQLitePool(database)
+
+    # The first run records the rules the stored classifications are taken to come from
+    first = CorpusReclassifier(pool, make_classifier(['invoice']), service_rules={'rules': [1]}).run()
+    assert first['seeded'] and first['indexed_documents'] == 4
+    assert first['changed_documents'] == 0
+    assert stored(database)['b'] == ['general', 'administration', 'low']
+
+    report = CorpusReclassifier(pool, make_classifier(['invoice'])).run()
+    # Without the service's tables (service unreachable) the change is unknown
+    assert report['candidate_documents'] == 0 and not report['seeded'] and report['service_rules_changed'] is None
+    report = CorpusReclassifier(pool, make_classifier(['invoice']), service_rules={'rules': [1]}).run()
+    assert report['service_rules_changed'] is False
+    report = CorpusReclassifier(pool, make_classifier(['invoice']), service_rules={'rules': [2]}).run()
+    assert report['service_rules_changed'] is True and report['candidate_documents'] == 0
+
+    report = CorpusReclassifier(pool, make_classifier(['invoice', 'overdue'])).run()
+    assert report['candidate_documents'] == 1 and report['changed_documents'] == 1
+
+    # 'receipt' is a prefix of a term in c only; two worker processes
+    report = CorpusReclassifier(pool, make_classifier(['invoice', 'overdue', 'receipt', 'travel', 'offsite']),
+                                workers=2).run()
+    assert report['changed_keywords'] == ['offsite', 'receipt', 'travel']
+    assert report['candidate_documents'] == 1 and report['changed_documents'] == 1
+    assert stored(database) == {
+        'a': ['general', 'administration', 'low'],
+        'b': ['invoice', 'finance', 'high'],
+        'c': ['invoice', 'finance', 'high'],
+        'd': ['general', 'administration', 'low'],
+    }
+    pool.close()
+
+def test_service_and_reviewed_classifications_are_left_alone(tmp_path):
+    database = str(tmp_path / 'documents.db')
+    make_database(database, [
+        ('local', 'a.txt', 'Travel receipts', 'local', 'pending'),
+        ('service', 'b.txt', 'Travel receipts', 'service', 'pending'),
+        ('reviewed', 'c.txt', 'Travel receipts', 'local', 'approved'),
+        ('legacy', 'd.txt', 'Travel receipts', None, 'pending'),
+    ])
+    pool = SQLitePool(database)
+    CorpusReclassifier(pool, make_classifier(['invoice'])).run()
+
+    report = CorpusReclassifier(pool, make_classifier(['invoice', 'receipts'])).run()
+    assert report['candidate_documents'] == 1 and report['changed_documents'] == 1
+    assert stored(database) == {
+        'local': ['invoice', 'finance', 'high'],
+        'service': ['general', 'administration', 'low'],
+        'reviewed': ['general', 'administration', 'low'],
+        'legacy': ['general', 'administration', 'low'],
+    }
+    pool.close()
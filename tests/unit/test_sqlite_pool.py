@@ -0,0 +1,38 @@
+import sqlite3
+
+from libs.database.sqlite_pool import SQLitePool
+
+def test_connections_are_reused_in_wal_mode(tmp_path):
+    pool = SQLitePool(str(tmp_path / 'test.db'), size=1)
+    conn = pool.acquire()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+    conn.execute('CREATE TABLE items (name TEXT)')
+    conn.row_factory = sqlite3.Row
+    pool.release(conn)
+    pool.release(conn)  # released twice: must not be handed out twice
+
+    first, second = pool.acquire(), pool.acquire()
+    assert first is conn and second is not conn
+    assert first.row_factory is None
+    pool.release(first)
+    pool.release(second)  # the pool keeps one idle connection
+    pool.close()
+
+def test_uncommitted_changes_are_rolled_back_and_readers_are_not_blocked(tmp_path):
+    pool = SQLitePool(str(tmp_path / 'test.db'))
+    writer = pool.acquire()
+    writer.execute('CREATE TABLE items (name TEXT)')
+    writer.execute("INSERT INTO items VALUES ('committed')")
+    writer.commit()
+
+    writer.execute("INSERT INTO items VALUES ('pending')")  # write transaction stays open
+    reader = pool.acquire()
+    assert reader.execute('SELECT name FROM items').fetchall() == [('committed',)]
+    pool.release(reader)
+
+    pool.release(writer)
+    conn = pool.acquire()
+    assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 1
+    pool.release(conn)
+    pool.close()
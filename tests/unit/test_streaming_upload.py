@@ -0,0 +1,66 @@
+import hashlib
+import os
+import pytest
+from libs.utils.streaming_upload import UploadRejected, receive_streaming_upload
+
+BOUNDARY = "----idcrtestboundary"
+
+def build_body(fields, files):
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for filename, content in files:
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{BOUNDARY}--\r\n'.encode())
+    return b''.join(parts)
+
+async def chunked(body, size=7):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+@pytest.mark.asyncio
+async def test_files_streamed_to_disk_with_hash(tmp_path):
+    content = b"Invoice total $1,200.00\n" * 50
+    body = build_body({"batch_name": "Q4"}, [("invoice.txt", content), ("../escape.pdf", b"%PDF")])
+    fields, stored, skipped = await receive_streaming_upload(
+        f"multipart/form-data; boundary={BOUNDARY}", chunked(body), tmp_path, 10_000, ["txt", "pdf"]
+    )
+    assert fields == {"batch_name": "Q4"}
+    assert skipped == []
+    assert [f["filename"] for f in stored] == ["invoice.txt", "escape.pdf"]
+    assert stored[0]["sha256"] == hashlib.sha256(content).hexdigest()
+    assert stored[0]["file_size"] == len(content)
+    assert open(stored[0]["file_path"], "rb").read() == content
+    assert os.path.dirname(stored[1]["file_path"]) == str(tmp_path) and stored[1]["file_path"].endswith(".pdf")
+
+@pytest.mark.asyncio
+async def test_oversized_and_unsupported_files_are_skipped(tmp_path):
+    body = build_body({"batch_name": "b"}, [("big.txt", b"x" * 500), ("tool.exe", b"MZ"), ("ok.txt", b"fine")])
+    fields, stored, skipped = await receive_streaming_upload(
+        f"multipart/form-data; boundary={BOUNDARY}", chunked(body, 64), tmp_path, 100, ["txt"]
+    )
+    assert [f["filename"] for f in stored] == ["ok.txt"]
+    assert skipped == [
+        {"filename": "big.txt", "reason": "file too large"},
+        {"filename": "tool.exe", "reason": "unsupported file type"}
+    ]
+    assert os.listdir(tmp_path) == [os.path.basename(stored[0]["file_path"])]
+
+@pytest.mark.asyncio
+async def test_files_with_the_same_name_are_staged_separately(tmp_path):
+    body = build_body({"batch_name": "b"}, [("scan.txt", b"first"), ("scan.txt", b"second")])
+    _, stored, _ = await receive_streaming_upload(
+        f"multipart/form-data; boundary={BOUNDARY}", chunked(body), tmp_path, 100, ["txt"]
+    )
+    assert [f["filename"] for f in stored] == ["scan.txt", "scan.txt"]
+    assert stored[0]["file_path"] != stored[1]["file_path"]
+    assert [open(f["file_path"], "rb").read() for f in stored] == [b"first", b"second"]
+    assert [f["sha256"] for f in stored] == [hashlib.sha256(b"first").hexdigest(), hashlib.sha256(b"second").hexdigest()]
+
+@pytest.mark.asyncio
+async def test_non_multipart_request_rejected(tmp_path):
+    with pytest.raises(UploadRejected):
+        await receive_streaming_upload("application/json", chunked(b"{}"), tmp_path, 100, ["txt"])
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import pytest
+from libs.utils.text_extraction import TextExtractor
+
+@pytest.mark.asyncio
+async def test_extract_text_file(tmp_path):
+    path = tmp_path / "note.txt"
+    path.write_text("Invoice due on 2025-07-11", encoding="utf-8")
+    extractor = TextExtractor(max_workers=1)
+    try:
+        assert await extractor.extract(str(path), "txt") == "Invoice due on 2025-07-11"
+        assert await extractor.extract(str(path), "xlsx") == "Unsupported file type for text extraction"
+    finally:
+        extractor.shutdown()
+
+@pytest.mark.asyncio
+async def test_missing_file_returns_error_text(tmp_path):
+    extractor = TextExtractor(max_workers=1)
+    try:
+        result = await extractor.extract(str(tmp_path / "missing.pdf"), "pdf")
+        assert result.startswith("Error extracting text:")
+    finally:
+        extractor.shutdown()
+
+def write_pdf(path, pages):
+    """A PDF whose page n holds the text 'Page n'"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>',
+               b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                   b' '.join(b'%d 0 R' % (4 + 2 * n) for n in range(pages)), pages),
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    for n in range(pages):
+        content = b'BT /F1 12 Tf 20 100 Td (Page %d) Tj ET' % n
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] /Contents %d 0 R'
+                       b' /Resources << /Font << /F1 3 0 R >> >> >>' % (5 + 2 * n))
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+    data, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    data += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    data += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    path.write_bytes(data)
+
+@pytest.mark.asyncio
+async def test_large_pdfs_are_parsed_in_page_ranges(tmp_path):
+    path = tmp_path / "report.pdf"
+    write_pdf(path, 5)
+    extractor = TextExtractor(max_workers=2, pages_per_task=2, parallel_page_threshold=3)
+    submitted = []
+    submit = extractor._executor.submit
+    extractor._executor.submit = lambda fn, *args: submitted.append((fn.__name__, args[1:])) or submit(fn, *args)
+    try:
+        text = await extractor.extract(str(path), "pdf")
+        assert text.split() == ['Page', '0', 'Page', '1', 'Page', '2', 'Page', '3', 'Page', '4']
+        assert submitted == [('count_pdf_pages', ()), ('extract_pdf_pages', (0, 2)),
+                             ('extract_pdf_pages', (2, 4)), ('extract_pdf_pages', (4, 5))]
+
+        # Below the threshold the whole document is one task
+        submitted.clear()
+        extractor.parallel_page_threshold = 10
+        assert await extractor.extract(str(path), "pdf") == text
+        assert [name for name, _ in submitted] == ['count_pdf_pages', 'extract_text_from_file']
+    finally:
+        extractor.shutdown()
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="needs named pipes")
+async def test_a_timeout_replaces_the_pool_and_other_documents_are_retried(tmp_path):
+    stuck = tmp_path / "stuck.txt"
+    os.mkfifo(stuck)  # opening it for reading blocks until a writer shows up
+    note = tmp_path / "note.txt"
+    note.write_text("fine", encoding="utf-8")
+    extractor = TextExtractor(max_workers=1, timeout=0.5)
+    try:
+        pool = extractor._executor
+        stuck_task = asyncio.create_task(extractor.extract(str(stuck), "txt"))
+        await asyncio.sleep(0.1)
+        # Queued behind the stuck document on the only worker, with time to spare
+        extractor.timeout = 30
+        others = [asyncio.create_task(extractor.extract(str(note), "txt")) for _ in range(4)]
+
+        assert (await stuck_task).startswith("Error extracting text: timed out")
+        assert extractor._executor is not pool
+        assert await asyncio.gather(*others) == ["fine"] * 4
+    finally:
+        extractor.shutdown()
@@ -0,0 +1,44 @@
+from libs.utils.ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set(('stats', 'admin'), {'total_documents': 3})
+    clock.now = 9.9
+    assert cache.get(('stats', 'admin')) == {'total_documents': 3}
+    clock.now = 10
+    assert cache.get(('stats', 'admin')) is None
+    assert (cache.stats()['hits'], cache.stats()['misses'], cache.stats()['entries']) == (1, 1, 0)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set(('documents', 'a'), 1)
+    cache.set(('documents', 'b'), 2)
+    cache.get(('documents', 'a'))
+    cache.set(('documents', 'c'), 3)
+    assert cache.get(('documents', 'b')) is None
+    assert cache.get(('documents', 'a')) == 1
+    assert cache.stats()['evictions'] == 1
+
+def test_invalidate_drops_named_entries_and_late_values():
+    cache = TTLCache()
+    cache.set(('documents', 'admin'), 1)
+    cache.set(('email-notifications', 'admin'), 2)
+    version = cache.version()
+    cache.invalidate('documents', 'stats')
+    assert cache.get(('documents', 'admin')) is None
+    assert cache.get(('email-notifications', 'admin')) == 2
+    # computed before the invalidation, so possibly stale
+    cache.set(('stats', 'admin'), 3, version)
+    assert cache.get(('stats', 'admin')) is None
+    cache.set(('stats', 'admin'), 4, cache.version())
+    assert cache.get(('stats', 'admin')) == 4
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0